@@ -7,8 +7,11 @@ interface, but cannot be automatically assessed for correctness.
 STUDENTS SHOULD NOT NEED TO MODIFY THIS CODE.  IT WOULD BE BEST TO TREAT THIS
 FILE AS A BLACK BOX FOR TESTING.
 """
+import os
+import pickle
 import random
 import unittest
+import time
 import timeit
 import sys
 
@@ -538,5 +541,1032 @@ class Project1Test(unittest.TestCase):
                 legal_moves, chosen_move))
 
 
+class EvaluationCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.calls = []
+
+        def score(game, player):
+            self.calls.append(game.get_player_location(player))
+            return float(len(game.get_legal_moves(player)))
+
+        self.score = score
+
+    def test_position_key_is_player_order_independent(self):
+        """ Test that position keys only depend on the game state """
+        game = isolation.Board("p1", "p2")
+        game.apply_move((2, 3))
+        game.apply_move((0, 5))
+        swapped = isolation.Board("p2", "p1")
+        swapped.apply_move((2, 3))
+        swapped.apply_move((0, 5))
+
+        self.assertEqual(game.position_key("p1"), swapped.position_key("p2"))
+        self.assertNotEqual(game.position_key("p1"), game.position_key("p2"))
+        self.assertNotEqual(game.position_key("p1"),
+                            game.forecast_move((1, 1)).position_key("p1"))
+
+    def test_cache_hits_and_eviction(self):
+        """ Test that repeated evaluations are served from the cache """
+        cache = game_agent.EvaluationCache(self.score, 2)
+        game = isolation.Board("p1", "p2")
+        game.apply_move((2, 3))
+        game.apply_move((0, 5))
+        children = [game.forecast_move(m) for m in game.get_legal_moves()[:3]]
+
+        first = cache(children[0], "p1")
+        self.assertEqual(cache(children[0].copy(), "p1"), first)
+        self.assertEqual((cache.hits, cache.misses, len(self.calls)), (1, 1, 1))
+
+        cache(children[1], "p1")
+        cache(children[2], "p1")
+        self.assertEqual((len(cache.entries), cache.evictions), (2, 1))
+        cache(children[0], "p1")
+        self.assertEqual(cache.misses, 4)
+
+    def test_cached_search_matches_uncached(self):
+        """ Test that the cache does not change the result of a search """
+        cached = game_agent.CustomPlayer(3, self.score, False, "alphabeta",
+                                         eval_cache_size=1000)
+        plain = game_agent.CustomPlayer(3, self.score, False, "alphabeta")
+        for agent in (cached, plain):
+            agent.time_left = lambda: 1e3
+
+        game = isolation.Board(cached, plain)
+        game.apply_move((3, 3))
+        game.apply_move((0, 0))
+        self.assertEqual(cached.alphabeta(game, 3), plain.alphabeta(game, 3))
+        self.assertEqual(cached.alphabeta(game, 3), plain.alphabeta(game, 3))
+        self.assertGreater(cached.eval_cache.hits, 0)
+
+
+try:
+    import batch_scores
+except ImportError:
+    batch_scores = None
+
+
+@unittest.skipIf(batch_scores is None, "NumPy is not installed")
+class BatchScoreTest(unittest.TestCase):
+
+    def test_batched_alphabeta_matches_scalar(self):
+        """ Test that frontier batching does not change alphabeta results """
+        from sample_players import improved_score
+        batched = game_agent.CustomPlayer(
+            3, improved_score, False, "alphabeta",
+            batch_score_fn=batch_scores.improved_score_batch)
+        scalar = game_agent.CustomPlayer(3, improved_score, False, "alphabeta")
+        for agent in (batched, scalar):
+            agent.time_left = lambda: 1e3
+
+        rng = random.Random(7)
+        for _ in range(10):
+            game = isolation.Board(batched, scalar)
+            for _ in range(rng.randint(2, 24)):
+                moves = game.get_legal_moves()
+                if not moves:
+                    break
+                game.apply_move(rng.choice(moves))
+            for depth in (1, 2, 3):
+                results = []
+                for agent in (batched, scalar):
+                    agent.nodes_searched = agent.leaf_evaluations = agent.cutoffs = 0
+                    results.append((agent.alphabeta(game, depth), agent.nodes_searched,
+                                    agent.leaf_evaluations, agent.cutoffs))
+                self.assertEqual(results[0], results[1])
+
+    def test_batch_scores_with_unplaced_players(self):
+        """ Test the batch heuristics on boards where players are not placed yet """
+        from sample_players import open_move_score, improved_score
+        game = isolation.Board("player1", "player2", 5, 6)
+        batches = [[game], [game.forecast_move(m) for m in game.get_legal_moves()]]
+        game.apply_move((2, 3))
+        batches.append([game.forecast_move(m) for m in game.get_legal_moves()])
+        for scalar_fn, batch_fn in [(open_move_score, batch_scores.open_move_score_batch),
+                                    (improved_score, batch_scores.improved_score_batch)]:
+            for batch in batches:
+                for player in ("player1", "player2"):
+                    self.assertEqual(list(batch_fn(batch, player)),
+                                     [scalar_fn(g, player) for g in batch])
+
+
+class ReachabilityTest(unittest.TestCase):
+
+    @staticmethod
+    def distances(game, location):
+        """ Reference breadth-first search over knight moves """
+        directions = [(-2, -1), (-2, 1), (-1, -2), (-1, 2),
+                      (1, -2), (1, 2), (2, -1), (2, 1)]
+        blank = set(game.get_blank_spaces())
+        if location is None:
+            # an unplaced player can move to any open cell
+            dist, frontier, depth = {cell: 1 for cell in blank}, set(blank), 1
+        else:
+            dist, frontier, depth = {}, {location}, 0
+        while frontier:
+            depth += 1
+            frontier = {(r + dr, c + dc) for r, c in frontier for dr, dc in directions
+                        if (r + dr, c + dc) in blank and (r + dr, c + dc) not in dist}
+            dist.update({cell: depth for cell in frontier})
+        return dist
+
+    def test_reachability_matches_reference_search(self):
+        """ Test the bitmask flood fill against a set-based search """
+        rng = random.Random(3)
+        for trial in range(30):
+            game = isolation.Board("p1", "p2", 5 + trial % 4, 7)
+            for _ in range(rng.randint(0, 20)):
+                moves = game.get_legal_moves()
+                if not moves:
+                    break
+                game.apply_move(rng.choice(moves))
+
+            own = self.distances(game, game.get_player_location("p1"))
+            opp = self.distances(game, game.get_player_location("p2"))
+            own_first = sum(1 for c, d in own.items() if d < opp.get(c, float("inf")))
+            opp_first = sum(1 for c, d in opp.items() if d < own.get(c, float("inf")))
+
+            self.assertEqual(game_agent.get_reachability_factors(game, "p1"),
+                             (len(own), len(opp), own_first, opp_first))
+
+
+class MobilityTest(unittest.TestCase):
+
+    def test_mobility_matches_legal_moves(self):
+        """ Test incrementally tracked mobility through random games """
+        rng = random.Random(11)
+        for width, height in [(5, 5), (7, 7), (9, 6)]:
+            for _ in range(10):
+                game = isolation.Board("p1", "p2", width, height)
+                while True:
+                    for player in ("p1", "p2"):
+                        self.assertEqual(game.get_mobility(player),
+                                         len(game.get_legal_moves(player)))
+                    moves = game.get_legal_moves()
+                    if not moves:
+                        break
+                    if rng.random() < 0.5:
+                        game = game.forecast_move(rng.choice(moves))
+                    else:
+                        game.apply_move(rng.choice(moves))
+
+    def test_mobility_of_board_subclass_copies(self):
+        """ Test mobility on boards copied without the incremental state """
+        board = CounterBoard("agentUT", "null_agent")
+        board.apply_move((3, 3))
+        board.apply_move((0, 0))
+        child = board.forecast_move(board.get_legal_moves()[0])
+        self.assertEqual(child.get_mobility("agentUT"),
+                         len(child.get_legal_moves("agentUT")))
+        self.assertEqual(child.get_mobility("null_agent"),
+                         len(child.get_legal_moves("null_agent")))
+
+    def test_heuristics_on_stock_board(self):
+        """ Test the heuristics on a board without the incremental mobility and occupancy """
+
+        class StockBoard(object):
+            """ A Board exposing only the interface of the stock project Board """
+            STOCK = {"__player_1__", "__player_2__", "width", "height", "move_count",
+                     "active_player", "inactive_player", "get_opponent", "copy",
+                     "forecast_move", "move_is_legal", "get_blank_spaces",
+                     "get_player_location", "get_legal_moves", "apply_move",
+                     "is_winner", "is_loser", "utility", "to_string"}
+
+            def __init__(self, board):
+                self.board = board
+
+            def __getattr__(self, name):
+                if name not in self.STOCK:
+                    raise AttributeError(name)
+                return getattr(self.board, name)
+
+        rng = random.Random(3)
+        game = isolation.Board("p1", "p2")
+        while game.get_legal_moves():
+            for name, score_fn in sorted(game_agent.heuristics_options.items()):
+                for player in ("p1", "p2"):
+                    self.assertEqual(score_fn(StockBoard(game), player), score_fn(game, player),
+                                     name)
+            game.apply_move(rng.choice(game.get_legal_moves()))
+
+
+class GameStateTest(unittest.TestCase):
+
+    def test_state_round_trip(self):
+        """ Test converting boards to game states and back """
+        rng = random.Random(5)
+        for width, height in [(5, 5), (7, 7), (9, 4)]:
+            game = isolation.Board("p1", "p2", width, height)
+            while True:
+                state = isolation.GameState.from_bytes(game.state().to_bytes())
+                self.assertEqual(state, game.state())
+                self.assertEqual(pickle.loads(pickle.dumps(state)), state)
+
+                restored = isolation.Board.from_state(state, "p1", "p2")
+                self.assertEqual(restored.state(), state)
+                self.assertEqual(restored.to_string(), game.to_string())
+                self.assertEqual(restored.active_player, game.active_player)
+                self.assertEqual(restored.move_count, game.move_count)
+                for player in ("p1", "p2"):
+                    self.assertEqual(restored.get_legal_moves(player),
+                                     game.get_legal_moves(player))
+                    self.assertEqual(restored.get_mobility(player),
+                                     game.get_mobility(player))
+
+                moves = game.get_legal_moves()
+                if not moves:
+                    break
+                game.apply_move(rng.choice(moves))
+
+    def test_state_does_not_reference_players(self):
+        """ Test that pickled states do not include the player objects """
+        agent = game_agent.CustomPlayer()
+        game = isolation.Board(agent, "null_agent")
+        game.apply_move((3, 3))
+        data = pickle.dumps(game.state())
+        self.assertNotIn(b"CustomPlayer", data)
+        self.assertLess(len(data), len(pickle.dumps(game)))
+
+    def test_canonical_state(self):
+        """ Test that symmetric game states share a canonical state """
+        from isolation.state import symmetries
+        game = isolation.Board("p1", "p2", 7, 7)
+        for move in [(0, 1), (3, 3), (2, 2), (5, 4)]:
+            game.apply_move(move)
+        state = game.state()
+        images = [state.transform(cell_map) for cell_map in symmetries(7, 7)]
+        self.assertEqual(len(set(images)), 8)
+        self.assertEqual(len({image.canonical() for image in images}), 1)
+        self.assertEqual(len(symmetries(5, 4)), 4)
+        for image in images:
+            board = isolation.Board.from_state(image, "p1", "p2")
+            self.assertEqual(board.get_mobility("p1"), game.get_mobility("p1"))
+            self.assertEqual(board.get_mobility("p2"), game.get_mobility("p2"))
+
+
+class TournamentTest(unittest.TestCase):
+
+    def test_seeded_rounds_are_reproducible(self):
+        """ Test that a seeded round gives the same result when replayed """
+        import io
+        import tournament
+        from contextlib import redirect_stdout
+        from sample_players import RandomPlayer, improved_score
+
+        agents = [tournament.Agent(RandomPlayer(), "Random"),
+                  tournament.Agent(game_agent.CustomPlayer(
+                      1, improved_score, False, "alphabeta"), "AB_1"),
+                  tournament.Agent(game_agent.CustomPlayer(
+                      2, improved_score, False, "alphabeta"), "AB_2")]
+        with redirect_stdout(io.StringIO()) as output:
+            first = tournament.play_round(agents, 2, seed=3)
+            second = tournament.play_round(agents, 2, seed=3)
+        self.assertEqual(first, second)
+        self.assertEqual(output.getvalue().count("Result:"), 4)
+
+    def test_resume_from_results_store(self):
+        """ Test that stored matches are not replayed """
+        import io
+        import os
+        import tempfile
+        import tournament
+        import results_store
+        from contextlib import redirect_stdout
+        from sample_players import RandomPlayer
+
+        class CountingPlayer(RandomPlayer):
+            calls = 0
+
+            def get_move(self, game, legal_moves, time_left):
+                CountingPlayer.calls += 1
+                return super(CountingPlayer, self).get_move(game, legal_moves, time_left)
+
+        agents = [tournament.Agent(RandomPlayer(), "Random"),
+                  tournament.Agent(CountingPlayer(), "Counting")]
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "results.jsonl")
+            with redirect_stdout(io.StringIO()):
+                first = tournament.play_round(agents, 2, seed=1,
+                                              store=results_store.ResultsStore(path))
+                calls = CountingPlayer.calls
+                second = tournament.play_round(agents, 2, seed=1,
+                                               store=results_store.ResultsStore(path))
+            records = list(results_store.ResultsStore(path))
+
+        self.assertEqual(first, second)
+        self.assertEqual(CountingPlayer.calls, calls)
+        self.assertEqual(len(records), 4)
+        game = records[0]["games"][0]
+        self.assertEqual(len(game["moves"]), len(game["move_times"]))
+        self.assertEqual(game["players"], ["Counting", "Random"])
+        table = results_store.summarize(records)
+        self.assertEqual(sum(table["Counting"]["Random"]), 8)
+
+    def test_move_latencies(self):
+        """ Test latency percentiles by agent and game phase """
+        import latency
+        latencies = latency.MoveLatencies(150)
+        latencies.add_game({"opening": [(0, 0), (1, 1)], "players": ["A", "B"],
+                            "move_times": [float(ms) for ms in range(1, 31)]})
+        rows = {(row["agent"], row["phase"]): row for row in latencies.summary()}
+        # A plays plies 2, 4, ... with times 1, 3, ...; plies 2-9 are the opening
+        self.assertEqual(rows[("A", "opening")]["moves"], 4)
+        self.assertEqual(rows[("A", "opening")]["p50"], 3.)
+        self.assertEqual(rows[("B", "middlegame")]["max"], 22.)
+        self.assertEqual(rows[("B", "endgame")]["margin"], 120.)
+        self.assertEqual(sum(row["moves"] for row in rows.values()), 30)
+
+
+class SPRTTest(unittest.TestCase):
+
+    def test_sprt_decisions(self):
+        """ Test that the SPRT accepts the hypothesis the results support """
+        import sprt
+        strong, weak = sprt.SPRT(0, 50), sprt.SPRT(0, 50)
+        for _ in range(1000):
+            if strong.status is None:
+                strong.record(7, 3)
+            if weak.status is None:
+                weak.record(5, 5)
+        self.assertEqual(strong.status, sprt.H1)
+        self.assertEqual(weak.status, sprt.H0)
+        self.assertLess(strong.wins + strong.losses, 200)
+
+    def test_elo_interval(self):
+        """ Test Elo estimates and their confidence intervals """
+        import sprt
+        elo, lower, upper = sprt.elo_interval(50, 50)
+        self.assertEqual(elo, 0.)
+        self.assertAlmostEqual(lower, -upper)
+        self.assertAlmostEqual(sprt.elo_from_score(sprt.expected_score(120.)), 120.)
+
+
+class SearchBudgetTest(unittest.TestCase):
+
+    def test_node_limit(self):
+        """ Test that get_move stops after the node budget is spent """
+        from sample_players import improved_score
+        agentUT = game_agent.CustomPlayer(score_fn=improved_score, method="alphabeta",
+                                          node_limit=500)
+        game = isolation.Board(agentUT, "null_agent")
+        game.apply_move((3, 3))
+        game.apply_move((0, 0))
+        legal_moves = game.get_legal_moves()
+        moves = [agentUT.get_move(game, legal_moves, lambda: float("inf"))
+                 for _ in range(2)]
+        self.assertEqual(agentUT.nodes_searched, 501)
+        self.assertEqual(moves[0], moves[1])
+        self.assertIn(moves[0], legal_moves)
+
+        # the budget can be changed between moves
+        agentUT.node_limit = 200
+        agentUT.get_move(game, legal_moves, lambda: float("inf"))
+        self.assertEqual(agentUT.nodes_searched, 201)
+
+    @unittest.skipIf(batch_scores is None, "NumPy is not installed")
+    def test_node_limit_with_batched_frontier(self):
+        """ Test that scoring the frontier in batches does not overspend the budget """
+        from sample_players import improved_score
+        agentUT = game_agent.CustomPlayer(score_fn=improved_score, method="alphabeta",
+                                          node_limit=500,
+                                          batch_score_fn=batch_scores.improved_score_batch)
+        game = isolation.Board(agentUT, "null_agent")
+        game.apply_move((3, 3))
+        game.apply_move((0, 0))
+        agentUT.get_move(game, game.get_legal_moves(), lambda: float("inf"))
+        self.assertEqual(agentUT.nodes_searched, 501)
+
+    def test_untimed_games_are_reproducible(self):
+        """ Test games between node and depth limited agents without a timer """
+        from sample_players import improved_score
+        results = []
+        for _ in range(2):
+            player1 = game_agent.CustomPlayer(score_fn=improved_score, method="alphabeta",
+                                              node_limit=300)
+            player2 = game_agent.CustomPlayer(score_fn=improved_score, method="alphabeta",
+                                              depth_limit=2)
+            game = isolation.Board(player1, player2, 5, 5)
+            winner, history, termination = game.play(time_limit=None)
+            results.append((winner is player1, history, termination))
+        self.assertEqual(results[0], results[1])
+        self.assertEqual(results[0][2], "illegal move")
+
+
+class SearchStatsTest(unittest.TestCase):
+
+    def test_search_stats(self):
+        """ Test the statistics reported by get_move """
+        from sample_players import improved_score
+        evaluations = []
+
+        def score_fn(game, player):
+            evaluations.append(1)
+            return improved_score(game, player)
+
+        reported = []
+        agentUT = game_agent.CustomPlayer(score_fn=score_fn, method="alphabeta",
+                                          depth_limit=4, eval_cache_size=1000,
+                                          stats_callback=reported.append)
+        game = isolation.Board(agentUT, "null_agent")
+        game.apply_move((3, 3))
+        game.apply_move((0, 0))
+        agentUT.get_move(game, game.get_legal_moves(), lambda: float("inf"))
+
+        stats = agentUT.last_search_stats
+        self.assertEqual(reported, [stats])
+        self.assertEqual(stats.nodes, agentUT.nodes_searched)
+        self.assertEqual(stats.depth, 4)
+        self.assertEqual(len(stats.iteration_times), 4)
+        self.assertGreater(stats.cutoffs, 0)
+        self.assertLessEqual(stats.first_move_cutoffs, stats.cutoffs)
+        self.assertGreater(stats.nps, 0)
+        cache = agentUT.eval_cache
+        self.assertEqual(stats.leaf_evaluations, cache.hits + cache.misses)
+        self.assertEqual(len(evaluations), cache.misses)
+        self.assertAlmostEqual(stats.eval_cache_hit_rate, cache.hit_rate)
+        self.assertEqual(stats.timer_threshold, agentUT.TIMER_THRESHOLD)
+
+    def test_tournament_search_stats(self):
+        """ Test that tournament game records carry search totals """
+        import io
+        import tournament
+        from contextlib import redirect_stdout
+        from sample_players import RandomPlayer, improved_score
+
+        agentUT = game_agent.CustomPlayer(score_fn=improved_score, method="alphabeta",
+                                          depth_limit=2)
+        agents = [tournament.Agent(RandomPlayer(), "Random"),
+                  tournament.Agent(agentUT, "AB_2")]
+        summary = tournament.SearchStatsSummary()
+        with redirect_stdout(io.StringIO()):
+            tournament.play_round(agents, 1, seed=2, time_limit=None, search_stats=summary)
+            summary.print_table()
+        self.assertEqual(list(summary.agents), ["AB_2"])
+        row = summary.agents["AB_2"].summary()
+        self.assertEqual(row["depth"], 2)
+        self.assertGreater(row["moves"], 0)
+        self.assertIsNone(agentUT.stats_callback)
+
+
+class SearchTracerTest(unittest.TestCase):
+
+    def test_tracer_records_sampled_nodes(self):
+        """ Test that a tracer samples nodes without changing the search """
+        from sample_players import improved_score
+        moves = []
+        for tracer in (None, game_agent.SearchTracer(capacity=10, every=3)):
+            agentUT = game_agent.CustomPlayer(score_fn=improved_score, method="alphabeta",
+                                              depth_limit=3, tracer=tracer)
+            game = isolation.Board(agentUT, "null_agent")
+            game.apply_move((3, 3))
+            game.apply_move((0, 0))
+            moves.append(agentUT.get_move(game, game.get_legal_moves(), lambda: float("inf")))
+        self.assertEqual(moves[0], moves[1])
+        self.assertEqual(tracer.nodes, agentUT.nodes_searched)
+        self.assertEqual(len(tracer.records), 10)
+        self.assertTrue(all(r.method == "alphabeta" and 0 <= r.depth <= 3
+                            for r in tracer.records))
+        self.assertNotIn("alphabeta", vars(game_agent.CustomPlayer()))
+
+    def test_tracer_accepts_keyword_arguments(self):
+        """ Test that traced searches can be called with keyword arguments """
+        from sample_players import improved_score
+        tracer = game_agent.SearchTracer()
+        agentUT = game_agent.CustomPlayer(score_fn=improved_score, tracer=tracer)
+        agentUT.time_left = lambda: float("inf")
+        game = isolation.Board(agentUT, "null_agent")
+        game.apply_move((3, 3))
+        game.apply_move((0, 0))
+        agentUT.alphabeta(game, 1, alpha=-5., beta=5., maximizing_player=False)
+        agentUT.minimax(game, 1, maximizing_player=False)
+        alphabeta_root = [r for r in tracer.records if r.method == "alphabeta"][-1]
+        self.assertEqual((alphabeta_root.depth, alphabeta_root.alpha, alphabeta_root.beta,
+                          alphabeta_root.maximizing_player), (1, -5., 5., False))
+        minimax_root = tracer.records[-1]
+        self.assertEqual((minimax_root.method, minimax_root.depth, minimax_root.alpha,
+                          minimax_root.maximizing_player), ("minimax", 1, None, False))
+
+
+class TimerCalibratorTest(unittest.TestCase):
+
+    def test_margin_follows_overruns(self):
+        """ Test that the timeout margin tracks a percentile of the overruns """
+        calibrator = game_agent.TimerCalibrator(initial=10., percentile=90.,
+                                                safety_factor=2., window=10, min_samples=5)
+        for overrun in [1., 1., 1., 1.]:
+            self.assertEqual(calibrator.record(overrun), 10.)
+        self.assertEqual(calibrator.record(1.), 2.)
+        for overrun in [3.] * 5:
+            calibrator.record(overrun)
+        self.assertEqual(calibrator.margin, 6.)
+        for overrun in [0.1] * 10:
+            calibrator.record(overrun)
+        self.assertEqual(calibrator.margin, calibrator.minimum)
+
+    def test_player_calibrates_on_timeout(self):
+        """ Test that timed-out searches update the player's margin """
+        from sample_players import improved_score
+        calibrator = game_agent.TimerCalibrator(min_samples=1, safety_factor=1.)
+        # the overrun includes the time spent reporting the statistics
+        agentUT = game_agent.CustomPlayer(score_fn=improved_score, method="alphabeta",
+                                          timer_calibrator=calibrator,
+                                          stats_callback=lambda stats: time.sleep(0.005))
+        game = isolation.Board(agentUT, "null_agent")
+        game.apply_move((3, 3))
+        game.apply_move((0, 0))
+        start = curr_time_millis()
+        time_left = lambda: 50 - (curr_time_millis() - start)
+        agentUT.get_move(game, game.get_legal_moves(), time_left)
+        self.assertEqual(len(calibrator.samples), 1)
+        self.assertGreaterEqual(calibrator.samples[0], 5.)
+        self.assertEqual(agentUT.TIMER_THRESHOLD, max(calibrator.minimum, calibrator.samples[0]))
+        self.assertGreater(time_left(), 0)
+
+
+class GameArchiveTest(unittest.TestCase):
+
+    def test_archive_round_trip(self):
+        """ Test writing games to an archive and reading them back by id """
+        import os
+        import tempfile
+        from isolation import archive
+        from sample_players import RandomPlayer
+
+        games = []
+        for _ in range(7):
+            player1, player2 = RandomPlayer(), RandomPlayer()
+            game = isolation.Board(player1, player2)
+            winner, history, termination = game.play(time_limit=None)
+            games.append((archive.moves_from_history(history),
+                          1 if winner is player1 else 2, termination))
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "games.iga")
+            with archive.GameArchiveWriter(path, block_size=3) as writer:
+                for moves, winner, termination in games[:5]:
+                    writer.add_game(moves, winner, termination)
+            with archive.GameArchiveWriter(path, block_size=3) as writer:
+                for moves, winner, termination in games[5:]:
+                    writer.add_game(moves, winner, termination)
+
+            with archive.GameArchiveReader(path) as reader:
+                self.assertEqual(len(reader), len(games))
+                for game_id in reversed(range(len(games))):
+                    moves, winner, termination = games[game_id]
+                    record = reader.read_game(game_id)
+                    self.assertEqual(record.moves, moves)
+                    self.assertEqual(record.winner, winner)
+                    self.assertEqual((record.width, record.height), (7, 7))
+                # the final (-1, -1) move of the losing player is not applied
+                positions = list(reader.positions(0))
+                self.assertEqual(len(positions), len(games[0][0]))
+                self.assertEqual(positions[0].move_count, 0)
+                self.assertFalse(positions[-1].get_legal_moves())
+            self.assertLess(os.path.getsize(path),
+                            sum(len(moves) + archive.RECORD_HEADER.size
+                                for moves, _, _ in games) + 64)
+
+    def test_archive_terminations(self):
+        """ Test that every termination reason can be archived """
+        import os
+        import tempfile
+        from isolation import archive
+
+        reasons = ["", "illegal move", "timeout", "crash", "unknown reason"]
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "games.iga")
+            with archive.GameArchiveWriter(path) as writer:
+                for reason in reasons:
+                    writer.add_game([(0, 0)], 1, reason)
+            with archive.GameArchiveReader(path) as reader:
+                self.assertEqual([reader.read_game(i).termination for i in range(len(reasons))],
+                                 reasons[:-1] + ["other"])
+
+
+class SelfPlayTest(unittest.TestCase):
+
+    def test_selfplay_samples(self):
+        """ Test that self-play writes labelled and deduplicated samples """
+        import tempfile
+        import selfplay
+
+        settings = {"width": 5, "height": 5, "depth": 1, "nodes": None,
+                    "score": "improved_score", "opening_plies": 0, "seed": 0}
+        with tempfile.TemporaryDirectory() as tmp:
+            # without random openings every game is the same
+            stats = selfplay.generate(tmp, 3, settings, shard_size=4)
+            samples = list(selfplay.read_samples(stats["shards"]))
+        self.assertEqual(len(samples), stats["samples"])
+        self.assertEqual(stats["duplicates"], 2 * stats["samples"])
+        self.assertEqual(len(stats["shards"]), (len(samples) + 3) // 4)
+        self.assertEqual(len({state for state, _, _ in samples}), len(samples))
+        for state, score, outcome in samples:
+            self.assertEqual(state, state.canonical())
+            self.assertIn(outcome, (1, -1))
+
+        with tempfile.TemporaryDirectory() as tmp:
+            # only the last position is remembered, so repeated games are kept
+            bounded = selfplay.generate(tmp, 3, settings, dedup_size=1)
+        self.assertEqual(bounded["samples"], 3 * stats["samples"])
+
+
+class TunerTest(unittest.TestCase):
+
+    def test_reflection_factor_with_unplaced_player(self):
+        """ Test that the reflection factor scores boards where a player is not placed """
+        game = isolation.Board("player1", "player2")
+        game.apply_move((3, 3))
+        for player in ("player1", "player2"):
+            self.assertEqual(game_agent.get_reflection_available_factor(game, player), 1.0)
+            weighted = game_agent.WeightedScore([0., 0., 1., 0., 0., 0.])
+            self.assertEqual(weighted(game, player), 1.0)
+
+    def test_weighted_score(self):
+        """ Test that weighted scores reproduce the hand-weighted heuristics """
+        import os
+        import tempfile
+        import tournament
+        positions = tournament.random_positions(30, seed=2)
+        combined = game_agent.WeightedScore([0, 1, 1, 1, 0, 0])
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "weights.json")
+            combined.save(path)
+            loaded = game_agent.WeightedScore.load(path)
+        for game in positions:
+            player = game.active_player
+            self.assertEqual(combined(game, player),
+                             game_agent.heuristic_combined_1_2_3(game, player))
+            self.assertEqual(loaded(game, player), combined(game, player))
+        self.assertEqual(pickle.loads(pickle.dumps(combined)).weights, combined.weights)
+
+    def test_texel_fit(self):
+        """ Test that the regression recovers the sign of predictive features """
+        import tuner
+        rng = random.Random(0)
+        features, outcomes = [], []
+        for _ in range(400):
+            x = [rng.uniform(-5, 5), rng.uniform(-5, 5)]
+            features.append(x)
+            outcomes.append(1. if 2 * x[0] + rng.gauss(0, 1) > 0 else 0.)
+        weights = tuner.texel(features, outcomes, epochs=200)
+        self.assertGreater(weights[0], 0.5)
+        self.assertLess(abs(weights[1]), 0.25 * weights[0])
+
+
+class LearnedScoreTest(unittest.TestCase):
+
+    def setUp(self):
+        try:
+            import numpy
+        except ImportError:
+            self.skipTest("NumPy is not installed")
+
+    def test_features_match_board(self):
+        """ Test the learned score features against the board methods """
+        import learned_score
+        import tournament
+        for game in tournament.random_positions(30, seed=4):
+            player, opponent = game.active_player, game.inactive_player
+            features = dict(zip(learned_score.FEATURE_NAMES,
+                                learned_score.extract_features(game, player)))
+            self.assertEqual(features["to_move"], 1.)
+            self.assertEqual(features["own_mobility"], game.get_mobility(player))
+            self.assertEqual(features["opp_mobility"], game.get_mobility(opponent))
+            reach = game_agent.get_reachability_factors(game, player)
+            self.assertEqual((features["own_reachable"], features["opp_reachable"],
+                              features["own_first"], features["opp_first"]), reach)
+            self.assertEqual(features["own_center"],
+                             float((3, 3) in game.get_legal_moves(player)))
+
+    def test_model_round_trip(self):
+        """ Test training, saving, loading and batch scoring of models """
+        import os
+        import tempfile
+        import numpy as np
+        import learned_score
+        import tournament
+
+        games = tournament.random_positions(40, seed=6)
+        features = np.array([learned_score.extract_features(g, "player1") for g in games])
+        labels = (features[:, 1] > features[:, 2]).astype(float)
+        for hidden in (0, 4):
+            model = learned_score.train(features, labels, hidden, epochs=20)
+            with tempfile.TemporaryDirectory() as tmp:
+                path = os.path.join(tmp, "model.npz")
+                model.save(path)
+                loaded = learned_score.LearnedScore.load(path)
+            self.assertEqual(loaded.hidden, hidden)
+            scores = [model(g, "player1") for g in games]
+            for a, b in zip(scores, [loaded(g, "player1") for g in games]):
+                self.assertAlmostEqual(a, b)
+            for a, b in zip(scores, loaded.batch(games, "player1")):
+                self.assertAlmostEqual(a, b)
+
+
+class ProfilingTest(unittest.TestCase):
+
+    def play_games(self, seconds=0.3):
+        """ Play games for long enough to collect plenty of stack samples """
+        from sample_players import improved_score
+        player1 = game_agent.CustomPlayer(score_fn=improved_score, search_depth=2,
+                                          method="alphabeta", iterative=False)
+        player2 = game_agent.CustomPlayer(score_fn=improved_score, search_depth=2,
+                                          method="alphabeta", iterative=False)
+        start = curr_time_millis()
+        while curr_time_millis() - start < 1000 * seconds:
+            isolation.Board(player1, player2, 5, 5).play(time_limit=None)
+
+    def test_profile_outputs(self):
+        """ Test that both profiling modes write their files and find the search """
+        import contextlib
+        import io
+        import os
+        import pstats
+        import tempfile
+        import profiling
+        with tempfile.TemporaryDirectory() as tmp:
+            for mode in profiling.MODES:
+                out = os.path.join(tmp, mode)
+                summary = io.StringIO()
+                with contextlib.redirect_stdout(summary):
+                    with profiling.Profiler(mode, out, interval=0.001):
+                        self.play_games()
+                self.assertIn("forecast_move", summary.getvalue())
+                with open(out + ".collapsed") as f:
+                    lines = f.read().splitlines()
+                self.assertTrue(lines)
+                for line in lines:
+                    stack, weight = line.rsplit(" ", 1)
+                    self.assertGreater(int(weight), 0)
+                self.assertTrue(any("alphabeta" in line for line in lines))
+                self.assertEqual(os.path.exists(out + ".pstats"), mode == "cprofile")
+            stats = pstats.Stats(os.path.join(tmp, "cprofile.pstats"))
+            self.assertTrue(any(func[2] == "get_legal_moves" for func in stats.stats))
+
+
+class BenchmarkTest(unittest.TestCase):
+
+    def test_benchmarks_and_regressions(self):
+        """ Test that every benchmark runs and slowdowns past the threshold are flagged """
+        import benchmark
+        results = benchmark.run_benchmarks(sizes=[(5, 5)], num_positions=5, repeat=1)
+        self.assertEqual(list(results), ["5x5/" + name for name in benchmark.benchmarks()])
+        self.assertTrue(all(ns > 0 for ns in results.values()))
+        self.assertEqual(len(benchmark.corpus(5, 5, 5)), 5)
+
+        baseline = {"5x5/copy": 100., "5x5/utility": 100., "7x7/copy": 100.}
+        current = {"5x5/copy": 120., "5x5/utility": 120., "5x5/null_score": 1.}
+        rows = benchmark.compare(current, baseline, threshold=0.1, thresholds={"copy": 0.25})
+        self.assertEqual([(key, regressed) for key, _, _, _, regressed in rows],
+                         [("5x5/copy", False), ("5x5/utility", True)])
+
+
+class PerftTest(unittest.TestCase):
+
+    def test_reference_counts(self):
+        """ Test that the move generator reproduces the reference perft counts """
+        import perft
+        for name, depth, nodes, expected, _ in perft.run(isolation.Board, depth=3):
+            self.assertEqual(nodes, expected, "{} at depth {}".format(name, depth))
+        game = perft.setup(isolation.Board, perft.POSITIONS[5])
+        self.assertEqual(sum(perft.divide(game, 4).values()), perft.POSITIONS[5].counts[3])
+
+
+class SearchBenchmarkTest(unittest.TestCase):
+
+    def test_alphabeta_agrees_with_minimax(self):
+        """ Test that alpha-beta finds the minimax move and value with fewer nodes """
+        import search_benchmark
+        rows = search_benchmark.run(max_depth=3)
+        self.assertEqual(len(rows), 3 * 3 * len(search_benchmark.POSITIONS))
+        results = {(r["position"], r["method"], r["depth"]): r for r in rows}
+        for (position, method, depth), row in results.items():
+            self.assertEqual(row["ebf"] is None, depth == 1)
+            if method == "alphabeta":
+                reference = results[(position, "minimax", depth)]
+                self.assertEqual(row["score"], reference["score"])
+                self.assertLessEqual(row["nodes"], reference["nodes"])
+            elif method == "alphabeta_batch":
+                reference = results[(position, "alphabeta", depth)]
+                for field in ("nodes", "leaf_evaluations", "move", "score"):
+                    self.assertEqual(row[field], reference[field])
+        with self.assertRaises(ValueError):
+            search_benchmark.run(["alphabeta_batch"], 1, "custom_score")
+        totals = search_benchmark.totals(rows)
+        self.assertEqual(sum(t["nodes"] for t in totals), sum(r["nodes"] for r in rows))
+
+
+class EngineTest(unittest.TestCase):
+
+    def test_protocol(self):
+        """ Test that the engine answers commands and keeps its cache across games """
+        import io
+        import engine
+        out = io.StringIO()
+        engineUT = engine.Engine(out)
+        for line in ["isolation", "size 5 5", "position startpos moves 2,2 0,0",
+                     "go depth 3", "isready"]:
+            self.assertTrue(engineUT.handle(line))
+        lines = out.getvalue().splitlines()
+        self.assertEqual(lines[0], "id name " + engine.ENGINE_NAME)
+        self.assertIn("isolationok", lines)
+        self.assertEqual(lines[-1], "readyok")
+        self.assertTrue(lines[-3].startswith("info depth 3 nodes"))
+        game = isolation.Board("p1", "p2", 5, 5)
+        game.apply_move((2, 2))
+        game.apply_move((0, 0))
+        self.assertIn(engine.parse_move(lines[-2].split()[1]), game.get_legal_moves())
+
+        cache_entries = len(engineUT.player.eval_cache.entries)
+        self.assertGreater(cache_entries, 0)
+        engineUT.handle("newgame")
+        self.assertEqual(len(engineUT.player.eval_cache.entries), cache_entries)
+        engineUT.handle("position startpos moves 2,2 9,9")
+        self.assertIn("info string illegal move: 9,9", out.getvalue())
+        self.assertFalse(engineUT.handle("quit"))
+
+    def test_stop(self):
+        """ Test that stop ends an unlimited search with a move """
+        import io
+        import engine
+        out = io.StringIO()
+        engineUT = engine.Engine(out)
+        engineUT.handle("go")
+        time.sleep(0.05)
+        engineUT.handle("stop")
+        self.assertTrue(out.getvalue().splitlines()[-1].startswith("bestmove "))
+
+    def test_client_game(self):
+        """ Test a game between two engine processes """
+        import engine
+        engines = [engine.EngineClient(options={"Score": "improved_score"}) for _ in range(2)]
+        try:
+            winner, moves, termination = engine.play_game(engines, 5, 5, depth=2)
+        finally:
+            for client in engines:
+                client.quit()
+        self.assertIn(winner, (0, 1))
+        self.assertEqual(termination, "illegal move")
+        game = isolation.Board("p1", "p2", 5, 5)
+        for move in moves:
+            self.assertIn(move, game.get_legal_moves())
+            game.apply_move(move)
+
+
+class OrchestratorTest(unittest.TestCase):
+
+    # Engine that answers the handshake, then hangs or exits on "go"
+    FAKE_ENGINE = "\n".join([
+        "import sys",
+        "for line in sys.stdin:",
+        "    command = line.split()[0] if line.split() else ''",
+        "    if command == 'isolation': print('isolationok', flush=True)",
+        "    elif command == 'isready': print('readyok', flush=True)",
+        "    elif command == 'go' and sys.argv[1] == 'hang':",
+        "        while True: pass",
+        "    elif command == 'go': sys.exit(1)"])
+
+    def test_round(self):
+        """ Test that matches between engines produce tournament game records """
+        import orchestrator
+        specs = [orchestrator.AgentSpec("AB_Open", {"Score": "open_move_score"}, 1),
+                 orchestrator.AgentSpec("ID_Improved", {"Score": "improved_score"}, 2)]
+        jobs = [(0, 0, 0, "seed:0"), (0, 1, 0, "seed:1")]
+        results, restarts = orchestrator.run_matches(specs, jobs, 2, movetime=None, nodes=200)
+        self.assertEqual(restarts, 0)
+        for (opponent_idx, score_1, score_2, games), job in zip(results, jobs):
+            self.assertEqual((opponent_idx, score_1 + score_2), (0, 2))
+            for game_idx, game in enumerate(games):
+                first = (job[1] + game_idx) % 2
+                self.assertEqual(game["players"][0], ["ID_Improved", "AB_Open"][first])
+                self.assertEqual(len(game["move_times"]), len(game["moves"]))
+                # the losing move is recorded but never applied
+                self.assertEqual(game["termination"], "illegal move")
+                self.assertEqual(game["moves"][-1], (-1, -1))
+                moves = (game["opening"] + game["moves"])[:-1]
+                board = isolation.Board("p1", "p2")
+                for move in moves:
+                    self.assertIn(move, board.get_legal_moves())
+                    board.apply_move(move)
+
+    def test_hung_and_crashed_engines(self):
+        """ Test that engines missing the deadline or exiting lose and are restarted """
+        import orchestrator
+        for mode, termination in (("hang", "timeout"), ("crash", "crash")):
+            command = [sys.executable, "-c", self.FAKE_ENGINE, mode]
+            specs = [orchestrator.AgentSpec(name, {}, None) for name in ("a", "b")]
+            results, restarts = orchestrator.run_matches(specs, [(0, 0, 0, "seed")], 1,
+                                                         movetime=20, command=command)
+            games = results[0][3]
+            self.assertEqual([g["termination"] for g in games], [termination] * 2)
+            self.assertEqual([g["winner"] for g in games], [2, 2])
+            self.assertEqual(restarts, 2)
+
+
+class DistributedTest(unittest.TestCase):
+
+    def test_local_workers(self):
+        """ Test that workers sharing a queue directory play every match of a round """
+        import distributed
+        import multiprocessing
+        import tempfile
+        opponents, agents = distributed.agent_specs("improved_score")
+        with tempfile.TemporaryDirectory() as directory:
+            workers = [multiprocessing.Process(target=distributed.worker,
+                                               args=(directory, "w{}".format(i), 1.))
+                       for i in range(2)]
+            for process in workers:
+                process.start()
+            win_ratio = distributed.play_round(directory, opponents[:2], agents[0], 1,
+                                               seed=0, time_limit=None, depth=1)
+            for process in workers:
+                process.join()
+            queue = distributed.JobQueue(directory)
+            jobs = distributed.round_jobs(opponents[:2], agents[0], 1, 0, None, 1)
+            results = [queue.result(job["id"]) for job in jobs]
+            self.assertEqual([sum(r["score"]) for r in results], [2] * 4)
+            self.assertTrue(0. <= win_ratio <= 100.)
+            self.assertFalse(os.listdir(os.path.join(directory, distributed.PENDING)))
+
+    def test_expired_lease(self):
+        """ Test that the job of a worker that left is requeued and finished by another """
+        import distributed
+        import tempfile
+        from unittest import mock
+        opponents, agents = distributed.agent_specs("improved_score")
+        job = distributed.round_jobs(opponents[:1], agents[0], 1, 0, None, 1)[0]
+        with tempfile.TemporaryDirectory() as directory:
+            queue = distributed.JobQueue(directory)
+            self.assertTrue(queue.publish(job))
+            claimed, lease = queue.claim("gone")
+            self.assertEqual(claimed["id"], job["id"])
+            self.assertEqual(queue.claim("other"), (None, None))
+            self.assertFalse(queue.publish(job))
+            self.assertEqual(queue.reclaim(), 0)
+            os.utime(lease, (0, 0))
+            self.assertEqual(queue.reclaim(), 1)
+
+            # a lease is not reclaimed between its rename and the read of the job,
+            # and a worker whose lease was reclaimed meanwhile skips the job
+            rename = os.rename
+            for timeout, claimed in ((distributed.LEASE_TIMEOUT, True), (-1., False)):
+                def racing_rename(src, dst):
+                    rename(src, dst)
+                    if os.path.dirname(src).endswith(distributed.PENDING):
+                        queue.reclaim(timeout)
+                with mock.patch.object(os, "rename", racing_rename):
+                    job_claimed, lease = queue.claim("racing")
+                self.assertEqual(job_claimed is not None, claimed)
+                if claimed:
+                    os.utime(lease, (0, 0))
+                    self.assertEqual(queue.reclaim(), 1)
+            self.assertEqual(distributed.worker(directory, "other", idle_exit=0.), 1)
+            self.assertEqual(queue.result(job["id"])["worker"], "other")
+            # a restarted coordinator does not publish finished jobs again
+            self.assertFalse(queue.publish(job))
+
+
+class SupervisorTest(unittest.TestCase):
+
+    class HangingPlayer(object):
+        def __init__(self, release):
+            self.release = release
+
+        def get_move(self, game, legal_moves, time_left):
+            self.release.wait()
+            return legal_moves[0]
+
+    def test_hung_player_times_out(self):
+        """ Test that supervised moves are abandoned at the deadline """
+        from threading import Event
+        from sample_players import RandomPlayer
+        release = Event()
+        try:
+            for supervisor in (isolation.ThreadSupervisor(), isolation.ProcessSupervisor()):
+                hanging = self.HangingPlayer(release)
+                game = isolation.Board(RandomPlayer(), hanging)
+                start = curr_time_millis()
+                winner, _, termination = game.play(time_limit=50, supervisor=supervisor)
+                self.assertLess(curr_time_millis() - start, 1000)
+                self.assertEqual((termination, supervisor.abandoned), ("timeout", 1))
+                self.assertIsNot(winner, hanging)
+                # the moves of the other player were supervised and measured
+                self.assertEqual(supervisor.summary()["moves"], 1)
+        finally:
+            release.set()
+
+    def test_supervised_match_records(self):
+        """ Test that supervised matches record the overhead of every move """
+        import tournament
+        player = game_agent.CustomPlayer(search_depth=1, iterative=False)
+        records = []
+        tournament.play_match(player, game_agent.CustomPlayer(search_depth=1, iterative=False),
+                              random.Random(0), 150, records, isolation.ProcessSupervisor())
+        for record in records:
+            self.assertEqual(record["supervision"]["abandoned"], 0)
+            self.assertEqual(len(record["supervision"]["overheads"]), len(record["moves"]))
+            self.assertTrue(all(overhead >= 0 for overhead in record["supervision"]["overheads"]))
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,155 @@
+"""This file contains NumPy implementations of the sample heuristics that
+score a whole batch of game states at once. They are used by `CustomPlayer`
+to evaluate every child of a frontier node in one call (see the
+`batch_score_fn` option of `game_agent.CustomPlayer`).
+
+Each batch function returns exactly the same values as its scalar
+counterpart in `sample_players.py`, including the +/-infinity scores of
+terminal states, so searches using either one make the same decisions.
+
+Run `python batch_scores.py` to compare the throughput of scalar and batched
+evaluation on random positions. With the few children of a typical 7x7
+node (about 5), the fixed cost of the NumPy calls outweighs the vectorized
+arithmetic, while scalar mobility is a table lookup kept up to date by
+`Board.apply_move()`: batched evaluation is currently 4-6x slower than
+scalar evaluation (about 155k against 690k-1M evaluations per second), so
+batching only pays off for heuristics far more expensive than these.
+"""
+from functools import lru_cache
+
+import numpy as np
+
+from isolation.bitboard import knight_neighbours
+
+
+@lru_cache(maxsize=None)
+def _neighbour_matrix(width, height):
+    """Return the (cells + 1, cells) boolean matrix whose row `c` marks the
+    knight neighbours of cell `c`. The extra last row, indexed by -1 for a
+    player that has not been placed yet, marks every cell.
+    """
+    cells = width * height
+    matrix = np.zeros((cells + 1, cells), dtype=bool)
+    for cell, neighbours in enumerate(knight_neighbours(width, height)):
+        matrix[cell, list(neighbours)] = True
+    matrix[-1] = True
+    return matrix
+
+
+def _batch_features(games, player):
+    """Return the mobility of `player` and of its opponent on each board,
+    and a mask of the boards where `player` holds initiative.
+
+    The occupancy bitmasks of the boards are stacked into an (n, cells)
+    array of open cells, and the mobility of every board is counted at once
+    by masking it with the knight neighbours of the player locations.
+    """
+    width, height = games[0].width, games[0].height
+    cells = width * height
+    num_bytes = (cells + 7) // 8
+    opponent = games[0].get_opponent(player)
+
+    occupancy = b"".join(g.get_occupancy().to_bytes(num_bytes, "little") for g in games)
+    blocked = np.unpackbits(np.frombuffer(occupancy, dtype=np.uint8).reshape(len(games), -1),
+                            axis=1, count=cells, bitorder="little")
+    open_cells = blocked == 0
+
+    locations = np.array([[-1 if loc is None else loc[0] * width + loc[1]
+                           for loc in (g.get_player_location(player),
+                                       g.get_player_location(opponent))]
+                          for g in games], dtype=np.intp)
+    neighbours = _neighbour_matrix(width, height)[locations]  # (n, 2, cells)
+    own_moves, opp_moves = (neighbours & open_cells[:, None, :]).sum(axis=2).T
+    own_active = np.array([g.active_player == player for g in games], dtype=bool)
+    return own_moves, opp_moves, own_active
+
+
+def _apply_terminal_scores(scores, own_moves, opp_moves, own_active):
+    """Overwrite the scores of finished games with +/-infinity, matching
+    `Board.is_loser()` and `Board.is_winner()`.
+    """
+    active_moves = np.where(own_active, own_moves, opp_moves)
+    finished = active_moves == 0
+    scores[finished & own_active] = float("-inf")
+    scores[finished & ~own_active] = float("inf")
+    return scores
+
+
+def open_move_score_batch(games, player):
+    """Batched equivalent of `sample_players.open_move_score`.
+
+    Parameters
+    ----------
+    games : list<`isolation.Board`>
+        Game states with the same board size and the same registered players.
+
+    player : hashable
+        One of the objects registered by the game objects as a valid player.
+
+    Returns
+    ----------
+    numpy.ndarray
+        The heuristic value of each game state
+    """
+    own_moves, opp_moves, own_active = _batch_features(games, player)
+    scores = own_moves.astype(float)
+    return _apply_terminal_scores(scores, own_moves, opp_moves, own_active)
+
+
+def improved_score_batch(games, player):
+    """Batched equivalent of `sample_players.improved_score`.
+
+    Parameters
+    ----------
+    games : list<`isolation.Board`>
+        Game states with the same board size and the same registered players.
+
+    player : hashable
+        One of the objects registered by the game objects as a valid player.
+
+    Returns
+    ----------
+    numpy.ndarray
+        The heuristic value of each game state
+    """
+    own_moves, opp_moves, own_active = _batch_features(games, player)
+    scores = (own_moves - opp_moves).astype(float)
+    return _apply_terminal_scores(scores, own_moves, opp_moves, own_active)
+
+
+if __name__ == "__main__":
+    import random
+    import timeit
+
+    from isolation import Board
+    from sample_players import open_move_score, improved_score
+
+    # Collect the children of random mid-game positions as evaluation batches
+    random.seed(0)
+    batches = []
+    while len(batches) < 200:
+        game = Board("player1", "player2")
+        for _ in range(random.randint(2, 20)):
+            moves = game.get_legal_moves()
+            if not moves:
+                break
+            game.apply_move(random.choice(moves))
+        moves = game.get_legal_moves()
+        if moves:
+            batches.append([game.forecast_move(m) for m in moves])
+    num_evals = sum(len(batch) for batch in batches)
+
+    for scalar_fn, batch_fn in [(open_move_score, open_move_score_batch),
+                                (improved_score, improved_score_batch)]:
+        for batch in batches:
+            expected = [scalar_fn(g, "player1") for g in batch]
+            assert list(batch_fn(batch, "player1")) == expected
+
+        scalar_time = min(timeit.repeat(
+            lambda: [[scalar_fn(g, "player1") for g in batch] for batch in batches],
+            number=1, repeat=5))
+        batch_time = min(timeit.repeat(
+            lambda: [batch_fn(batch, "player1") for batch in batches],
+            number=1, repeat=5))
+        print("{:<16} scalar {:>10.0f} evals/s   batched {:>10.0f} evals/s".format(
+            scalar_fn.__name__, num_evals / scalar_time, num_evals / batch_time))
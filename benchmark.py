@@ -0,0 +1,248 @@
+"""
+Micro-benchmarks of the `Board` primitives and of every heuristic, so that
+changes to the board or the score functions cannot silently make them
+slower.
+
+Each benchmark runs over a fixed corpus of reproducible positions at several
+board sizes, and reports the best time per operation in nanoseconds over a
+few repeats. Results can be saved as a baseline JSON file and later runs
+compared against it; a benchmark regresses when it is slower than the
+baseline by more than a threshold (10% by default), and the script then
+exits with status 1.
+
+    python benchmark.py --save baseline.json
+    python benchmark.py --baseline baseline.json --threshold 0.15 \\
+                        --threshold-for copy=0.25
+
+Times depend on the machine, so only compare against baselines recorded on
+the same machine and Python version.
+"""
+
+import argparse
+import json
+import platform
+import random
+import sys
+import time
+
+from collections import OrderedDict
+
+from isolation import Board
+from game_agent import SCORE_FUNCTIONS
+
+SIZES = [(5, 5), (7, 7), (9, 9)]
+NUM_POSITIONS = 200
+REPEAT = 5
+THRESHOLD = 0.10
+
+
+def corpus(width, height, num_positions=NUM_POSITIONS, seed=0):
+    """
+    Return reproducible positions of the given size, each reached by a
+    random number of random moves from an empty board and with at least
+    one legal move for the player to move.
+    """
+    rng = random.Random("{}x{}:{}".format(width, height, seed))
+    positions = []
+    while len(positions) < num_positions:
+        game = Board("player1", "player2", width, height)
+        for _ in range(rng.randint(2, width * height // 2)):
+            moves = game.get_legal_moves()
+            if not moves:
+                break
+            game.apply_move(rng.choice(moves))
+        if game.get_legal_moves():
+            positions.append(game)
+    return positions
+
+
+def bench_copy(positions):
+    for game in positions:
+        game.copy()
+
+
+def bench_forecast_move(positions):
+    for game in positions:
+        game.forecast_move(game.get_legal_moves()[0])
+
+
+def bench_get_legal_moves(positions):
+    for game in positions:
+        game.get_legal_moves()
+
+
+def bench_get_blank_spaces(positions):
+    for game in positions:
+        game.get_blank_spaces()
+
+
+def bench_utility(positions):
+    for game in positions:
+        game.utility(game.active_player)
+
+
+def score_benchmark(score_fn):
+    def bench(positions):
+        for game in positions:
+            score_fn(game, game.active_player)
+    return bench
+
+
+def time_per_op(bench, positions, repeat=REPEAT):
+    """ Return the best time in nanoseconds per position over `repeat` runs. """
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        bench(positions)
+        elapsed = 1e9 * (time.perf_counter() - start)
+        best = elapsed if best is None else min(best, elapsed)
+    return best / len(positions)
+
+
+def time_apply_move(positions, repeat=REPEAT):
+    """
+    Return the best time in nanoseconds of `apply_move`, applied to fresh
+    copies of the positions so the copying is not timed.
+    """
+    moves = [game.get_legal_moves()[0] for game in positions]
+    best = None
+    for _ in range(repeat):
+        copies = [game.copy() for game in positions]
+        start = time.perf_counter()
+        for game, move in zip(copies, moves):
+            game.apply_move(move)
+        elapsed = 1e9 * (time.perf_counter() - start)
+        best = elapsed if best is None else min(best, elapsed)
+    return best / len(positions)
+
+
+def benchmarks():
+    """ Return the benchmarks as an OrderedDict from name to function of positions. """
+    benches = OrderedDict([
+        ("copy", bench_copy),
+        ("forecast_move", bench_forecast_move),
+        ("get_legal_moves", bench_get_legal_moves),
+        ("get_blank_spaces", bench_get_blank_spaces),
+        ("apply_move", None),
+        ("utility", bench_utility),
+    ])
+    for name, score_fn in sorted(SCORE_FUNCTIONS.items()):
+        benches[name] = score_benchmark(score_fn)
+    return benches
+
+
+def run_benchmarks(sizes=SIZES, num_positions=NUM_POSITIONS, repeat=REPEAT, names=None):
+    """
+    Run the named benchmarks (all of them when `names` is None) at every
+    board size.
+
+    Returns
+    ----------
+    OrderedDict
+        Nanoseconds per operation keyed by "<width>x<height>/<benchmark>".
+    """
+    results = OrderedDict()
+    for width, height in sizes:
+        positions = corpus(width, height, num_positions)
+        for name, bench in benchmarks().items():
+            if names is not None and name not in names:
+                continue
+            key = "{}x{}/{}".format(width, height, name)
+            if bench is None:
+                results[key] = time_apply_move(positions, repeat)
+            else:
+                results[key] = time_per_op(bench, positions, repeat)
+    return results
+
+
+def compare(results, baseline, threshold=THRESHOLD, thresholds=None):
+    """
+    Compare results to baseline results of the same benchmarks. The
+    threshold of a benchmark is looked up in `thresholds` by its full key,
+    then by its benchmark name, before falling back to `threshold`.
+
+    Returns
+    ----------
+    list<(str, float, float, float, bool)>
+        The key, baseline and current nanoseconds, ratio of current to
+        baseline time, and whether it is a regression, for every benchmark
+        present in both.
+    """
+    thresholds = thresholds or {}
+    rows = []
+    for key, ns in results.items():
+        if key not in baseline:
+            continue
+        limit = thresholds.get(key, thresholds.get(key.split("/", 1)[1], threshold))
+        ratio = ns / baseline[key]
+        rows.append((key, baseline[key], ns, ratio, ratio > 1. + limit))
+    return rows
+
+
+def save(path, results):
+    with open(path, "w") as f:
+        json.dump({"python": platform.python_version(), "machine": platform.machine(),
+                   "results": results}, f, indent=2)
+
+
+def load(path):
+    with open(path) as f:
+        return json.load(f)["results"]
+
+
+def parse_size(text):
+    width, height = text.lower().split("x")
+    return int(width), int(height)
+
+
+def parse_threshold(text):
+    name, value = text.split("=")
+    return name, float(value)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the Board primitives and heuristics.")
+    parser.add_argument("--sizes", nargs="+", type=parse_size, metavar="WxH",
+                        default=SIZES, help="board sizes (default: 5x5 7x7 9x9)")
+    parser.add_argument("--positions", type=int, default=NUM_POSITIONS,
+                        help="positions per board size")
+    parser.add_argument("--repeat", type=int, default=REPEAT,
+                        help="runs per benchmark; the fastest is reported")
+    parser.add_argument("--only", nargs="+", metavar="NAME", choices=list(benchmarks()),
+                        help="run only these benchmarks")
+    parser.add_argument("--save", metavar="PATH", help="write the results to a baseline file")
+    parser.add_argument("--baseline", metavar="PATH", help="compare against a baseline file")
+    parser.add_argument("--threshold", type=float, default=THRESHOLD,
+                        help="allowed slowdown relative to the baseline (0.1 = 10%%)")
+    parser.add_argument("--threshold-for", type=parse_threshold, action="append", default=[],
+                        metavar="NAME=VALUE",
+                        help="threshold for one benchmark, by name (copy) or key (7x7/copy)")
+    args = parser.parse_args()
+
+    results = run_benchmarks(args.sizes, args.positions, args.repeat, args.only)
+    if args.save:
+        save(args.save, results)
+
+    if not args.baseline:
+        print("\nNanoseconds per operation:")
+        print("----------")
+        for key, ns in results.items():
+            print("{!s:<36}{:>12.0f}".format(key, ns))
+        return
+
+    rows = compare(results, load(args.baseline), args.threshold, dict(args.threshold_for))
+    print("\nNanoseconds per operation:")
+    print("----------")
+    print("{!s:<36}{:>12}{:>12}{:>9}".format("Benchmark", "Baseline", "Current", "Ratio"))
+    for key, base_ns, ns, ratio, regressed in rows:
+        print("{!s:<36}{:>12.0f}{:>12.0f}{:>9.2f}{}".format(
+            key, base_ns, ns, ratio, "  REGRESSION" if regressed else ""))
+    regressions = [row[0] for row in rows if row[4]]
+    if regressions:
+        print("\n{} benchmark(s) regressed: {}".format(len(regressions), ", ".join(regressions)))
+        sys.exit(1)
+    print("\nNo regressions")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,319 @@
+"""
+Spread the matches of a tournament round across several machines through a
+job queue kept in a shared directory (e.g. on NFS), with one coordinator and
+any number of workers.
+
+    python distributed.py coordinator --queue /shared/queue --matches 20
+    python distributed.py worker --queue /shared/queue      # on every machine
+
+The coordinator publishes one job file per match, with the agent specs, the
+seed of the match (which also draws its opening, see
+`tournament.play_round_match()`) and the move time limit or search budget.
+Workers claim a job by renaming it into the leased directory, which only
+one of them can do, play the match, and write the result back. While a
+match is being played the worker touches its lease every `HEARTBEAT`
+seconds; when a lease has not been touched for `LEASE_TIMEOUT` seconds the
+coordinator assumes the worker left and puts the job back in the queue. So
+workers can join and leave at any time, and a coordinator that is
+restarted on the same queue resumes the round, keeping the results already
+written. Lease ages are measured against file modification times, so the
+clocks of the machines must roughly agree.
+
+Pass `--local-workers N` to the coordinator to start N worker processes on
+the same machine, e.g. to try out the queue.
+"""
+
+import argparse
+import hashlib
+import json
+import multiprocessing
+import os
+import socket
+import threading
+import time
+
+from game_agent import CustomPlayer, SCORE_FUNCTIONS
+from sample_players import RandomPlayer
+from tournament import NUM_MATCHES, TIME_LIMIT, Agent, match_seed, play_round_match
+
+HEARTBEAT = 5.  # seconds between lease renewals
+LEASE_TIMEOUT = 30.  # seconds after the last renewal when a lease expires
+POLL_INTERVAL = 0.5  # seconds between checks of the queue
+
+PENDING, LEASED, RESULTS = "pending", "leased", "results"
+STOP_FILE = "stop"
+
+
+def agent_specs(score):
+    """
+    Return the specs of the opponents of `tournament.py` and of its agents
+    under test. A spec names an agent and holds the arguments of its
+    `CustomPlayer`, with the score function by name, or the kind "random".
+    """
+    opponents = [{"name": "Random", "kind": "random"}]
+    for prefix, method, depth in (("MM", "minimax", 3), ("AB", "alphabeta", 5)):
+        for name, score_fn in (("Null", "null_score"), ("Open", "open_move_score"),
+                               ("Improved", "improved_score")):
+            opponents.append({"name": prefix + "_" + name, "kind": "custom", "score": score_fn,
+                              "args": {"search_depth": depth, "method": method,
+                                       "iterative": False}})
+    test_agents = [{"name": name, "kind": "custom", "score": score_fn,
+                    "args": {"method": "alphabeta", "iterative": True}}
+                   for name, score_fn in (("ID_Improved", "improved_score"), ("Student", score))]
+    return opponents, test_agents
+
+
+def make_agent(spec):
+    if spec["kind"] == "random":
+        return Agent(RandomPlayer(), spec["name"])
+    return Agent(CustomPlayer(score_fn=SCORE_FUNCTIONS[spec["score"]], **spec["args"]),
+                 spec["name"])
+
+
+def write_json(path, data):
+    """ Write a file so that readers only ever see it complete. """
+    tmp = "{}.{}.tmp".format(path, os.getpid())
+    with open(tmp, "w") as f:
+        json.dump(data, f)
+    os.replace(tmp, path)
+
+
+def read_json(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+class JobQueue(object):
+    """ The job, lease and result files of a queue directory. """
+
+    def __init__(self, directory):
+        self.directory = directory
+        for name in (PENDING, LEASED, RESULTS):
+            os.makedirs(os.path.join(directory, name), exist_ok=True)
+
+    def path(self, *parts):
+        return os.path.join(self.directory, *parts)
+
+    def publish(self, job):
+        """ Add a job unless it is already queued, leased or finished. """
+        job_id = job["id"]
+        if (os.path.exists(self.path(RESULTS, job_id + ".json")) or
+                os.path.exists(self.path(PENDING, job_id + ".json")) or
+                any(name.startswith(job_id + "@") for name in os.listdir(self.path(LEASED)))):
+            return False
+        write_json(self.path(PENDING, job_id + ".json"), job)
+        return True
+
+    def claim(self, worker_id):
+        """ Return a pending job and the path of its lease, or (None, None). """
+        for name in sorted(os.listdir(self.path(PENDING))):
+            if not name.endswith(".json"):
+                continue
+            pending = self.path(PENDING, name)
+            lease = self.path(LEASED, "{}@{}.json".format(name[:-len(".json")], worker_id))
+            try:
+                # A renamed file keeps its modification time, so touch it first
+                # for the lease not to look expired to reclaim()
+                os.utime(pending)
+                os.rename(pending, lease)
+                return read_json(lease), lease
+            except FileNotFoundError:
+                continue  # claimed by another worker, or the lease was reclaimed
+        return None, None
+
+    def finish(self, job, lease, result):
+        write_json(self.path(RESULTS, job["id"] + ".json"), result)
+        try:
+            os.remove(lease)
+        except FileNotFoundError:
+            pass  # the lease expired and the job was put back
+
+    def reclaim(self, timeout=LEASE_TIMEOUT):
+        """ Put the jobs of expired leases back in the queue; return how many. """
+        reclaimed = 0
+        now = time.time()
+        for name in os.listdir(self.path(LEASED)):
+            lease = self.path(LEASED, name)
+            job_id = name.split("@", 1)[0]
+            try:
+                if now - os.path.getmtime(lease) < timeout:
+                    continue
+                if os.path.exists(self.path(RESULTS, job_id + ".json")):
+                    os.remove(lease)
+                else:
+                    os.rename(lease, self.path(PENDING, job_id + ".json"))
+                    reclaimed += 1
+            except FileNotFoundError:
+                pass  # finished or reclaimed meanwhile
+        return reclaimed
+
+    def result(self, job_id):
+        path = self.path(RESULTS, job_id + ".json")
+        return read_json(path) if os.path.exists(path) else None
+
+    def stop_requested(self):
+        return os.path.exists(self.path(STOP_FILE))
+
+
+def worker(directory, worker_id=None, idle_exit=None, heartbeat=HEARTBEAT):
+    """
+    Play the jobs of a queue until its stop file appears, or until it has
+    been idle for `idle_exit` seconds. Returns the number of jobs played.
+    """
+    queue = JobQueue(directory)
+    worker_id = worker_id or "{}-{}".format(socket.gethostname(), os.getpid())
+    played = 0
+    idle_since = time.time()
+    while not queue.stop_requested():
+        job, lease = queue.claim(worker_id)
+        if job is None:
+            if idle_exit is not None and time.time() - idle_since > idle_exit:
+                break
+            time.sleep(POLL_INTERVAL)
+            continue
+
+        done = threading.Event()
+
+        def renew():
+            while not done.wait(heartbeat):
+                try:
+                    os.utime(lease)
+                except FileNotFoundError:
+                    return
+
+        renewer = threading.Thread(target=renew, daemon=True)
+        renewer.start()
+        try:
+            agents = [make_agent(spec) for spec in job["agents"]]
+            _, score_1, score_2, games = play_round_match(agents, tuple(job["match"]),
+                                                          job["time_limit"])
+        finally:
+            done.set()
+            renewer.join()
+        queue.finish(job, lease, {"id": job["id"], "worker": worker_id,
+                                  "score": [score_1, score_2], "games": games})
+        played += 1
+        idle_since = time.time()
+    return played
+
+
+def round_jobs(opponents, agent, num_matches, seed=None, time_limit=TIME_LIMIT, depth=None,
+               nodes=None):
+    """
+    Return the jobs of a round between `agent` and each opponent, like
+    `tournament.play_round()`. Job ids are derived from their contents, so
+    publishing the same round again only adds the jobs that are missing.
+    """
+    if depth is not None or nodes is not None:
+        # Search budgets replace the time limit of the ID agents, as in tournament.py
+        agent = dict(agent, args=dict(agent["args"], depth_limit=depth, node_limit=nodes))
+    jobs = []
+    for idx, opponent in enumerate(opponents):
+        for order in range(2):
+            for match_idx in range(num_matches):
+                job = {"agents": [opponent, agent], "opponent": idx,
+                       "match": [0, order, match_idx, match_seed(seed, idx, order, match_idx)],
+                       "time_limit": time_limit}
+                digest = hashlib.sha1(json.dumps(job, sort_keys=True).encode()).hexdigest()
+                job["id"] = digest[:16]
+                jobs.append(job)
+    return jobs
+
+
+def play_round(directory, opponents, agent, num_matches, seed=None, time_limit=TIME_LIMIT,
+               depth=None, nodes=None, lease_timeout=LEASE_TIMEOUT):
+    """
+    Publish a round to the queue, wait for the workers to play every match,
+    and report it like `tournament.play_round()`, returning the win ratio
+    of `agent`.
+    """
+    queue = JobQueue(directory)
+    jobs = round_jobs(opponents, agent, num_matches, seed, time_limit, depth, nodes)
+    published = sum(queue.publish(job) for job in jobs)
+    print("\nPublished {} of {} matches to {}".format(published, len(jobs), directory))
+
+    results = {}
+    while len(results) < len(jobs):
+        for job in jobs:
+            if job["id"] not in results:
+                result = queue.result(job["id"])
+                if result is not None:
+                    results[job["id"]] = result
+        if len(results) < len(jobs):
+            reclaimed = queue.reclaim(lease_timeout)
+            if reclaimed:
+                print("  Requeued {} matches from expired leases".format(reclaimed))
+            time.sleep(POLL_INTERVAL)
+
+    print("\nPlaying Matches:")
+    print("----------")
+    wins = total = 0
+    for idx, opponent in enumerate(opponents):
+        scores = [0, 0]
+        for job in jobs:
+            if job["opponent"] == idx:
+                scores[0] += results[job["id"]]["score"][0]
+                scores[1] += results[job["id"]]["score"][1]
+        wins += scores[0]
+        total += sum(scores)
+        print("  Match {}: {!s:^11} vs {!s:^11}\tResult: {} to {}".format(
+            idx + 1, agent["name"], opponent["name"], *scores))
+    return 100. * wins / total
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Play tournament rounds with workers "
+                                                 "sharing a job queue directory.")
+    parser.add_argument("mode", choices=["coordinator", "worker"])
+    parser.add_argument("--queue", required=True, metavar="DIR", help="shared queue directory")
+    parser.add_argument("--score", default="custom_score", choices=sorted(SCORE_FUNCTIONS),
+                        help="heuristic used by the Student agent")
+    parser.add_argument("--matches", type=int, default=NUM_MATCHES,
+                        help="matches (two games each) per opponent and order")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--nodes", type=int, default=None,
+                        help="play untimed games where the ID agents search at most NODES nodes")
+    parser.add_argument("--depth", type=int, default=None,
+                        help="play untimed games where the ID agents search to at most DEPTH")
+    parser.add_argument("--local-workers", type=int, default=0,
+                        help="coordinator: also start this many workers on this machine")
+    parser.add_argument("--id", default=None, help="worker: name used in its leases")
+    args = parser.parse_args()
+
+    if args.mode == "worker":
+        print("Played {} matches".format(worker(args.queue, args.id)))
+        return
+
+    time_limit = TIME_LIMIT
+    if args.nodes is not None or args.depth is not None:
+        time_limit = None
+    JobQueue(args.queue)
+    if os.path.exists(os.path.join(args.queue, STOP_FILE)):
+        os.remove(os.path.join(args.queue, STOP_FILE))
+    local_workers = [multiprocessing.Process(target=worker, args=(args.queue,))
+                     for _ in range(args.local_workers)]
+    for process in local_workers:
+        process.start()
+
+    try:
+        opponents, test_agents = agent_specs(args.score)
+        for agent in test_agents:
+            print("")
+            print("*************************")
+            print("{:^25}".format("Evaluating: " + agent["name"]))
+            print("*************************")
+            win_ratio = play_round(args.queue, opponents, agent, args.matches, args.seed,
+                                   time_limit, args.depth, args.nodes)
+            print("\n\nResults:")
+            print("----------")
+            print("{!s:<15}{:>10.2f}%".format(agent["name"], win_ratio))
+    finally:
+        # Tell every worker, local or remote, that the tournament is over
+        with open(os.path.join(args.queue, STOP_FILE), "w"):
+            pass
+        for process in local_workers:
+            process.join()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,336 @@
+"""
+Run a `CustomPlayer` as a long-lived engine process that reads commands
+from stdin and writes its replies to stdout, one per line, in the spirit
+of the UCI protocol used by chess engines. GUIs and tournament managers
+keep one engine process for many games, instead of paying for interpreter
+startup and cold caches every match.
+
+Moves are written as "row,col" (e.g. "3,4"); "none" stands for no move.
+
+Commands:
+
+    isolation                    identify the engine; replies "id ..." then
+                                 "isolationok"
+    isready                      replies "readyok" once idle
+    setoption name N value V     set option N (Score, Method, Hash) and
+                                 create a new player; Hash is the number of
+                                 cached evaluations (0 disables the cache)
+    newgame                      start a new game on an empty board, keeping
+                                 the evaluation cache warm
+    size W H                     set the board size used by later positions
+    position startpos [moves M1 M2 ...]
+                                 set the position reached by playing the
+                                 moves from an empty board
+    go [movetime MS] [nodes N] [depth D]
+                                 search the position and reply with an
+                                 "info" line then "bestmove M"; unlimited
+                                 without limits, until "stop"
+    stop                         end the current search early
+    display                      print the board
+    quit                         exit
+
+The evaluation cache is keyed by game state only (see `EvaluationCache`),
+so entries from earlier games stay valid and are reused by later ones.
+
+Play games between two engine processes with the local test driver:
+
+    python engine.py --selfplay 4 --movetime 100
+"""
+
+import argparse
+import subprocess
+import sys
+import threading
+import time
+
+from isolation import Board
+from game_agent import CustomPlayer, SCORE_FUNCTIONS
+
+ENGINE_NAME = "AIND-Isolation CustomPlayer"
+NO_MOVE = (-1, -1)
+DEFAULT_OPTIONS = {"Score": "custom_score", "Method": "alphabeta", "Hash": 1 << 16}
+
+
+def format_move(move):
+    return "none" if move is None or tuple(move) == NO_MOVE else "{},{}".format(*move)
+
+
+def parse_move(text):
+    if text == "none":
+        return NO_MOVE
+    row, col = text.split(",")
+    return int(row), int(col)
+
+
+class Engine(object):
+    """
+    Protocol handler of an engine. Commands are passed to `handle()` one
+    line at a time, and replies are written to `out`. Searches run in a
+    background thread, so "stop" and "isready" are answered while they run.
+    """
+
+    def __init__(self, out=sys.stdout):
+        self.out = out
+        self.lock = threading.Lock()
+        self.options = dict(DEFAULT_OPTIONS)
+        self.player = None
+        self.width = self.height = 7
+        self.moves = []
+        self.search_thread = None
+        self.stop_event = threading.Event()
+        self.make_player()
+
+    def send(self, line):
+        with self.lock:
+            self.out.write(line + "\n")
+            self.out.flush()
+
+    def make_player(self):
+        self.player = CustomPlayer(score_fn=SCORE_FUNCTIONS[self.options["Score"]],
+                                   method=self.options["Method"], iterative=True,
+                                   eval_cache_size=int(self.options["Hash"]) or None)
+
+    def board(self):
+        game = Board("player1", "player2", self.width, self.height)
+        for move in self.moves:
+            game.apply_move(move)
+        return game
+
+    def wait(self):
+        if self.search_thread is not None:
+            self.search_thread.join()
+            self.search_thread = None
+
+    def handle(self, line):
+        """ Handle one command line. Returns False when the engine should exit. """
+        tokens = line.split()
+        if not tokens:
+            return True
+        command, args = tokens[0], tokens[1:]
+
+        if command == "quit":
+            self.stop_event.set()
+            self.wait()
+            return False
+        if command == "stop":
+            self.stop_event.set()
+            self.wait()
+            return True
+        if command == "isready":
+            self.wait()
+            self.send("readyok")
+            return True
+
+        # Every other command changes or reads the position, so it waits for
+        # the current search to finish
+        self.wait()
+        if command == "isolation":
+            self.send("id name " + ENGINE_NAME)
+            for name, value in sorted(DEFAULT_OPTIONS.items()):
+                self.send("option name {} default {}".format(name, value))
+            self.send("isolationok")
+        elif command == "setoption":
+            self.set_option(args)
+        elif command == "newgame":
+            self.moves = []
+        elif command == "size":
+            self.width, self.height = int(args[0]), int(args[1])
+            self.moves = []
+        elif command == "position":
+            self.set_position(args)
+        elif command == "go":
+            self.go(args)
+        elif command == "display":
+            for row in self.board().to_string().splitlines():
+                if row.strip():
+                    self.send("info string " + row)
+        else:
+            self.send("info string unknown command: " + command)
+        return True
+
+    def set_option(self, args):
+        if len(args) < 4 or args[0] != "name" or args[2] != "value":
+            self.send("info string usage: setoption name NAME value VALUE")
+            return
+        name, value = args[1], " ".join(args[3:])
+        if name not in DEFAULT_OPTIONS:
+            self.send("info string unknown option: " + name)
+            return
+        if name == "Score" and value not in SCORE_FUNCTIONS:
+            self.send("info string unknown score function: " + value)
+            return
+        if name == "Method" and value not in ("minimax", "alphabeta"):
+            self.send("info string unknown search method: " + value)
+            return
+        self.options[name] = value
+        self.make_player()
+
+    def set_position(self, args):
+        if not args or args[0] != "startpos":
+            self.send("info string usage: position startpos [moves M1 M2 ...]")
+            return
+        moves = [parse_move(m) for m in args[2:]] if args[1:2] == ["moves"] else []
+        game = Board("player1", "player2", self.width, self.height)
+        for move in moves:
+            if move not in game.get_legal_moves():
+                self.send("info string illegal move: " + format_move(move))
+                return
+            game.apply_move(move)
+        self.moves = moves
+
+    def go(self, args):
+        limits = dict(zip(args[::2], args[1::2]))
+        movetime = float(limits["movetime"]) if "movetime" in limits else None
+        self.player.node_limit = int(limits["nodes"]) if "nodes" in limits else None
+        self.player.depth_limit = int(limits["depth"]) if "depth" in limits else None
+        self.stop_event.clear()
+        self.search_thread = threading.Thread(target=self.search, args=(self.board(), movetime),
+                                              daemon=True)
+        self.search_thread.start()
+
+    def search(self, game, movetime):
+        start = time.perf_counter()
+        stop_event = self.stop_event
+
+        def time_left():
+            if stop_event.is_set():
+                return 0.
+            if movetime is None:
+                return float("inf")
+            return movetime - 1000. * (time.perf_counter() - start)
+
+        move = self.player.get_move(game, game.get_legal_moves(), time_left)
+        stats = self.player.last_search_stats
+        score = self.player.last_score
+        self.send("info depth {} nodes {} nps {:.0f} time {:.0f} score {}".format(
+            stats.depth, stats.nodes, stats.nps, 1000. * stats.elapsed,
+            "none" if score is None else "{:g}".format(score)))
+        self.send("bestmove " + format_move(move))
+
+
+def run(stdin=sys.stdin, stdout=sys.stdout):
+    """ Run the engine loop until "quit" or the end of the input. """
+    engine = Engine(stdout)
+    for line in stdin:
+        if not engine.handle(line):
+            return
+    engine.stop_event.set()
+    engine.wait()
+
+
+class EngineClient(object):
+    """
+    Driver of an engine subprocess, used to test the engine and to play
+    games between engines.
+    """
+
+    def __init__(self, command=None, options=None):
+        self.process = subprocess.Popen(command or [sys.executable, __file__],
+                                        stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                                        universal_newlines=True, bufsize=1)
+        self.send("isolation")
+        self.name = self.wait_for("isolationok")[0][len("id name "):]
+        for name, value in (options or {}).items():
+            self.send("setoption name {} value {}".format(name, value))
+        self.send("isready")
+        self.wait_for("readyok")
+
+    def send(self, line):
+        self.process.stdin.write(line + "\n")
+        self.process.stdin.flush()
+
+    def wait_for(self, prefix):
+        """ Return the lines read up to and including the first starting with prefix. """
+        lines = []
+        while True:
+            line = self.process.stdout.readline()
+            if not line:
+                raise EOFError("engine exited while waiting for " + prefix)
+            lines.append(line.rstrip("\n"))
+            if line.startswith(prefix):
+                return lines
+
+    def new_game(self, width=7, height=7):
+        self.send("newgame")
+        self.send("size {} {}".format(width, height))
+
+    def go(self, moves, movetime=None, nodes=None, depth=None):
+        """ Return the engine's move in the position reached by the moves, and its info line. """
+        position = "position startpos"
+        if moves:
+            position += " moves " + " ".join(format_move(m) for m in moves)
+        self.send(position)
+        limits = [("movetime", movetime), ("nodes", nodes), ("depth", depth)]
+        self.send(" ".join(["go"] + ["{} {}".format(k, v) for k, v in limits if v is not None]))
+        lines = self.wait_for("bestmove")
+        info = [line for line in lines if line.startswith("info depth")]
+        return parse_move(lines[-1].split()[1]), (info[-1] if info else None)
+
+    def quit(self):
+        self.send("quit")
+        self.process.wait()
+
+
+def play_game(engines, width=7, height=7, movetime=None, nodes=None, depth=None):
+    """
+    Play a game between two `EngineClient`s, the first moving first.
+
+    Returns
+    ----------
+    (int, list<(int, int)>, str)
+        The index of the winning engine, the moves applied, and the reason
+        the game ended (see `isolation.archive.TERMINATIONS`). Like in
+        `Board.play()`, an engine without legal moves (or resigning because
+        every legal move loses) replies "none", which is an "illegal move".
+    """
+    for engine in engines:
+        engine.new_game(width, height)
+    game = Board("player1", "player2", width, height)
+    moves = []
+    while True:
+        turn = len(moves) % 2
+        legal_moves = game.get_legal_moves()
+        move, _ = engines[turn].go(moves, movetime, nodes, depth)
+        if move not in legal_moves:
+            return 1 - turn, moves, "illegal move"
+        game.apply_move(move)
+        moves.append(move)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Isolation engine speaking a line protocol "
+                                                 "on stdin/stdout.")
+    parser.add_argument("--selfplay", type=int, metavar="GAMES", default=None,
+                        help="instead of running the engine, play GAMES games between "
+                             "two engine processes")
+    parser.add_argument("--movetime", type=float, default=None, help="milliseconds per move")
+    parser.add_argument("--nodes", type=int, default=None, help="nodes per move")
+    parser.add_argument("--depth", type=int, default=None, help="depth per move")
+    parser.add_argument("--size", type=int, nargs=2, default=[7, 7], metavar=("W", "H"))
+    args = parser.parse_args()
+
+    if args.selfplay is None:
+        run()
+        return
+
+    engines = [EngineClient(), EngineClient()]
+    wins = [0, 0]
+    try:
+        for game_idx in range(args.selfplay):
+            # alternate which engine moves first
+            order = [game_idx % 2, 1 - game_idx % 2]
+            winner, moves, termination = play_game([engines[i] for i in order], args.size[0],
+                                                   args.size[1], args.movetime, args.nodes,
+                                                   args.depth)
+            wins[order[winner]] += 1
+            print("Game {}: engine {} wins after {} moves{}".format(
+                game_idx + 1, order[winner] + 1, len(moves),
+                " ({})".format(termination) if termination else ""))
+    finally:
+        for engine in engines:
+            engine.quit()
+    print("Engine 1 vs engine 2: {} to {}".format(*wins))
+
+
+if __name__ == "__main__":
+    main()
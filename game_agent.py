@@ -6,20 +6,25 @@ augment the test suite with your own test cases to further test your code.
 You must test your agent's strength against a set of agents with known
 relative strength using tournament.py and include the results in your report.
 """
+import json
+import math
 import random
 import logging
+import inspect
+import time
 import typing; from typing import *
 import itertools
 from itertools import product
-from sample_players import null_score, open_move_score, improved_score
+from collections import OrderedDict, deque, namedtuple
+from sample_players import null_score, open_move_score, improved_score, mobility
 
 class Timeout(Exception):
     """Subclass base exception for code clarity."""
     pass
 
 def get_move_difference_factor(game, player) -> float:
-    count_own_moves = len(game.get_legal_moves(player))
-    count_opp_moves = len(game.get_legal_moves(game.get_opponent(player)))
+    count_own_moves = mobility(game, player)
+    count_opp_moves = mobility(game, game.get_opponent(player))
     return (count_own_moves - count_opp_moves)
 
 def get_center_available_factor(game, player) -> float:
@@ -46,6 +51,11 @@ def get_reflection_available_factor(game, player) -> float:
     if is_empty_board(count_total_positions, count_empty_coords):
         return 1.0
 
+    # No reflection move possible until both players are placed
+    if game.get_player_location(player) is None or \
+            game.get_player_location(game.get_opponent(player)) is None:
+        return 1.0
+
     own_moves = game.get_legal_moves(player)
     opp_moves = game.get_legal_moves(game.get_opponent(player))
     count_own_moves = len(game.get_legal_moves(player))
@@ -310,6 +320,172 @@ def heuristic_combined_1_2_3(game, player) -> float:
                  reflection_available_factor +
                  partition_possible_factor)
 
+def get_reachability_factors(game, player):
+    """Flood fill the board by knight moves from both players at once.
+
+    Returns
+    ----------
+    (int, int, int, int)
+        The number of open cells reachable by the player and by its opponent,
+        followed by the number of cells each of them reaches in strictly
+        fewer moves than the other.
+    """
+    # Imported here so that the other heuristics work without the bitboard
+    # helpers of the isolation package
+    from isolation.bitboard import knight_masks, popcount, race
+
+    width = game.width
+    masks = knight_masks(width, game.height)
+    try:
+        open_cells = ((1 << (width * game.height)) - 1) & ~game.get_occupancy()
+    except AttributeError:
+        open_cells = sum(1 << (r * width + c) for r, c in game.get_blank_spaces())
+    own_location = game.get_player_location(player)
+    opp_location = game.get_player_location(game.get_opponent(player))
+    own_start = None if own_location is None else own_location[0] * width + own_location[1]
+    opp_start = None if opp_location is None else opp_location[0] * width + opp_location[1]
+    own_reach, opp_reach, own_first, opp_first = race(own_start, opp_start, open_cells, masks)
+    return popcount(own_reach), popcount(opp_reach), popcount(own_first), popcount(opp_first)
+
+def heuristic_4_reachability(game, player) -> float:
+    """
+    Heuristic 4's Reachability Factor
+    is the difference between the number of cells the player can reach
+    by knight moves strictly before its opponent and the number of cells
+    the opponent reaches first. Unlike mobility it looks at the whole
+    region each player controls, so it rewards partitioning the board.
+
+    Parameters
+    ----------
+    game : `isolation.Board`
+        An instance of `isolation.Board` encoding the current state of the
+        game (e.g., player locations and blocked cells).
+
+    player : hashable
+        One of the objects registered by the game object as a valid player.
+        (i.e., `player` should be either game.__player_1__ or
+        game.__player_2__).
+
+    Returns
+    ----------
+    float
+        The heuristic value of the current game state
+    """
+    if game.is_loser(player):
+        return float("-inf")
+
+    if game.is_winner(player):
+        return float("inf")
+
+    _, _, own_first, opp_first = get_reachability_factors(game, player)
+
+    return float(own_first - opp_first)
+
+heuristics_options = {
+    "null_score": null_score,
+    "open_move_score": open_move_score,
+    "improved_score": improved_score,
+    "heuristic_1_center": heuristic_1_center,
+    "heuristic_2_reflection": heuristic_2_reflection,
+    "heuristic_3_partition": heuristic_3_partition,
+    "heuristic_4_reachability": heuristic_4_reachability,
+    "heuristic_combined_1_2": heuristic_combined_1_2,
+    "heuristic_combined_1_3": heuristic_combined_1_3,
+    "heuristic_combined_2_3": heuristic_combined_2_3,
+    "heuristic_combined_1_2_3": heuristic_combined_1_2_3
+}
+
+def get_reachability_difference_factor(game, player) -> float:
+    _, _, own_first, opp_first = get_reachability_factors(game, player)
+    return float(own_first - opp_first)
+
+# Factors that a weighted score function combines linearly, and the product
+# of the summed 1, 2 and 3 factors with the move difference used by
+# heuristic_combined_1_2_3_with_improve_score in competition/game_agent.py
+FEATURE_FACTORS = OrderedDict([
+    ("move_difference", get_move_difference_factor),
+    ("center", get_center_available_factor),
+    ("reflection", get_reflection_available_factor),
+    ("partition", get_partition_possible_factor),
+    ("reachability", get_reachability_difference_factor),
+])
+FEATURE_NAMES = tuple(FEATURE_FACTORS) + ("factors_x_move_difference",)
+
+def get_evaluation_features(game, player, names=FEATURE_NAMES):
+    """Compute the named factors of a game state, evaluating each underlying
+    factor at most once.
+
+    Returns
+    ----------
+    list<float>
+        The value of each feature in `names`, from the point of view of
+        `player`.
+    """
+    factors = {}
+
+    def factor(name):
+        if name not in factors:
+            factors[name] = float(FEATURE_FACTORS[name](game, player))
+        return factors[name]
+
+    features = []
+    for name in names:
+        if name == "factors_x_move_difference":
+            features.append((factor("center") + factor("reflection") +
+                             factor("partition")) * factor("move_difference"))
+        else:
+            features.append(factor(name))
+    return features
+
+class WeightedScore:
+    """Evaluation function that scores a game state as a weighted sum of the
+    factors in `FEATURE_NAMES`. Factors with a zero weight are not computed,
+    so the cost of an evaluation depends on the weights. Weight vectors are
+    produced by `tuner.py` and can be saved to and loaded from JSON files.
+
+    Parameters
+    ----------
+    weights : list<float>
+        One weight per feature name.
+
+    names : list<str> (optional)
+        The features the weights apply to.
+    """
+
+    def __init__(self, weights, names=FEATURE_NAMES):
+        if len(weights) != len(names):
+            raise ValueError("Expected {} weights, got {}".format(len(names), len(weights)))
+        self.weights = [float(w) for w in weights]
+        self.names = list(names)
+        self.active_names = [n for n, w in zip(names, weights) if w]
+        self.active_weights = [float(w) for w in weights if w]
+
+    def __call__(self, game, player):
+        if game.is_loser(player):
+            return float("-inf")
+
+        if game.is_winner(player):
+            return float("inf")
+
+        features = get_evaluation_features(game, player, self.active_names)
+        return float(sum(w * f for w, f in zip(self.active_weights, features)))
+
+    def __repr__(self):
+        return "WeightedScore({!r}, {!r})".format(self.weights, self.names)
+
+    def save(self, path, **extra):
+        """Write the weights to a JSON file, with any extra entries."""
+        with open(path, "w") as f:
+            json.dump(dict(extra, features=self.names, weights=self.weights),
+                      f, indent=2, sort_keys=True)
+
+    @classmethod
+    def load(cls, path):
+        """Read weights written by `WeightedScore.save()`."""
+        with open(path) as f:
+            data = json.load(f)
+        return cls(data["weights"], data["features"])
+
 def custom_score(game, player):
     """Calculate the heuristic value of a game state from the point of view
     of the given player.
@@ -339,21 +515,251 @@ def custom_score(game, player):
     if game.is_winner(player):
         return float("inf")
 
-    heuristics_options = {
-        "null_score": null_score,
-        "open_move_score": open_move_score,
-        "improved_score": improved_score,
-        "heuristic_1_center": heuristic_1_center,
-        "heuristic_2_reflection": heuristic_2_reflection,
-        "heuristic_3_partition": heuristic_3_partition,
-        "heuristic_combined_1_2": heuristic_combined_1_2,
-        "heuristic_combined_1_3": heuristic_combined_1_3,
-        "heuristic_combined_2_3": heuristic_combined_2_3,
-        "heuristic_combined_1_2_3": heuristic_combined_1_2_3
-    }
-
     return heuristics_options["heuristic_2_reflection"](game, player)
 
+# Every score function that can be selected by name, e.g. on a command line
+SCORE_FUNCTIONS = dict(heuristics_options, custom_score=custom_score)
+
+class EvaluationCache:
+    """Wrap a heuristic evaluation function with a fixed-size cache of its
+    results keyed by game state, so that positions reached again through
+    iterative deepening or transpositions are only evaluated once.
+
+    The cache is keyed by `game.position_key(player)`, so it is only valid
+    for evaluation functions that depend on nothing but the game state. When
+    the cache is full the least recently used entry is evicted.
+
+    Parameters
+    ----------
+    score_fn : callable
+        The heuristic evaluation function to cache, called as
+        `score_fn(game, player)`.
+
+    max_entries : int
+        A strictly positive integer for the maximum number of evaluations to
+        keep in the cache.
+    """
+
+    def __init__(self, score_fn, max_entries):
+        if max_entries <= 0:
+            raise ValueError("Evaluation cache size must be strictly positive")
+        self.score_fn = score_fn
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __call__(self, game, player):
+        key = game.position_key(player)
+        entries = self.entries
+        try:
+            value = entries[key]
+        except KeyError:
+            self.misses += 1
+            value = self.score_fn(game, player)
+            entries[key] = value
+            if len(entries) > self.max_entries:
+                entries.popitem(last=False)
+                self.evictions += 1
+            return value
+        self.hits += 1
+        entries.move_to_end(key)
+        return value
+
+    @property
+    def hit_rate(self) -> float:
+        """ Fraction of lookups answered from the cache. """
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.
+
+    def clear(self):
+        """ Drop all cached evaluations and reset the statistics. """
+        self.entries.clear()
+        self.hits = self.misses = self.evictions = 0
+
+class TimerCalibrator:
+    """Choose the search timeout margin (`CustomPlayer.TIMER_THRESHOLD`) from
+    the time recent searches actually needed to stop once the timer dropped
+    below the margin: the time to notice the timeout at the next node, unwind
+    the recursion with the `Timeout` exception and return from get_move().
+
+    The margin is a high percentile of the overruns measured over a window of
+    recent timed-out moves, multiplied by a safety factor, so it shrinks on
+    an idle machine and grows when the machine gets loaded.
+
+    Parameters
+    ----------
+    initial : float (optional)
+        Margin in milliseconds used until `min_samples` overruns have been
+        measured.
+
+    percentile : float (optional)
+        Percentile of the measured overruns that the margin must cover.
+
+    safety_factor : float (optional)
+        Multiplier applied to the percentile.
+
+    window : int (optional)
+        Number of most recent measurements to keep.
+
+    min_samples : int (optional)
+        Number of measurements needed before the margin is adjusted.
+
+    minimum : float (optional)
+        Smallest margin in milliseconds ever chosen.
+    """
+
+    def __init__(self, initial=10., percentile=99., safety_factor=1.5,
+                 window=100, min_samples=10, minimum=0.5):
+        self.margin = initial
+        self.percentile = percentile
+        self.safety_factor = safety_factor
+        self.min_samples = min_samples
+        self.minimum = minimum
+        self.samples = deque(maxlen=window)
+
+    def record(self, overrun) -> float:
+        """Add the milliseconds a search took to return after the timer
+        dropped below the margin, and return the updated margin.
+        """
+        self.samples.append(overrun)
+        if len(self.samples) >= self.min_samples:
+            values = sorted(self.samples)
+            rank = int(math.ceil(self.percentile / 100. * len(values))) - 1
+            self.margin = max(self.minimum, self.safety_factor * values[max(rank, 0)])
+        return self.margin
+
+class SearchStats:
+    """Statistics describing how one call to `CustomPlayer.get_move()` spent
+    its time. They are available as `player.last_search_stats` after the
+    call and are passed to the player's `stats_callback`, if any.
+
+    Attributes
+    ----------
+    nodes : int
+        Number of search nodes expanded (calls to minimax() or alphabeta(),
+        plus the successors scored in batches).
+
+    leaf_evaluations : int
+        Number of heuristic evaluations at the search frontier.
+
+    elapsed : float
+        Seconds spent in get_move().
+
+    depth : int
+        Deepest search iteration completed (0 if none completed).
+
+    cutoffs : int
+        Number of alpha-beta cutoffs.
+
+    first_move_cutoffs : int
+        Number of cutoffs caused by the first move searched at a node.
+
+    eval_cache_hit_rate : float or None
+        Fraction of evaluations answered by the player's `EvaluationCache`
+        during this search; None without a cache.
+
+    iteration_times : list<float>
+        Milliseconds spent on each completed search iteration.
+
+    timer_threshold : float
+        Timeout margin in milliseconds in effect when the search ended.
+    """
+
+    def __init__(self, nodes, leaf_evaluations, elapsed, depth, cutoffs,
+                 first_move_cutoffs, eval_cache_hit_rate, iteration_times,
+                 timer_threshold):
+        self.nodes = nodes
+        self.leaf_evaluations = leaf_evaluations
+        self.elapsed = elapsed
+        self.depth = depth
+        self.cutoffs = cutoffs
+        self.first_move_cutoffs = first_move_cutoffs
+        self.eval_cache_hit_rate = eval_cache_hit_rate
+        self.iteration_times = iteration_times
+        self.timer_threshold = timer_threshold
+
+    @property
+    def nps(self) -> float:
+        """ Nodes searched per second. """
+        return self.nodes / self.elapsed if self.elapsed else 0.
+
+    @property
+    def first_move_cutoff_rate(self) -> float:
+        """ Fraction of cutoffs caused by the first move, a measure of move ordering. """
+        return self.first_move_cutoffs / self.cutoffs if self.cutoffs else 0.
+
+    def as_dict(self):
+        return OrderedDict([
+            ("nodes", self.nodes), ("leaf_evaluations", self.leaf_evaluations),
+            ("elapsed", self.elapsed), ("nps", self.nps), ("depth", self.depth),
+            ("cutoffs", self.cutoffs), ("first_move_cutoff_rate", self.first_move_cutoff_rate),
+            ("eval_cache_hit_rate", self.eval_cache_hit_rate),
+            ("iteration_times", self.iteration_times),
+            ("timer_threshold", self.timer_threshold)])
+
+    def __repr__(self):
+        return "SearchStats({})".format(", ".join(
+            "{}={!r}".format(k, v) for k, v in self.as_dict().items()))
+
+TraceRecord = namedtuple("TraceRecord", ["method", "ply", "depth", "maximizing_player",
+                                         "alpha", "beta", "value", "move"])
+
+class SearchTracer:
+    """Record a sample of the nodes visited by a `CustomPlayer` search in a
+    ring buffer, for debugging the search without going through the logging
+    handlers.
+
+    Tracing costs nothing unless it is enabled: when a tracer is passed to
+    `CustomPlayer`, the player's minimax() and alphabeta() methods are
+    replaced by traced wrappers for that player only, and the search code
+    itself contains no tracing calls.
+
+    Parameters
+    ----------
+    capacity : int (optional)
+        Number of most recent records to keep.
+
+    every : int (optional)
+        Record one node out of every `every` nodes completed.
+    """
+
+    def __init__(self, capacity=10000, every=1):
+        self.records = deque(maxlen=capacity)
+        self.every = every
+        self.nodes = 0
+
+    def wrap(self, search_fn, method):
+        """Return a version of the bound search method `search_fn` that
+        records the nodes it completes as `TraceRecord`s.
+        """
+        signature = inspect.signature(search_fn)
+
+        def traced(game, depth, *args, **kwargs):
+            value, move = search_fn(game, depth, *args, **kwargs)
+            self.nodes += 1
+            if self.nodes % self.every == 0:
+                bound = signature.bind(game, depth, *args, **kwargs)
+                bound.apply_defaults()
+                arguments = bound.arguments
+                self.records.append(TraceRecord(method, game.move_count, depth,
+                                                arguments["maximizing_player"],
+                                                arguments.get("alpha"), arguments.get("beta"),
+                                                value, move))
+            return value, move
+        return traced
+
+    def clear(self):
+        self.records.clear()
+        self.nodes = 0
+
+    def dump(self, path):
+        """ Write the records to a JSON Lines file, oldest first. """
+        with open(path, "w") as f:
+            for record in self.records:
+                f.write(json.dumps(record._asdict()) + "\n")
+
 class CustomPlayer:
     """Game-playing agent that chooses a move using your evaluation function
     and a depth-limited minimax algorithm with alpha-beta pruning. You must
@@ -382,16 +788,89 @@ class CustomPlayer:
         Time remaining (in milliseconds) when search is aborted. Should be a
         positive value large enough to allow the function to return before the
         timer expires.
+
+    eval_cache_size : int (optional)
+        Maximum number of heuristic evaluations to keep in an
+        `EvaluationCache` wrapped around `score_fn`. The cache is disabled
+        when None (the default). The cache is kept across calls to
+        get_move() and is available as `self.eval_cache`.
+
+    batch_score_fn : callable (optional)
+        A vectorized version of `score_fn` called as
+        `batch_score_fn(games, player)` that returns the scores of a list of
+        game states (see `batch_scores.py`). When set, alphabeta() evaluates
+        all children of a node one ply above the search frontier in a single
+        batch before making its pruning decisions. It must return the same
+        values as `score_fn`, including +/-inf for finished games. Note that
+        the NumPy batch functions of `batch_scores.py` are currently slower
+        than their scalar versions at the branching factors of Isolation,
+        so this mode is a slowdown for the sample heuristics.
+
+    node_limit : int (optional)
+        Maximum number of search nodes (calls to minimax() or alphabeta())
+        to expand per call to get_move(). The search is aborted exactly like
+        a timeout when the budget runs out, so the move only depends on the
+        game state and not on the speed of the machine. No limit when None.
+
+    depth_limit : int (optional)
+        Deepest iteration of iterative deepening search to complete before
+        returning a move. No limit when None.
+
+    timer_calibrator : `TimerCalibrator` (optional)
+        When set, the `timeout` margin is replaced after every timed-out
+        search by the margin the calibrator derives from the measured time
+        to return. The current margin is `self.TIMER_THRESHOLD`.
+
+    stats_callback : callable (optional)
+        Called with the `SearchStats` of every call to get_move(), which are
+        also kept in `self.last_search_stats`.
+
+    tracer : `SearchTracer` (optional)
+        When set, every node the search completes is offered to the tracer.
+        Searches of players without a tracer are not slowed down.
     """
 
     def __init__(self, search_depth=3, score_fn=custom_score,
-                 iterative=True, method='minimax', timeout=10.):
+                 iterative=True, method='minimax', timeout=10.,
+                 eval_cache_size=None, batch_score_fn=None,
+                 node_limit=None, depth_limit=None, timer_calibrator=None,
+                 stats_callback=None, tracer=None):
         self.search_depth = search_depth
         self.iterative = iterative
+        self.node_limit = node_limit
+        self.depth_limit = depth_limit
+        self.nodes_searched = 0
+        self.leaf_evaluations = 0
+        self.cutoffs = 0
+        self.first_move_cutoffs = 0
+        self.completed_depth = 0
+        self.iteration_times = []
+        # whether the last search was stopped by the timer (not the node budget)
+        self.timed_out = False
+        self.stats_callback = stats_callback
+        self.last_search_stats = None
+        # value of the move returned by the last completed search iteration,
+        # from the point of view of the player to move (None if no search)
+        self.last_score = None
+        self.max_nodes = float('inf') if node_limit is None else node_limit
+        self.batch_score = batch_score_fn
+        self.eval_cache = None
+        if eval_cache_size:
+            self.eval_cache = EvaluationCache(score_fn, eval_cache_size)
+            score_fn = self.eval_cache
         self.score = score_fn
         self.method = method
         self.time_left = None
+        self.timer_calibrator = timer_calibrator
         self.TIMER_THRESHOLD = timeout
+        if timer_calibrator is not None:
+            self.TIMER_THRESHOLD = timer_calibrator.margin
+        self.tracer = tracer
+        if tracer is not None:
+            # Shadow the search methods of this instance only, so that the
+            # recursive calls go through the tracing wrappers
+            self.minimax = tracer.wrap(self.minimax, 'minimax')
+            self.alphabeta = tracer.wrap(self.alphabeta, 'alphabeta')
 
     def get_move(self, game, legal_moves, time_left):
         """Search for the best move from the available legal moves and return a
@@ -430,6 +909,44 @@ class CustomPlayer:
         """
 
         self.time_left = time_left
+        # Derived here so that changing node_limit between moves takes effect
+        self.max_nodes = float('inf') if self.node_limit is None else self.node_limit
+        self.nodes_searched = 0
+        self.leaf_evaluations = 0
+        self.cutoffs = 0
+        self.first_move_cutoffs = 0
+        self.completed_depth = 0
+        self.iteration_times = []
+        self.timed_out = False
+        self.last_score = None
+        cache = self.eval_cache
+        cache_lookups = (cache.hits, cache.misses) if cache is not None else None
+        start = time.perf_counter()
+
+        try:
+            return self.search(game, legal_moves)
+        finally:
+            hit_rate = None
+            if cache is not None:
+                hits = cache.hits - cache_lookups[0]
+                lookups = hits + cache.misses - cache_lookups[1]
+                hit_rate = hits / lookups if lookups else 0.
+            self.last_search_stats = SearchStats(
+                self.nodes_searched, self.leaf_evaluations, time.perf_counter() - start,
+                self.completed_depth, self.cutoffs, self.first_move_cutoffs, hit_rate,
+                self.iteration_times, self.TIMER_THRESHOLD)
+            if self.stats_callback is not None:
+                self.stats_callback(self.last_search_stats)
+            # Measure how long stopping took up to the very end of get_move(),
+            # including the statistics and their callback
+            if self.timed_out and self.timer_calibrator is not None:
+                self.TIMER_THRESHOLD = self.timer_calibrator.record(
+                    self.TIMER_THRESHOLD - self.time_left())
+
+    def search(self, game, legal_moves):
+        """Run the fixed-depth or iterative deepening search of get_move()
+        and return the chosen move.
+        """
 
         # Perform any required initializations, including selecting an initial
         # move from the game board (i.e., an opening book), or returning
@@ -437,11 +954,16 @@ class CustomPlayer:
 
         remaining_legal_moves = legal_moves
         no_legal_moves = (-1, -1)
-        best_move = no_legal_moves
         if not remaining_legal_moves:
             logging.debug("Get Moves - Terminated due to no remaining legal moves")
             return no_legal_moves
 
+        # Fall back on any legal move if the first search iteration is aborted
+        best_move = remaining_legal_moves[0]
+        max_depth = len(game.get_blank_spaces())
+        if self.depth_limit is not None:
+            max_depth = min(max_depth, self.depth_limit)
+
         # Flag indicating Iterative Deepening Search - Initialise Depth at 0 (to later be incremented)
         #   - Reference: https://github.com/aimacode/aima-pseudocode/blob/master/md/Iterative-Deepening-Search.md
         # Flag otherwise indicates Fixed-Depth Search (FDS) - Set to Search Depth parameter (only for FDS)
@@ -459,12 +981,7 @@ class CustomPlayer:
                 while True:
                     # logging.debug("Time left is: %r", self.time_left())
                     depth += 1
-                    if self.method == 'minimax':
-                        _, best_move = self.minimax(game, depth)
-                    elif self.method == 'alphabeta':
-                        _, best_move = self.alphabeta(game, depth)
-                    else:
-                        raise ValueError("Invalid method")
+                    self.last_score, best_move = self.search_iteration(game, depth)
 
                     # Check remaining time between depth iterations and
                     # return the best move when less than 1ms to avoid
@@ -472,27 +989,44 @@ class CustomPlayer:
                     if self.time_left() <= 0.001:
                         return best_move
 
+                    # Stop at the depth limit, or once the search reaches
+                    # the end of every game (no more blank cells to fill)
+                    if depth >= max_depth:
+                        return best_move
+
             # Flag indicates perform Fixed-Depth Search
             else:
                 logging.debug("Get Moves - Performing Fixed-Depth Search to depth %r: ", depth)
                 # logging.debug("Time left is: %r", self.time_left())
-                if self.method == 'minimax':
-                    _, best_move = self.minimax(game, depth)
-                elif self.method == 'alphabeta':
-                    _, best_move = self.alphabeta(game, depth)
-                else:
-                    raise ValueError("Invalid method")
+                self.last_score, best_move = self.search_iteration(game, depth)
                 return best_move
 
         except Timeout:
             # Handle any actions required at timeout, if necessary
             # logging.warning("Get Moves - Timeout reached")
 
+            # get_move() calibrates the timer, unless the node budget ran out
+            self.timed_out = self.nodes_searched <= self.max_nodes
             return best_move
 
         # Return the best move from the last completed search iteration
         return best_move
 
+    def search_iteration(self, game, depth):
+        """Search the game tree to the given depth with the configured method
+        and record the time the completed iteration took.
+        """
+        start = time.perf_counter()
+        if self.method == 'minimax':
+            result = self.minimax(game, depth)
+        elif self.method == 'alphabeta':
+            result = self.alphabeta(game, depth)
+        else:
+            raise ValueError("Invalid method")
+        self.iteration_times.append(1000. * (time.perf_counter() - start))
+        self.completed_depth = depth
+        return result
+
     def minimax(self, game, depth, maximizing_player=True):
         """Implement the minimax search algorithm as described in the lectures.
 
@@ -527,6 +1061,10 @@ class CustomPlayer:
         if self.time_left() < self.TIMER_THRESHOLD:
             raise Timeout()
 
+        self.nodes_searched += 1
+        if self.nodes_searched > self.max_nodes:
+            raise Timeout()
+
         # Reference: https://github.com/aimacode/aima-pseudocode/blob/master/md/Minimax-Decision.md
 
         # Initialise variable for no legal moves
@@ -536,37 +1074,23 @@ class CustomPlayer:
         current_player = game.active_player if maximizing_player else game.inactive_player
         remaining_legal_moves = game.get_legal_moves(game.active_player)
 
-        logging.debug("Current player is Maximizing: %r", maximizing_player)
-        logging.debug("Current depth: %r", depth)
-        logging.debug("Best utility: %r", best_utility)
-        logging.debug("Remaining legal moves: %r", remaining_legal_moves)
-
         # Recursion function termination conditions when legal moves exhausted or no plies left
         if not remaining_legal_moves:
-            logging.debug("Recursion terminated due to no remaining legal moves")
             return game.utility(current_player), no_legal_moves
         elif depth == 0:
-            logging.debug("Recursion terminated due to no more plies to search")
+            self.leaf_evaluations += 1
             return self.score(game, current_player), remaining_legal_moves[0]
 
         # Recursively alternate between Maximise and Minimise calculations for decrementing depths
         for move in remaining_legal_moves:
-            # logging.debug("Recursion with time left is: %r", self.time_left())
-            logging.debug("Recursion with move: %r", move)
-            logging.debug("Best utility: %r", best_utility)
-            logging.debug("Best move: %r", best_move)
-
             # Obtain successor of current state by creating copy of board and applying a move.
             next_state = game.forecast_move(move)
             forecast_utility, _ = self.minimax(next_state, depth - 1, not maximizing_player)
-            logging.debug("Forecast utility: %r", forecast_utility)
 
             if maximizing_player:
-                logging.debug("Checking move with Maximising player, forecast_utility > best_utility? : %r", (forecast_utility > best_utility))
                 if forecast_utility > best_utility:
                     best_utility, best_move = forecast_utility, move
             else:
-                logging.debug("Checking move with Minimising player, forecast_utility < best_utility? : %r", (forecast_utility > best_utility))
                 if forecast_utility < best_utility:
                     best_utility, best_move = forecast_utility, move
 
@@ -613,6 +1137,10 @@ class CustomPlayer:
         if self.time_left() < self.TIMER_THRESHOLD:
             raise Timeout()
 
+        self.nodes_searched += 1
+        if self.nodes_searched > self.max_nodes:
+            raise Timeout()
+
         # TODO - Refactor duplicate from minimax and alphabeta into helper function
         # Reference: https://github.com/aimacode/aima-pseudocode/blob/master/md/Alpha-Beta-Search.md
 
@@ -623,47 +1151,90 @@ class CustomPlayer:
         current_player = game.active_player if maximizing_player else game.inactive_player
         remaining_legal_moves = game.get_legal_moves(game.active_player)
 
-        logging.debug("Current player is Maximizing: %r", maximizing_player)
-        logging.debug("Current depth: %r", depth)
-        logging.debug("Best utility: %r", best_utility)
-        logging.debug("Remaining legal moves: %r", remaining_legal_moves)
-
         # Recursion function termination conditions when legal moves exhausted or no plies left
         if not remaining_legal_moves:
-            logging.debug("Recursion terminated due to no remaining legal moves")
             return game.utility(current_player), no_legal_moves
         elif depth == 0:
-            logging.debug("Recursion terminated due to no more plies to search")
+            self.leaf_evaluations += 1
             return self.score(game, current_player), remaining_legal_moves[0]
+        elif depth == 1 and self.batch_score is not None:
+            return self.alphabeta_frontier(game, remaining_legal_moves, alpha, beta,
+                                           maximizing_player, current_player)
 
         # Recursively alternate between Maximise and Minimise calculations for decrementing depths
         for move in remaining_legal_moves:
-            # logging.debug("Recursion with time left is: %r", self.time_left())
-            logging.debug("Recursion with move: %r", move)
-            logging.debug("Best utility: %r", best_utility)
-            logging.debug("Best move: %r", best_move)
-
             # Obtain successor of current state by creating copy of board and applying a move.
             next_state = game.forecast_move(move)
             forecast_utility, _ = self.alphabeta(next_state, depth - 1, alpha, beta, not maximizing_player)
-            logging.debug("Forecast utility: %r", forecast_utility)
 
             if maximizing_player:
-                logging.debug("Checking move with Maximising player, forecast_utility > best_utility? : %r", (forecast_utility > best_utility))
                 if forecast_utility > best_utility:
                     best_utility, best_move = forecast_utility, move
 
                     # Prune next successor node if possible
                     if best_utility >= beta:
+                        self.cutoffs += 1
+                        self.first_move_cutoffs += move == remaining_legal_moves[0]
                         break
                     alpha = max(alpha, best_utility)
             else:
-                logging.debug("Checking move with Minimising player, forecast_utility < best_utility? : %r", (forecast_utility > best_utility))
                 if forecast_utility < best_utility:
                     best_utility, best_move = forecast_utility, move
 
                     # Prune next successor node if possible
                     if best_utility <= alpha:
+                        self.cutoffs += 1
+                        self.first_move_cutoffs += move == remaining_legal_moves[0]
+                        break
+                    beta = min(beta, best_utility)
+
+        return best_utility, best_move
+
+    def alphabeta_frontier(self, game, legal_moves, alpha, beta, maximizing_player, current_player):
+        """Search the last ply of alphabeta() by scoring every successor of
+        the current state in one call to `self.batch_score`, then applying
+        the same pruning rules as alphabeta() to the batch of scores.
+
+        The successors are scored from the perspective of `current_player`,
+        which is the same player the recursive search would score them for.
+        Nodes, leaf evaluations and the node budget are accounted for one
+        successor at a time, as alphabeta() visits them, so that both paths
+        report the same search statistics.
+
+        Returns
+        -------
+        float
+            The score for the current search branch
+
+        tuple(int, int)
+            The best move for the current branch
+        """
+        successors = [game.forecast_move(move) for move in legal_moves]
+        scores = self.batch_score(successors, current_player)
+
+        best_move = (-1, -1)
+        best_utility = float('-inf') if maximizing_player else float('inf')
+        for move, successor, forecast_utility in zip(legal_moves, successors, scores):
+            forecast_utility = float(forecast_utility)
+            self.nodes_searched += 1
+            if self.nodes_searched > self.max_nodes:
+                raise Timeout()
+            # terminal successors take their utility, not a heuristic score
+            self.leaf_evaluations += bool(successor.get_legal_moves())
+            if maximizing_player:
+                if forecast_utility > best_utility:
+                    best_utility, best_move = forecast_utility, move
+                    if best_utility >= beta:
+                        self.cutoffs += 1
+                        self.first_move_cutoffs += move == legal_moves[0]
+                        break
+                    alpha = max(alpha, best_utility)
+            else:
+                if forecast_utility < best_utility:
+                    best_utility, best_move = forecast_utility, move
+                    if best_utility <= alpha:
+                        self.cutoffs += 1
+                        self.first_move_cutoffs += move == legal_moves[0]
                         break
                     beta = min(beta, best_utility)
 
@@ -11,6 +11,8 @@ import io
 
 # Make the Board class available at the root of the module for imports
 from .isolation import Board
+from .state import GameState
+from .supervisor import ProcessSupervisor, ThreadSupervisor
 
 
 def game_as_text(winner, move_history, termination="", board=Board(1, 2)):
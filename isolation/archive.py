@@ -0,0 +1,296 @@
+"""
+Compact binary archive of Isolation games with an index for random access.
+
+An archive is a pair of files:
+
+* the data file, made of zlib-compressed blocks of game records. Each record
+  is a 6 byte header (board width and height, winner, termination reason,
+  number of moves) followed by one byte per move holding the cell index
+  `row * width + column` of the move, or NO_MOVE for a missing or
+  off-board move (e.g., a move returned after a timeout).
+
+* the index file (data file name + ".idx"), with one fixed-size entry per
+  game giving the offset and length of its compressed block in the data
+  file and the offset of the record inside the decompressed block, so any
+  game is found with a single seek.
+
+Convert the games of a tournament results store (see `results_store.py`)
+into an archive with:
+
+    python -m isolation.archive results.jsonl games.iga
+"""
+
+import json
+import os
+import struct
+import zlib
+
+from collections import namedtuple
+
+from .isolation import Board
+
+DATA_MAGIC = b"ISOGAME1"
+INDEX_MAGIC = b"ISOIDX01"
+RECORD_HEADER = struct.Struct("<BBBBH")
+INDEX_ENTRY = struct.Struct("<QII")
+NO_MOVE = 0xFF
+BLOCK_SIZE = 256  # number of games compressed together
+
+# Reasons a game ends, shared by `Board.play()`, `engine.play_game()` and
+# `orchestrator.play_game()`:
+#   "illegal move"  the loser returned a move that is not legal, including
+#                   the (-1, -1) of a player left without legal moves, i.e.
+#                   the natural end of a game
+#   "timeout"       the loser ran out of time
+#   "crash"         the loser's engine process exited (orchestrator only)
+#   ""              unknown (games recorded before the reason was kept)
+# Codes are stored in the records, so new reasons are only ever appended;
+# reasons missing from the list are archived as "other"
+TERMINATIONS = ["", "illegal move", "timeout", "crash", "other"]
+
+ArchivedGame = namedtuple("ArchivedGame",
+                          ["width", "height", "winner", "termination", "moves"])
+
+
+def moves_from_history(move_history, opening=()):
+    """
+    Flatten the move history returned by `Board.play()` into the list of
+    moves in the order they were played.
+
+    Parameters
+    ----------
+    move_history : list<[(int, int), (int, int)]>
+        One element per turn with the move of player 1 and, if the game did
+        not end during the turn, the reply of player 2.
+
+    opening : list<(int, int)> (optional)
+        Moves applied to the board before `Board.play()` was called (e.g.,
+        the random opening of `tournament.play_match`).
+
+    Returns
+    ----------
+    list<(int, int)>
+        All moves of the game.
+    """
+    return list(opening) + [move for turn in move_history for move in turn]
+
+
+def encode_moves(moves, width, height):
+    """ Encode moves as one byte per move (see the module docstring). """
+    encoded = bytearray()
+    for move in moves:
+        if move is None or not (0 <= move[0] < height and 0 <= move[1] < width):
+            encoded.append(NO_MOVE)
+        else:
+            encoded.append(move[0] * width + move[1])
+    return bytes(encoded)
+
+
+def decode_moves(data, width):
+    """
+    Decode moves produced by `encode_moves()`; NO_MOVE becomes (-1, -1), the
+    move agents return when they have no legal moves.
+    """
+    return [(-1, -1) if index == NO_MOVE else divmod(index, width) for index in data]
+
+
+class GameArchiveWriter(object):
+    """
+    Append games to an archive, creating it if it does not exist. Games are
+    buffered and written one compressed block at a time, so the writer must
+    be closed (or used as a context manager) to flush the last block.
+
+    Parameters
+    ----------
+    path : str
+        Location of the data file; the index is written to path + ".idx".
+
+    block_size : int (optional)
+        Number of games compressed together. Larger blocks compress better
+        but make random access decompress more data.
+    """
+
+    def __init__(self, path, block_size=BLOCK_SIZE):
+        self.block_size = block_size
+        exists = os.path.exists(path)
+        self.data = open(path, "ab")
+        self.index = open(path + ".idx", "ab")
+        if not exists:
+            self.data.write(DATA_MAGIC)
+            self.index.write(INDEX_MAGIC)
+        self.num_games = (self.index.tell() - len(INDEX_MAGIC)) // INDEX_ENTRY.size
+        self.pending = []
+
+    def add_game(self, moves, winner=0, termination="", width=7, height=7):
+        """
+        Add a game to the archive.
+
+        Parameters
+        ----------
+        moves : list<(int, int)>
+            All moves of the game in order, starting from an empty board.
+
+        winner : int (optional)
+            1 or 2 for the player that won, 0 if unknown.
+
+        termination : str (optional)
+            Reason the game ended; one of `TERMINATIONS`, any other reason is
+            archived as "other".
+
+        width, height : int (optional)
+            Board size; at most 255 cells are supported.
+
+        Returns
+        ----------
+        int
+            The id of the game, i.e., its position in the archive.
+        """
+        if width * height >= NO_MOVE:
+            raise ValueError("Boards with more than {} cells cannot be archived".format(NO_MOVE - 1))
+        if termination not in TERMINATIONS:
+            termination = "other"
+        encoded = encode_moves(moves, width, height)
+        self.pending.append(RECORD_HEADER.pack(width, height, winner,
+                                               TERMINATIONS.index(termination),
+                                               len(encoded)) + encoded)
+        self.num_games += 1
+        if len(self.pending) >= self.block_size:
+            self.flush()
+        return self.num_games - 1
+
+    def flush(self):
+        """ Compress and write the buffered games. """
+        if not self.pending:
+            return
+        offsets, offset = [], 0
+        for record in self.pending:
+            offsets.append(offset)
+            offset += len(record)
+        block = zlib.compress(b"".join(self.pending), 9)
+        block_offset = self.data.tell()
+        self.data.write(block)
+        self.index.write(b"".join(INDEX_ENTRY.pack(block_offset, len(block), record_offset)
+                                  for record_offset in offsets))
+        self.data.flush()
+        self.index.flush()
+        self.pending = []
+
+    def close(self):
+        self.flush()
+        self.data.close()
+        self.index.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class GameArchiveReader(object):
+    """
+    Read games from an archive by id, or stream all of them in order.
+
+    Parameters
+    ----------
+    path : str
+        Location of the data file written by `GameArchiveWriter`.
+    """
+
+    def __init__(self, path):
+        self.data = open(path, "rb")
+        self.index = open(path + ".idx", "rb")
+        if self.data.read(len(DATA_MAGIC)) != DATA_MAGIC or \
+                self.index.read(len(INDEX_MAGIC)) != INDEX_MAGIC:
+            raise ValueError("{} is not a game archive".format(path))
+        self.index.seek(0, os.SEEK_END)
+        self.num_games = (self.index.tell() - len(INDEX_MAGIC)) // INDEX_ENTRY.size
+        self._block_offset = None
+        self._block = None
+
+    def __len__(self):
+        return self.num_games
+
+    def _read_block(self, offset, length):
+        # keep the last decompressed block for sequential reads
+        if offset != self._block_offset:
+            self.data.seek(offset)
+            self._block = zlib.decompress(self.data.read(length))
+            self._block_offset = offset
+        return self._block
+
+    @staticmethod
+    def _parse_record(block, offset):
+        width, height, winner, termination, num_moves = RECORD_HEADER.unpack_from(block, offset)
+        start = offset + RECORD_HEADER.size
+        moves = decode_moves(block[start:start + num_moves], width)
+        return ArchivedGame(width, height, winner, TERMINATIONS[termination], moves)
+
+    def read_game(self, game_id):
+        """ Return the `ArchivedGame` with the given id. """
+        if not 0 <= game_id < self.num_games:
+            raise IndexError("game id out of range")
+        self.index.seek(len(INDEX_MAGIC) + game_id * INDEX_ENTRY.size)
+        block_offset, length, record_offset = INDEX_ENTRY.unpack(self.index.read(INDEX_ENTRY.size))
+        return self._parse_record(self._read_block(block_offset, length), record_offset)
+
+    def __iter__(self):
+        for game_id in range(self.num_games):
+            yield self.read_game(game_id)
+
+    def positions(self, game_id, player_1="player1", player_2="player2"):
+        """
+        Lazily generate every position of a game as an `isolation.Board`,
+        starting from the empty board and ending after the last move that
+        was applied. Each yielded board is an independent copy.
+        """
+        game = self.read_game(game_id)
+        moves = game.moves
+        if game.termination:
+            # the move that timed out or was illegal was never applied
+            moves = moves[:-1]
+        board = Board(player_1, player_2, width=game.width, height=game.height)
+        yield board
+        for move in moves:
+            if not board.move_is_legal(move):
+                return
+            board = board.forecast_move(move)
+            yield board
+
+    def close(self):
+        self.data.close()
+        self.index.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def main():
+    import argparse
+    parser = argparse.ArgumentParser(
+        description="Convert the games of a tournament results store to a game archive.")
+    parser.add_argument("store", help="JSON Lines file written by tournament.py --store")
+    parser.add_argument("archive", help="game archive to create or append to")
+    parser.add_argument("--width", type=int, default=7)
+    parser.add_argument("--height", type=int, default=7)
+    args = parser.parse_args()
+
+    with open(args.store) as f, GameArchiveWriter(args.archive) as writer:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            for game in record["games"]:
+                moves = [tuple(m) if m is not None else None
+                         for m in game["opening"] + game["moves"]]
+                writer.add_game(moves, game["winner"], game["termination"],
+                                args.width, args.height)
+        print("{} games in {}".format(writer.num_games, args.archive))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""
+Bitmask helpers for reasoning about knight moves on an Isolation board.
+
+Cells are numbered row-major, so the cell at (row, column) is bit
+`row * width + column` of a mask; this matches `Board.get_occupancy()`.
+"""
+
+from functools import lru_cache
+
+KNIGHT_DIRECTIONS = [(-2, -1), (-2, 1), (-1, -2), (-1, 2),
+                     (1, -2),  (1, 2), (2, -1),  (2, 1)]
+
+try:
+    popcount = int.bit_count
+except AttributeError:  # Python < 3.10
+    def popcount(mask):
+        """ Return the number of set bits in the mask. """
+        return bin(mask).count('1')
+
+
+@lru_cache(maxsize=None)
+def knight_neighbours(width, height):
+    """
+    Return, for each cell index of a board of the given size, the tuple of
+    cell indices reachable with a single knight move.
+    """
+    neighbours = []
+    for r in range(height):
+        for c in range(width):
+            neighbours.append(tuple((r + dr) * width + (c + dc)
+                                    for dr, dc in KNIGHT_DIRECTIONS
+                                    if 0 <= r + dr < height and 0 <= c + dc < width))
+    return tuple(neighbours)
+
+
+@lru_cache(maxsize=None)
+def knight_masks(width, height):
+    """
+    Return, for each cell index of a board of the given size, the bitmask
+    of cells reachable with a single knight move.
+    """
+    return tuple(sum(1 << n for n in cells) for cells in knight_neighbours(width, height))
+
+
+def expand(frontier, masks):
+    """ Return the mask of cells one knight move away from any cell in frontier. """
+    reached = 0
+    while frontier:
+        low_bit = frontier & -frontier
+        reached |= masks[low_bit.bit_length() - 1]
+        frontier ^= low_bit
+    return reached
+
+
+def reachable(start, open_cells, masks):
+    """
+    Return the mask of open cells reachable by any sequence of knight moves
+    from the cell index `start`, not including the start cell itself.
+    """
+    seen = 0
+    frontier = 1 << start
+    while frontier:
+        frontier = expand(frontier, masks) & open_cells & ~seen
+        seen |= frontier
+    return seen
+
+
+def race(start_1, start_2, open_cells, masks):
+    """
+    Run a simultaneous breadth-first search by knight moves from two cells
+    over the open cells of a board.
+
+    Parameters
+    ----------
+    start_1, start_2 : int or None
+        Cell indices of the two searchers. None stands for a player that has
+        not been placed yet and can reach every open cell in one move.
+
+    open_cells : int
+        Bitmask of the cells that may be entered.
+
+    masks : tuple<int>
+        Knight move masks from `knight_masks()` for the board size.
+
+    Returns
+    ----------
+    (int, int, int, int)
+        Bitmasks of the cells reachable from each start, followed by the
+        bitmasks of the cells each searcher reaches in strictly fewer moves
+        than the other.
+    """
+    frontier_1 = open_cells if start_1 is None else expand(1 << start_1, masks) & open_cells
+    frontier_2 = open_cells if start_2 is None else expand(1 << start_2, masks) & open_cells
+    seen_1 = seen_2 = first_1 = first_2 = 0
+
+    while frontier_1 or frontier_2:
+        first_1 |= frontier_1 & ~(seen_2 | frontier_2)
+        first_2 |= frontier_2 & ~(seen_1 | frontier_1)
+        seen_1 |= frontier_1
+        seen_2 |= frontier_2
+        frontier_1 = expand(frontier_1, masks) & open_cells & ~seen_1
+        frontier_2 = expand(frontier_2, masks) & open_cells & ~seen_2
+
+    return seen_1, seen_2, first_1, first_2
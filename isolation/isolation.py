@@ -13,6 +13,9 @@ import timeit
 from copy import deepcopy
 from copy import copy
 
+from .bitboard import knight_neighbours, popcount
+from .state import GameState
+
 
 TIME_LIMIT_MILLIS = 200
 
@@ -39,6 +42,7 @@ class Board(object):
         The number of rows that the board should have.
     """
     BLANK = 0
+    BLOCKED = -1
     NOT_MOVED = None
 
     def __init__(self, player_1, player_2, width=7, height=7):
@@ -52,6 +56,64 @@ class Board(object):
         self.__board_state__ = [[Board.BLANK for i in range(width)] for j in range(height)]
         self.__last_player_move__ = {player_1: Board.NOT_MOVED, player_2: Board.NOT_MOVED}
         self.__player_symbols__ = {Board.BLANK: Board.BLANK, player_1: 1, player_2: 2}
+        self.__occupancy__ = None
+        self.__degrees__ = None
+
+    @classmethod
+    def from_state(cls, state, player_1, player_2):
+        """
+        Create a board from a `GameState` snapshot, registering the supplied
+        objects as the players.
+
+        Cells recorded as blocked in the snapshot that are not a player
+        location are marked with `Board.BLOCKED`, since the snapshot does
+        not record which player visited them.
+
+        Parameters
+        ----------
+        state : `isolation.GameState`
+            The game state to restore.
+
+        player_1 : object
+            An object with a get_move() function, registered as player 1.
+
+        player_2 : object
+            An object with a get_move() function, registered as player 2.
+
+        Returns
+        ----------
+        `isolation.Board`
+            A board encoding the input game state.
+        """
+        board = cls(player_1, player_2, width=state.width, height=state.height)
+        board_state = board.__board_state__
+        occupancy = state.occupancy
+        while occupancy:
+            low_bit = occupancy & -occupancy
+            row, col = divmod(low_bit.bit_length() - 1, state.width)
+            board_state[row][col] = Board.BLOCKED
+            occupancy ^= low_bit
+
+        for player, location in zip((player_1, player_2), state.locations):
+            board.__last_player_move__[player] = location
+            if location is not None:
+                board_state[location[0]][location[1]] = board.__player_symbols__[player]
+
+        if state.active:
+            board.__active_player__, board.__inactive_player__ = player_2, player_1
+        board.move_count = popcount(state.occupancy)
+        board.__occupancy__ = state.occupancy
+        return board
+
+    def state(self):
+        """
+        Return a compact `GameState` snapshot of the board that holds no
+        reference to the player objects.
+        """
+        return GameState(self.width, self.height, self.get_occupancy(),
+                         (self.__last_player_move__[self.__player_1__],
+                          self.__last_player_move__[self.__player_2__]),
+                         0 if self.__active_player__ == self.__player_1__ else 1)
 
     @property
     def active_player(self):
@@ -100,6 +162,8 @@ class Board(object):
         new_board.__last_player_move__ = copy(self.__last_player_move__)
         new_board.__player_symbols__ = copy(self.__player_symbols__)
         new_board.__board_state__ = deepcopy(self.__board_state__)
+        new_board.__occupancy__ = self.get_occupancy()
+        new_board.__degrees__ = list(self.__get_degrees__())
         return new_board
 
     def forecast_move(self, move):
@@ -165,6 +229,77 @@ class Board(object):
         """
         return self.__last_player_move__[player]
 
+    def get_occupancy(self):
+        """
+        Return a bitmask of the blocked cells on the board, where the cell at
+        (row, column) corresponds to bit `row * width + column`.
+
+        The mask is built from the board state on first use and then kept up
+        to date incrementally by `apply_move()`.
+        """
+        if self.__occupancy__ is None:
+            occupancy = 0
+            for i in range(self.height):
+                for j in range(self.width):
+                    if self.__board_state__[i][j] != Board.BLANK:
+                        occupancy |= 1 << (i * self.width + j)
+            self.__occupancy__ = occupancy
+        return self.__occupancy__
+
+    def get_mobility(self, player=None):
+        """
+        Return the number of legal moves available to the specified player,
+        i.e., `len(self.get_legal_moves(player))`.
+
+        The number of open knight neighbours of every cell is kept up to date
+        by `apply_move()`, so this is a constant time lookup for a player that
+        has already been placed on the board.
+
+        Parameters
+        ----------
+        player : object (optional)
+            An object registered as a player in the current game. If None,
+            return the mobility of the active player on the board.
+
+        Returns
+        ----------
+        int
+            The number of legal moves for the player.
+        """
+        if player is None:
+            player = self.active_player
+        location = self.__last_player_move__[player]
+        if location == Board.NOT_MOVED:
+            return self.width * self.height - popcount(self.get_occupancy())
+        return self.__get_degrees__()[location[0] * self.width + location[1]]
+
+    def position_key(self, player):
+        """
+        Return a hashable key identifying the current game state from the
+        perspective of the specified player.
+
+        Two states share a key exactly when they have the same board size,
+        the same blocked cells, the same location for the player and for its
+        opponent, and the same player holding initiative, regardless of
+        which objects are registered as player 1 and player 2. Any heuristic
+        evaluation that depends only on the game state can be cached by this
+        key.
+
+        Parameters
+        ----------
+        player : object
+            An object registered as a player in the current game.
+
+        Returns
+        ----------
+        tuple
+            A hashable key for the game state as seen by the input player.
+        """
+        return (self.width, self.height, self.get_occupancy(),
+                self.__last_player_move__[player],
+                self.__last_player_move__[self.get_opponent(player)],
+                player == self.__active_player__)
+
     def get_legal_moves(self, player=None):
         """
         Return the list of all legal moves for the specified player.
@@ -202,16 +337,23 @@ class Board(object):
         row, col = move
         self.__last_player_move__[self.active_player] = move
         self.__board_state__[row][col] = self.__player_symbols__[self.active_player]
+        index = row * self.width + col
+        if self.__occupancy__ is not None:
+            self.__occupancy__ |= 1 << index
+        if self.__degrees__ is not None:
+            degrees = self.__degrees__
+            for neighbour in knight_neighbours(self.width, self.height)[index]:
+                degrees[neighbour] -= 1
         self.__active_player__, self.__inactive_player__ = self.__inactive_player__, self.__active_player__
         self.move_count += 1
 
     def is_winner(self, player):
         """ Test whether the specified player has won the game. """
-        return player == self.inactive_player and not self.get_legal_moves(self.active_player)
+        return player == self.inactive_player and not self.get_mobility(self.active_player)
 
     def is_loser(self, player):
         """ Test whether the specified player has lost the game. """
-        return player == self.active_player and not self.get_legal_moves(self.active_player)
+        return player == self.active_player and not self.get_mobility(self.active_player)
 
     def utility(self, player):
         """
@@ -237,7 +379,7 @@ class Board(object):
             otherwise.
         """
 
-        if not self.get_legal_moves(self.active_player):
+        if not self.get_mobility(self.active_player):
 
             if player == self.inactive_player:
                 return float("inf")
@@ -247,6 +389,20 @@ class Board(object):
 
         return 0.
 
+    def __get_degrees__(self):
+        """
+        Return the list holding the number of open knight neighbours of each
+        cell (indexed `row * width + column`), building it from the board
+        state on first use.
+        """
+        if self.__degrees__ is None:
+            state = self.__board_state__
+            width = self.width
+            self.__degrees__ = [
+                sum(1 for n in neighbours if state[n // width][n % width] == Board.BLANK)
+                for neighbours in knight_neighbours(width, self.height)]
+        return self.__degrees__
+
     def __get_moves__(self, move):
         """
         Generate the list of possible moves for an L-shaped motion (like a
@@ -299,7 +455,7 @@ class Board(object):
 
         return out
 
-    def play(self, time_limit=TIME_LIMIT_MILLIS):
+    def play(self, time_limit=TIME_LIMIT_MILLIS, move_times=None, supervisor=None):
         """
         Execute a match between the players by alternately soliciting them
         to select a move and applying it in the game.
@@ -308,7 +464,20 @@ class Board(object):
         ----------
         time_limit : numeric (optional)
             The maximum number of milliseconds to allow before timeout
-            during each turn.
+            during each turn. If None, moves are not timed and time_left()
+            always returns infinity; use this with agents that limit their
+            search by node count or depth for reproducible games.
+
+        move_times : list (optional)
+            If supplied, the number of milliseconds each player spent in
+            get_move() is appended to this list for every move, in the same
+            order as the moves in the move history.
+
+        supervisor : `isolation.supervisor.Supervisor` (optional)
+            If supplied, timed moves are run by the supervisor, which
+            abandons a call to get_move() that has not returned when the
+            time limit runs out and records it as a timeout. Otherwise a
+            player that never returns stalls the game.
 
         Returns
         ----------
@@ -328,9 +497,18 @@ class Board(object):
             game_copy = self.copy()
 
             move_start = curr_time_millis()
-            time_left = lambda : time_limit - (curr_time_millis() - move_start)
-            curr_move = self.active_player.get_move(game_copy, legal_player_moves, time_left)
+            if time_limit is None:
+                time_left = lambda : float("inf")
+            else:
+                time_left = lambda : time_limit - (curr_time_millis() - move_start)
+            if supervisor is None or time_limit is None:
+                curr_move = self.active_player.get_move(game_copy, legal_player_moves, time_left)
+            else:
+                curr_move = supervisor.get_move(self.active_player, game_copy,
+                                                legal_player_moves, time_left)
             move_end = time_left()
+            if move_times is not None:
+                move_times.append(curr_time_millis() - move_start)
 
             # print move_end
 
@@ -0,0 +1,128 @@
+"""
+This file contains the `GameState` class, a compact and player-agnostic
+snapshot of an Isolation game that is cheap to pickle, send between
+processes or store on disk. Use `Board.state()` and `Board.from_state()` to
+convert between a `GameState` and a playable `isolation.Board`.
+"""
+
+import struct
+
+from functools import lru_cache
+
+# width, height, index of the player holding initiative, and the cell index
+# of each player's location (NO_LOCATION before the player is placed)
+HEADER = struct.Struct("<BBBHH")
+NO_LOCATION = 0xFFFF
+
+
+@lru_cache(maxsize=None)
+def symmetries(width, height):
+    """
+    Return the symmetries of a board that preserve knight moves, each as a
+    tuple mapping every cell index to the index of its image. Rectangular
+    boards have 4 symmetries (the identity, two mirrors and the half turn)
+    and square boards 8 (adding the quarter turns and diagonal mirrors).
+    """
+    transforms = [lambda r, c: (r, c),
+                  lambda r, c: (height - 1 - r, c),
+                  lambda r, c: (r, width - 1 - c),
+                  lambda r, c: (height - 1 - r, width - 1 - c)]
+    if width == height:
+        transforms += [lambda r, c: (c, r),
+                       lambda r, c: (c, width - 1 - r),
+                       lambda r, c: (width - 1 - c, r),
+                       lambda r, c: (width - 1 - c, width - 1 - r)]
+    maps = []
+    for transform in transforms:
+        cells = (transform(*divmod(index, width)) for index in range(width * height))
+        maps.append(tuple(r * width + c for r, c in cells))
+    return tuple(maps)
+
+
+class GameState(object):
+    """
+    Immutable snapshot of an Isolation game.
+
+    Parameters
+    ----------
+    width : int
+        The number of columns of the board.
+
+    height : int
+        The number of rows of the board.
+
+    occupancy : int
+        Bitmask of the blocked cells, where the cell at (row, column) is bit
+        `row * width + column` (see `Board.get_occupancy()`).
+
+    locations : ((int, int), (int, int))
+        The (row, column) location of player 1 and player 2, or None for a
+        player that has not been placed yet.
+
+    active : int
+        0 if player 1 holds the initiative, 1 if player 2 does.
+    """
+    __slots__ = ("width", "height", "occupancy", "locations", "active")
+
+    def __init__(self, width, height, occupancy, locations, active):
+        if not (0 < width < 256 and 0 < height < 256 and width * height < NO_LOCATION):
+            raise ValueError("Unsupported board size {}x{}".format(width, height))
+        self.width = width
+        self.height = height
+        self.occupancy = occupancy
+        self.locations = tuple(locations)
+        self.active = active
+
+    def to_bytes(self):
+        """ Encode the game state as a short byte string. """
+        indices = [NO_LOCATION if loc is None else loc[0] * self.width + loc[1]
+                   for loc in self.locations]
+        num_bytes = (self.width * self.height + 7) // 8
+        return (HEADER.pack(self.width, self.height, self.active, *indices) +
+                self.occupancy.to_bytes(num_bytes, "little"))
+
+    @classmethod
+    def from_bytes(cls, data):
+        """ Decode a game state produced by `GameState.to_bytes()`. """
+        width, height, active, index_1, index_2 = HEADER.unpack_from(data)
+        locations = tuple(None if index == NO_LOCATION else divmod(index, width)
+                          for index in (index_1, index_2))
+        occupancy = int.from_bytes(data[HEADER.size:], "little")
+        return cls(width, height, occupancy, locations, active)
+
+    def transform(self, cell_map):
+        """
+        Return the image of the game state under a symmetry, given as one of
+        the cell index maps returned by `symmetries()`.
+        """
+        occupancy, remaining = 0, self.occupancy
+        while remaining:
+            lowest = remaining & -remaining
+            occupancy |= 1 << cell_map[lowest.bit_length() - 1]
+            remaining ^= lowest
+        locations = tuple(None if loc is None else
+                          divmod(cell_map[loc[0] * self.width + loc[1]], self.width)
+                          for loc in self.locations)
+        return GameState(self.width, self.height, occupancy, locations, self.active)
+
+    def canonical(self):
+        """
+        Return the representative of the game state among its symmetric
+        images, so that symmetric positions compare equal after conversion.
+        """
+        images = [self.transform(cell_map)
+                  for cell_map in symmetries(self.width, self.height)]
+        return min(images, key=GameState.to_bytes)
+
+    def __reduce__(self):
+        return (GameState.from_bytes, (self.to_bytes(),))
+
+    def __eq__(self, other):
+        return isinstance(other, GameState) and self.to_bytes() == other.to_bytes()
+
+    def __hash__(self):
+        return hash(self.to_bytes())
+
+    def __repr__(self):
+        return "GameState({}, {}, {:#x}, {!r}, {})".format(
+            self.width, self.height, self.occupancy, self.locations, self.active)
@@ -0,0 +1,197 @@
+"""
+This file contains supervisors that enforce hard move deadlines in
+`Board.play()`. Without one, a player is only found to have timed out once
+`get_move()` returns, so a player that never returns (a heuristic stuck in
+a loop, or a `HumanPlayer` left in a timed game) stalls the game forever.
+A supervisor runs `get_move()` in a worker thread or process instead, and
+abandons it when the time limit of the move runs out; the game then ends
+with a "timeout" like any other late move.
+
+    game.play(time_limit=150, supervisor=ProcessSupervisor())
+
+`ThreadSupervisor` is cheap, but Python threads cannot be killed: an
+abandoned `get_move()` keeps running (and competing for the GIL, which
+slows down every later move) until it returns, and it may still change the
+player's state. `ProcessSupervisor` forks a child process for every move
+and kills it at the deadline, which makes abandoned moves disappear
+completely, but changes the player makes to itself during the search
+(caches, statistics callbacks, timer calibration) are lost with the child.
+
+Supervision adds latency to every move (starting the thread or process,
+copying the player, returning the move), which is charged to the player's
+time limit. Every supervisor measures it: `overheads` holds the
+milliseconds each move took beyond the player's own `get_move()` call, and
+`summary()` reports them.
+"""
+
+import multiprocessing
+import os
+import signal
+import sys
+import threading
+import timeit
+
+from collections import OrderedDict
+
+
+def curr_time_millis():
+    return 1000 * timeit.default_timer()
+
+
+class Deadline(object):
+    """
+    A picklable `time_left()` function counting down to the same instant
+    as the one of `Board.play()`. The clock is system-wide, so a deadline
+    can be sent to a child process.
+    """
+
+    def __init__(self, time_left):
+        self.end = curr_time_millis() + time_left
+
+    def __call__(self):
+        return self.end - curr_time_millis()
+
+
+class Supervisor(object):
+    """
+    Base class of the supervisors, keeping their measurements.
+
+    Attributes
+    ----------
+    overheads : list<float>
+        Milliseconds spent supervising each completed move, i.e. the time
+        from the call to `get_move()` to its return minus the time the
+        player spent in its own `get_move()`.
+
+    abandoned : int
+        Number of moves abandoned at their deadline.
+    """
+
+    def __init__(self):
+        self.overheads = []
+        self.abandoned = 0
+
+    def get_move(self, player, game, legal_moves, time_left):
+        """
+        Call `player.get_move(game, legal_moves, time_left)` and return its
+        move, or None when it does not return before `time_left()` reaches
+        zero.
+        """
+        raise NotImplementedError
+
+    def summary(self):
+        """ Return the number of moves, their overhead statistics in ms and the abandoned moves. """
+        overheads = sorted(self.overheads)
+        count = len(overheads)
+
+        def percentile(p):
+            return overheads[min(count - 1, int(p / 100. * count))] if count else 0.
+
+        return OrderedDict([
+            ("moves", count),
+            ("mean", sum(overheads) / count if count else 0.),
+            ("p50", percentile(50)),
+            ("p99", percentile(99)),
+            ("max", overheads[-1] if count else 0.),
+            ("abandoned", self.abandoned)])
+
+
+class ThreadSupervisor(Supervisor):
+    """ Run every move in a daemon thread, abandoned at the deadline. """
+
+    def get_move(self, player, game, legal_moves, time_left):
+        start = curr_time_millis()
+        result = {}
+
+        def run():
+            move_start = curr_time_millis()
+            try:
+                result["move"] = player.get_move(game, legal_moves, time_left)
+            except BaseException:
+                result["error"] = sys.exc_info()[1]
+            result["elapsed"] = curr_time_millis() - move_start
+
+        thread = threading.Thread(target=run, daemon=True)
+        thread.start()
+        remaining = time_left()
+        while remaining >= 0 and thread.is_alive():
+            thread.join(remaining / 1000.)
+            remaining = time_left()
+        if thread.is_alive():
+            self.abandoned += 1
+            return None
+        if "error" in result:
+            raise result["error"]
+        self.overheads.append(curr_time_millis() - start - result["elapsed"])
+        return result["move"]
+
+
+def _child_get_move(conn, player, game, legal_moves, time_left):
+    """ Run a move in a child process of `ProcessSupervisor` and send back the result. """
+    move_start = curr_time_millis()
+    try:
+        reply = ("move", player.get_move(game, legal_moves, time_left))
+    except Exception as error:
+        reply = ("error", error)
+    conn.send(reply + (curr_time_millis() - move_start,))
+    conn.close()
+
+
+class ProcessSupervisor(Supervisor):
+    """
+    Run every move in a child process, killed at the deadline. Where
+    `os.fork()` exists the child is forked directly, so that the player and
+    the game do not have to be pickled and supervised games can be played
+    from the (daemonic) worker processes of `multiprocessing.Pool`;
+    elsewhere the child is a `multiprocessing.Process`, and both must be
+    picklable.
+    """
+
+    def get_move(self, player, game, legal_moves, time_left):
+        start = curr_time_millis()
+        receiver, sender = multiprocessing.Pipe(duplex=False)
+        if hasattr(os, "fork"):
+            pid = os.fork()
+            if pid == 0:
+                try:
+                    receiver.close()
+                    _child_get_move(sender, player, game, legal_moves, time_left)
+                finally:
+                    os._exit(0)
+            stop = lambda: _kill(pid)
+        else:
+            child = multiprocessing.Process(target=_child_get_move, daemon=True,
+                                            args=(sender, player, game, legal_moves,
+                                                  Deadline(time_left())))
+            child.start()
+            stop = lambda: (child.terminate(), child.join())
+        sender.close()
+        try:
+            ready = False
+            remaining = time_left()
+            while not ready and remaining >= 0:
+                ready = receiver.poll(remaining / 1000.)
+                remaining = time_left()
+            if not ready:
+                self.abandoned += 1
+                return None
+            kind, value, elapsed = receiver.recv()
+        except EOFError:
+            # the child died without replying, which counts as no move
+            return None
+        finally:
+            receiver.close()
+            stop()
+        if kind == "error":
+            raise value
+        self.overheads.append(curr_time_millis() - start - elapsed)
+        return value
+
+
+def _kill(pid):
+    """ Kill a forked child if it still runs, and reap it. """
+    try:
+        os.kill(pid, signal.SIGKILL)
+    except ProcessLookupError:
+        pass
+    os.waitpid(pid, 0)
@@ -0,0 +1,108 @@
+"""
+Collect the time each agent spends on its moves during a tournament and
+summarize it as latency percentiles per agent and game phase, together with
+the margin left to the move time limit. The margins show how much of the
+time limit the `TIMER_THRESHOLD` of `CustomPlayer` really needs to keep in
+reserve, instead of finding out from games lost to timeouts.
+
+The game phase of a move is decided by its ply, i.e., the number of moves
+already played on the board (including the random opening moves).
+"""
+
+import csv
+import json
+import math
+
+from collections import OrderedDict
+
+# (phase name, first ply after the phase); the last phase has no end
+PHASES = [("opening", 10), ("middlegame", 25), ("endgame", None)]
+PERCENTILES = [50, 95, 99]
+
+
+def game_phase(ply):
+    """ Return the name of the game phase a move at the given ply belongs to. """
+    for name, end in PHASES:
+        if end is None or ply < end:
+            return name
+
+
+def percentile(values, p):
+    """ Return the nearest-rank percentile `p` of a sorted list of values. """
+    return values[max(0, int(math.ceil(p / 100. * len(values))) - 1)]
+
+
+class MoveLatencies(object):
+    """
+    Move times in milliseconds grouped by agent name and game phase.
+
+    Parameters
+    ----------
+    time_limit : float or None
+        Move time limit in milliseconds the games were played with, used to
+        compute margins; None for untimed games.
+    """
+
+    def __init__(self, time_limit):
+        self.time_limit = time_limit
+        self.times = OrderedDict()
+
+    def add(self, agent, ply, millis):
+        self.times.setdefault((agent, game_phase(ply)), []).append(millis)
+
+    def update(self, other):
+        """ Add all the move times collected by another `MoveLatencies`. """
+        for key, values in other.times.items():
+            self.times.setdefault(key, []).extend(values)
+
+    def add_game(self, game):
+        """
+        Add the move times of a game record from `tournament.play_match()`,
+        which must name its players (see `tournament.play_round_match()`).
+        """
+        first_ply = len(game["opening"])
+        for idx, millis in enumerate(game["move_times"]):
+            self.add(game["players"][idx % 2], first_ply + idx, millis)
+
+    def summary(self):
+        """
+        Return one OrderedDict per (agent, phase) with the number of moves,
+        the latency percentiles and maximum, and the margin left to the time
+        limit by the slowest move (None for untimed games).
+        """
+        rows = []
+        phase_order = [name for name, _ in PHASES]
+        for agent, phase in sorted(self.times, key=lambda k: (k[0], phase_order.index(k[1]))):
+            values = sorted(self.times[(agent, phase)])
+            row = OrderedDict([("agent", agent), ("phase", phase), ("moves", len(values))])
+            for p in PERCENTILES:
+                row["p{}".format(p)] = percentile(values, p)
+            row["max"] = values[-1]
+            row["margin"] = None if self.time_limit is None else self.time_limit - values[-1]
+            rows.append(row)
+        return rows
+
+    def print_table(self):
+        """ Print the summary in the layout of the tournament results. """
+        print("\nMove latency (ms):")
+        print("----------")
+        print("  {!s:<12}{!s:<12}{:>7}{:>9}{:>9}{:>9}{:>9}{:>9}".format(
+            "Agent", "Phase", "Moves", "p50", "p95", "p99", "max", "margin"))
+        for row in self.summary():
+            margin = "-" if row["margin"] is None else "{:.1f}".format(row["margin"])
+            print("  {!s:<12}{!s:<12}{:>7}{:>9.1f}{:>9.1f}{:>9.1f}{:>9.1f}{:>9}".format(
+                row["agent"], row["phase"], row["moves"], row["p50"], row["p95"],
+                row["p99"], row["max"], margin))
+
+    def save(self, path):
+        """ Write the summary to a CSV file, or a JSON file if path ends in .json. """
+        rows = self.summary()
+        if path.endswith(".json"):
+            with open(path, "w") as f:
+                json.dump({"time_limit": self.time_limit, "latencies": rows}, f, indent=2)
+            return
+        with open(path, "w", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=["agent", "phase", "moves"] +
+                                    ["p{}".format(p) for p in PERCENTILES] + ["max", "margin"])
+            writer.writeheader()
+            writer.writerows(rows)
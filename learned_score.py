@@ -0,0 +1,334 @@
+"""This file contains a learned evaluation function: a linear model or a
+multilayer perceptron with one hidden layer that maps a fixed vector of
+board features to the log-odds of winning, with weights loaded from a NumPy
+`.npz` file. Use a `LearnedScore` as the `score_fn` of a `CustomPlayer`, or
+its `batch` method as the `batch_score_fn`.
+
+The features are all computed with the bitboard helpers of
+`isolation.bitboard`: the mobility, second-order mobility (cells two knight
+moves away), reachable area and area reached first of both players, whether
+each player can move to the center cell, and whether the player can move to
+the mirror image of its opponent's location.
+
+Train a model on samples written by `selfplay.py` with
+
+    python learned_score.py train data/ --out model.npz --hidden 16
+
+and compare its evaluations per second with the hand-written heuristics with
+
+    python learned_score.py benchmark model.npz
+"""
+import argparse
+import timeit
+
+import numpy as np
+
+from isolation import Board
+from isolation.bitboard import expand, knight_masks, popcount, race
+from game_agent import custom_score
+from sample_players import improved_score
+
+FEATURE_NAMES = ("to_move",
+                 "own_mobility", "opp_mobility",
+                 "own_mobility_2", "opp_mobility_2",
+                 "own_reachable", "opp_reachable",
+                 "own_first", "opp_first",
+                 "own_center", "opp_center",
+                 "own_mirror")
+
+
+def extract_features(game, player):
+    """Return the feature vector of a game state from the point of view of
+    `player`, in the order of `FEATURE_NAMES`.
+    """
+    width, height = game.width, game.height
+    masks = knight_masks(width, height)
+    open_cells = ((1 << (width * height)) - 1) & ~game.get_occupancy()
+    opponent = game.get_opponent(player)
+    own_location = game.get_player_location(player)
+    opp_location = game.get_player_location(opponent)
+    own_start = None if own_location is None else own_location[0] * width + own_location[1]
+    opp_start = None if opp_location is None else opp_location[0] * width + opp_location[1]
+
+    own_reach, opp_reach, own_first, opp_first = race(own_start, opp_start, open_cells, masks)
+    own_moves = open_cells if own_start is None else masks[own_start] & open_cells
+    opp_moves = open_cells if opp_start is None else masks[opp_start] & open_cells
+
+    # The center cell only exists on boards with an odd width and height
+    center = 0
+    if width % 2 and height % 2:
+        center = 1 << ((height // 2) * width + width // 2)
+    mirror = 0
+    if opp_location is not None:
+        mirror = 1 << ((height - 1 - opp_location[0]) * width + width - 1 - opp_location[1])
+
+    return [float(game.active_player == player),
+            float(popcount(own_moves)), float(popcount(opp_moves)),
+            float(popcount(expand(own_moves, masks) & open_cells)),
+            float(popcount(expand(opp_moves, masks) & open_cells)),
+            float(popcount(own_reach)), float(popcount(opp_reach)),
+            float(popcount(own_first)), float(popcount(opp_first)),
+            float(bool(own_moves & center)), float(bool(opp_moves & center)),
+            float(bool(own_moves & mirror))]
+
+
+class LearnedScore(object):
+    """Evaluation function backed by a linear model (when `w2` is None) or
+    a 1-hidden-layer perceptron with ReLU activations over standardized
+    features:
+
+        linear: score = x @ w1 + b1
+        MLP:    score = relu(x @ w1 + b1) @ w2 + b2
+
+    where `x = (features - mean) / std`. The standardization is folded into
+    the first layer when the model is built, so inference is one or two
+    small matrix products (a plain Python dot product for linear models).
+
+    Parameters
+    ----------
+    w1, b1 : numpy.ndarray
+        First layer weights of shape (num_features,) for a linear model or
+        (num_features, hidden) for an MLP, and its bias.
+
+    w2, b2 : numpy.ndarray (optional)
+        Output layer weights of shape (hidden,) and bias of an MLP.
+
+    mean, std : numpy.ndarray (optional)
+        Feature standardization; defaults to the identity.
+    """
+
+    def __init__(self, w1, b1, w2=None, b2=None, mean=None, std=None):
+        num_features = len(FEATURE_NAMES)
+        self.w1 = np.asarray(w1, dtype=float)
+        self.b1 = np.asarray(b1, dtype=float)
+        self.w2 = None if w2 is None else np.asarray(w2, dtype=float)
+        self.b2 = None if b2 is None else np.asarray(b2, dtype=float)
+        self.mean = np.zeros(num_features) if mean is None else np.asarray(mean, dtype=float)
+        self.std = np.ones(num_features) if std is None else np.asarray(std, dtype=float)
+        if self.w1.shape[0] != num_features:
+            raise ValueError("Expected {} input weights, got {}".format(num_features, self.w1.shape[0]))
+
+        # Fold the standardization into the first layer
+        scale = 1. / self.std
+        if self.w1.ndim == 1:
+            self.w1_folded = self.w1 * scale
+        else:
+            self.w1_folded = self.w1 * scale[:, None]
+        self.b1_folded = self.b1 - (self.mean * scale) @ self.w1
+        self.linear_weights = None
+        if self.w2 is None:
+            self.linear_weights = [float(w) for w in self.w1_folded]
+            self.linear_bias = float(self.b1_folded)
+
+    @property
+    def hidden(self):
+        """ Number of hidden units, 0 for a linear model. """
+        return 0 if self.w2 is None else self.w1.shape[1]
+
+    @classmethod
+    def load(cls, path):
+        """ Read a model written by `LearnedScore.save()`. """
+        with np.load(path) as data:
+            if tuple(data["feature_names"]) != FEATURE_NAMES:
+                raise ValueError("{} was trained on different features".format(path))
+            return cls(data["w1"], data["b1"],
+                       data["w2"] if "w2" in data else None,
+                       data["b2"] if "b2" in data else None,
+                       data["mean"], data["std"])
+
+    def save(self, path):
+        arrays = {"feature_names": np.array(FEATURE_NAMES), "w1": self.w1, "b1": self.b1,
+                  "mean": self.mean, "std": self.std}
+        if self.w2 is not None:
+            arrays.update(w2=self.w2, b2=self.b2)
+        np.savez(path, **arrays)
+
+    def predict(self, features):
+        """ Return the scores of a (n, num_features) array of features. """
+        hidden = features @ self.w1_folded + self.b1_folded
+        if self.w2 is None:
+            return hidden
+        return np.maximum(hidden, 0.) @ self.w2 + self.b2
+
+    def __call__(self, game, player):
+        if game.is_loser(player):
+            return float("-inf")
+
+        if game.is_winner(player):
+            return float("inf")
+
+        features = extract_features(game, player)
+        if self.linear_weights is not None:
+            return self.linear_bias + sum(w * x for w, x in zip(self.linear_weights, features))
+        return float(self.predict(np.array(features)))
+
+    def batch(self, games, player):
+        """ Score a list of game states at once (see `batch_score_fn`). """
+        scores = [None] * len(games)
+        rows, indices = [], []
+        for idx, game in enumerate(games):
+            if game.is_loser(player):
+                scores[idx] = float("-inf")
+            elif game.is_winner(player):
+                scores[idx] = float("inf")
+            else:
+                rows.append(extract_features(game, player))
+                indices.append(idx)
+        if rows:
+            for idx, score in zip(indices, self.predict(np.array(rows))):
+                scores[idx] = float(score)
+        return scores
+
+
+def load_samples(directory, max_samples=None):
+    """
+    Build a training set from the self-play samples in `directory`. Each
+    sample gives two rows: the features for the player to move labelled with
+    its outcome, and the features for its opponent with the opposite label.
+
+    Returns
+    ----------
+    (numpy.ndarray, numpy.ndarray)
+        The (n, num_features) features and the n outcomes (1 for a win).
+    """
+    from selfplay import read_samples, shard_paths
+
+    rows, labels = [], []
+    for idx, (state, _, outcome) in enumerate(read_samples(shard_paths(directory))):
+        if max_samples is not None and idx >= max_samples:
+            break
+        game = Board.from_state(state, "player1", "player2")
+        won = 1. if outcome > 0 else 0.
+        rows.append(extract_features(game, game.active_player))
+        labels.append(won)
+        rows.append(extract_features(game, game.inactive_player))
+        labels.append(1. - won)
+    return np.array(rows), np.array(labels)
+
+
+def train(features, labels, hidden=0, epochs=100, learning_rate=0.01, batch_size=256,
+          l2=1e-4, seed=0):
+    """
+    Fit a model predicting the log-odds of winning by minimizing the
+    logistic loss with minibatch Adam.
+
+    Returns
+    ----------
+    LearnedScore
+    """
+    rng = np.random.RandomState(seed)
+    mean = features.mean(axis=0)
+    std = features.std(axis=0)
+    std[std == 0.] = 1.
+    x_all = (features - mean) / std
+    num_features = features.shape[1]
+
+    if hidden:
+        params = [rng.randn(num_features, hidden) * np.sqrt(2. / num_features),
+                  np.zeros(hidden), rng.randn(hidden) * np.sqrt(1. / hidden), np.zeros(())]
+    else:
+        params = [np.zeros(num_features), np.zeros(())]
+    moments = [np.zeros_like(p) for p in params]
+    velocities = [np.zeros_like(p) for p in params]
+    beta_1, beta_2, eps = 0.9, 0.999, 1e-8
+
+    step = 0
+    for _ in range(epochs):
+        order = rng.permutation(len(x_all))
+        for start in range(0, len(order), batch_size):
+            batch = order[start:start + batch_size]
+            x, y = x_all[batch], labels[batch]
+            if hidden:
+                w1, b1, w2, b2 = params
+                pre = x @ w1 + b1
+                act = np.maximum(pre, 0.)
+                logits = act @ w2 + b2
+            else:
+                w1, b1 = params
+                logits = x @ w1 + b1
+            error = (1. / (1. + np.exp(-np.clip(logits, -50., 50.))) - y) / len(batch)
+            if hidden:
+                delta = np.outer(error, w2) * (pre > 0.)
+                grads = [x.T @ delta + l2 * w1, delta.sum(axis=0),
+                         act.T @ error + l2 * w2, error.sum()]
+            else:
+                grads = [x.T @ error + l2 * w1, error.sum()]
+
+            step += 1
+            for p, g, m, v in zip(params, grads, moments, velocities):
+                m *= beta_1
+                m += (1. - beta_1) * g
+                v *= beta_2
+                v += (1. - beta_2) * g * g
+                p -= learning_rate * (m / (1. - beta_1 ** step)) / (
+                    np.sqrt(v / (1. - beta_2 ** step)) + eps)
+
+    if hidden:
+        return LearnedScore(params[0], params[1], params[2], params[3], mean, std)
+    return LearnedScore(params[0], params[1], mean=mean, std=std)
+
+
+def benchmark(models, num_positions=500):
+    """
+    Print the evaluations per second of `improved_score`, `custom_score`
+    and each named model on the same random positions, both one position at
+    a time and as a single batch.
+    """
+    from tournament import random_positions
+
+    positions = random_positions(num_positions)
+    player = "player1"
+
+    def rate(fn):
+        elapsed = min(timeit.repeat(fn, number=1, repeat=3))
+        return num_positions / elapsed
+
+    print("\nEvaluations per second:")
+    print("----------")
+    for name, score_fn in [("improved_score", improved_score), ("custom_score", custom_score)]:
+        print("{!s:<28}{:>12.0f}".format(name, rate(lambda: [score_fn(g, player) for g in positions])))
+    for name, model in models:
+        print("{!s:<28}{:>12.0f}".format(name, rate(lambda: [model(g, player) for g in positions])))
+        print("{!s:<28}{:>12.0f}".format(name + " (batch)", rate(lambda: model.batch(positions, player))))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Train or benchmark a learned evaluation function.")
+    subparsers = parser.add_subparsers(dest="command")
+    subparsers.required = True  # add_subparsers() only takes required= from Python 3.7
+    train_parser = subparsers.add_parser("train", help="fit a model to self-play samples")
+    train_parser.add_argument("samples", help="directory of shards written by selfplay.py")
+    train_parser.add_argument("--out", required=True, help=".npz file receiving the model")
+    train_parser.add_argument("--hidden", type=int, default=0,
+                              help="hidden units of the MLP (0 trains a linear model)")
+    train_parser.add_argument("--epochs", type=int, default=100)
+    train_parser.add_argument("--learning-rate", type=float, default=0.01)
+    train_parser.add_argument("--max-samples", type=int, default=None)
+    train_parser.add_argument("--seed", type=int, default=0)
+    bench_parser = subparsers.add_parser("benchmark", help="measure evaluations per second")
+    bench_parser.add_argument("models", nargs="*",
+                              help=".npz models (default: untrained linear and 16 unit MLP)")
+    args = parser.parse_args()
+
+    if args.command == "train":
+        features, labels = load_samples(args.samples, args.max_samples)
+        model = train(features, labels, args.hidden, args.epochs, args.learning_rate,
+                      seed=args.seed)
+        model.save(args.out)
+        logits = model.predict(features)
+        accuracy = np.mean((logits > 0.) == (labels > 0.5))
+        print("Trained on {} rows, accuracy {:.3f}".format(len(labels), accuracy))
+    else:
+        if args.models:
+            models = [(path, LearnedScore.load(path)) for path in args.models]
+        else:
+            rng = np.random.RandomState(0)
+            num_features = len(FEATURE_NAMES)
+            models = [("linear", LearnedScore(rng.randn(num_features), 0.)),
+                      ("mlp_16", LearnedScore(rng.randn(num_features, 16), np.zeros(16),
+                                              rng.randn(16), 0.))]
+        benchmark(models)
+
+
+if __name__ == "__main__":
+    main()
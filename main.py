@@ -4,6 +4,7 @@ import sys
 import logging
 import logging.config
 import game_agent
+from profiling import MODES as PROFILE_MODES, Profiler
 
 def get_log_level(log_args):
     valid_levels = ['DEBUG', 'INFO', 'WARNING', 'ERROR'] # numeric levels 10, 20, 30, 40
@@ -12,12 +13,33 @@ def get_log_level(log_args):
         raise ValueError('Invalid log level: %s' % proposed_level)
     return proposed_level
 
+def get_profile_args(argv):
+    """
+    Return the profiling mode (None when not profiling) and output prefix
+    given by --profile[=cprofile|sample] and --profile-out=PREFIX.
+    """
+    mode, out = None, 'isolation_profile'
+    for arg in argv:
+        if arg == '--profile':
+            mode = 'cprofile'
+        elif arg.startswith('--profile='):
+            mode = arg.split("=", 1)[1].lower()
+            if not mode in PROFILE_MODES:
+                raise ValueError('Invalid profiling mode: %s' % mode)
+        elif arg.startswith('--profile-out='):
+            out = arg.split("=", 1)[1]
+    return mode, out
+
 def main():
     """
     Note: Manually override the lowest-severity log message level
     that the logger will handle from the command line by executing with flags:
     i.e. python main.py --log=WARNING
 
+    Profile the run with cProfile, or with a low-overhead stack sampler, and
+    write PREFIX.pstats and PREFIX.collapsed with:
+    i.e. python main.py --profile[=sample] --profile-out=PREFIX
+
     Sample usage:
         logger.debug('debug message')
         logger.info('info message')
@@ -40,7 +62,12 @@ def main():
     # Get current logging level
     numeric_level = logging.getLogger().getEffectiveLevel()
     logging.info('Starting Isolation with logger level: %r', numeric_level)
-    game_agent.run()
+    profile_mode, profile_out = get_profile_args(sys.argv)
+    if profile_mode:
+        with Profiler(profile_mode, profile_out):
+            game_agent.run()
+    else:
+        game_agent.run()
     logging.info('Finished Isolation')
 
 if __name__ == '__main__':
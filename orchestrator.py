@@ -0,0 +1,437 @@
+"""
+Play many games concurrently between engine subprocesses (see `engine.py`)
+with asyncio, for large-scale evaluation on one host.
+
+The orchestrator, not the engines, enforces the move time limit: a move
+that arrives after the limit loses the game on time, and an engine that
+does not answer within a grace period after the limit is sent "stop", then
+killed and restarted if it still does not answer. An engine that exits
+loses the game by "crash" and is restarted for later games. At most
+`concurrency` games are in progress at any time (one per available CPU by
+default), so engines never compete for CPU time.
+
+Matches, openings, seeds and game records follow `tournament.py`: the agent
+under test plays two games from each random opening against each opponent,
+and `play_round()` prints the same report and returns the same win ratio as
+`tournament.play_round()`.
+
+    python orchestrator.py --matches 50 --concurrency 8
+
+Agents are engine settings rather than player objects, so the fixed-depth
+MM and AB opponents of `tournament.py` are approximated by engines whose
+iterative deepening stops at the same depth, and the Random agent is not
+available.
+"""
+
+import argparse
+import asyncio
+import random
+import sys
+import time
+import warnings
+
+from collections import namedtuple
+
+import engine
+from isolation import Board
+from game_agent import SCORE_FUNCTIONS
+from tournament import (NUM_MATCHES, OVERSUBSCRIPTION_WARNING, TIME_LIMIT, TIMEOUT_WARNING,
+                        available_cpus, match_seed)
+
+STARTUP_TIMEOUT = 10.  # seconds allowed for an engine to start and answer "isready"
+DEADLINE_GRACE = 100.  # milliseconds to wait for a move after the time limit
+UNTIMED_DEADLINE = 60000.  # milliseconds allowed for a move of an untimed game
+
+# Engine options (see `engine.DEFAULT_OPTIONS`) and the deepest iteration of
+# each move, or None for no depth limit
+AgentSpec = namedtuple("AgentSpec", ["name", "options", "depth"])
+
+
+class EngineFailure(Exception):
+    """ Raised when an engine misses a deadline or exits. """
+
+    def __init__(self, termination):
+        super(EngineFailure, self).__init__(termination)
+        self.termination = termination
+
+
+class EngineProcess(object):
+    """ An engine subprocess driven through asyncio streams. """
+
+    def __init__(self, spec, command=None):
+        self.spec = spec
+        self.command = command or [sys.executable, engine.__file__]
+        self.process = None
+        self.restarts = 0
+
+    async def start(self):
+        self.process = await asyncio.create_subprocess_exec(
+            *self.command, stdin=asyncio.subprocess.PIPE, stdout=asyncio.subprocess.PIPE)
+        await self.send("isolation")
+        await self.read_until("isolationok", STARTUP_TIMEOUT)
+        for name, value in sorted(self.spec.options.items()):
+            await self.send("setoption name {} value {}".format(name, value))
+        await self.send("isready")
+        await self.read_until("readyok", STARTUP_TIMEOUT)
+
+    async def send(self, line):
+        try:
+            self.process.stdin.write((line + "\n").encode())
+            await self.process.stdin.drain()
+        except (BrokenPipeError, ConnectionResetError):
+            raise EngineFailure("crash")
+
+    async def read_until(self, prefix, timeout):
+        """
+        Return the lines read up to and including the first starting with
+        `prefix`, waiting at most `timeout` seconds in total.
+        """
+        deadline = time.perf_counter() + timeout
+        lines = []
+        while True:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                raise EngineFailure("timeout")
+            try:
+                line = await asyncio.wait_for(self.process.stdout.readline(), remaining)
+            except asyncio.TimeoutError:
+                raise EngineFailure("timeout")
+            if not line:
+                raise EngineFailure("crash")
+            line = line.decode().rstrip("\n")
+            lines.append(line)
+            if line.startswith(prefix):
+                return lines
+
+    async def new_game(self, width=7, height=7):
+        await self.send("newgame")
+        await self.send("size {} {}".format(width, height))
+
+    async def go(self, moves, movetime=None, nodes=None):
+        """
+        Ask for a move in the position reached by `moves`.
+
+        Returns
+        ----------
+        ((int, int), str or None, float)
+            The move, the last "info depth" line, and the milliseconds the
+            move took as measured by the orchestrator.
+
+        Raises
+        ----------
+        EngineFailure
+            When the move arrives after the time limit ("timeout") or the
+            engine exits ("crash"). Either way the engine is ready for the
+            next command afterwards, restarted if needed.
+        """
+        position = "position startpos"
+        if moves:
+            position += " moves " + " ".join(engine.format_move(m) for m in moves)
+        limits = [("movetime", movetime), ("nodes", nodes), ("depth", self.spec.depth)]
+        command = " ".join(["go"] + ["{} {}".format(k, v) for k, v in limits if v is not None])
+        wait = (movetime if movetime is not None else UNTIMED_DEADLINE) + DEADLINE_GRACE
+        try:
+            await self.send(position)
+            start = time.perf_counter()
+            await self.send(command)
+            lines = await self.read_until("bestmove", wait / 1000.)
+        except EngineFailure as failure:
+            if failure.termination == "timeout":
+                await self.recover()
+            else:
+                await self.restart()
+            raise
+        millis = 1000. * (time.perf_counter() - start)
+        if movetime is not None and millis > movetime:
+            raise EngineFailure("timeout")
+        info = [line for line in lines if line.startswith("info depth")]
+        return engine.parse_move(lines[-1].split()[1]), (info[-1] if info else None), millis
+
+    async def recover(self):
+        """ Stop a search that missed its deadline, restarting the engine if it hangs. """
+        try:
+            await self.send("stop")
+            await self.send("isready")
+            await self.read_until("readyok", DEADLINE_GRACE / 1000.)
+        except EngineFailure:
+            await self.restart()
+
+    async def restart(self):
+        self.kill()
+        await self.process.wait()
+        self.restarts += 1
+        await self.start()
+
+    def kill(self):
+        if self.process is not None and self.process.returncode is None:
+            self.process.kill()
+
+    async def close(self):
+        if self.process is None or self.process.returncode is not None:
+            return
+        try:
+            await self.send("quit")
+            await asyncio.wait_for(self.process.wait(), 1.)
+        except (EngineFailure, asyncio.TimeoutError):
+            self.kill()
+            await self.process.wait()
+
+
+class EnginePool(object):
+    """
+    Idle engines of one agent, started on demand. Engines are reused by
+    later games, so their evaluation caches stay warm.
+    """
+
+    def __init__(self, spec, command=None):
+        self.spec = spec
+        self.command = command
+        self.idle = []
+        self.engines = []
+
+    async def acquire(self):
+        if self.idle:
+            return self.idle.pop()
+        process = EngineProcess(self.spec, self.command)
+        self.engines.append(process)
+        await process.start()
+        return process
+
+    def release(self, process):
+        self.idle.append(process)
+
+    @property
+    def restarts(self):
+        return sum(process.restarts for process in self.engines)
+
+    async def close(self):
+        for process in self.engines:
+            await process.close()
+
+
+def parse_info(info):
+    """ Return the search totals of an "info depth ..." line, as `tournament.SearchTotals`. """
+    fields = dict(zip(info.split()[1::2], info.split()[2::2]))
+    return {"moves": 1, "nodes": int(fields["nodes"]), "depth": int(fields["depth"]),
+            "elapsed": float(fields["time"]) / 1000.}
+
+
+async def play_game(engines, opening, movetime=None, nodes=None):
+    """
+    Play a game between two `EngineProcess`es from the opening moves, the
+    first engine moving first after the opening.
+
+    Returns
+    ----------
+    dict
+        A game record like those of `tournament.play_match()`.
+    """
+    game = Board("player1", "player2")
+    for move in opening:
+        game.apply_move(move)
+    moves = list(opening)
+    move_times = []
+    search_stats = [{}, {}]
+    for process in engines:
+        await process.new_game()
+
+    # Like `Board.play()`, the engine is asked for a move even when it has
+    # no legal move left, and its "none" ends the game as an illegal move
+    # (see `isolation.archive.TERMINATIONS`)
+    while True:
+        turn = len(move_times) % 2
+        legal_moves = game.get_legal_moves()
+        try:
+            move, info, millis = await engines[turn].go(moves, movetime, nodes)
+        except EngineFailure as failure:
+            termination = failure.termination
+            break
+        move_times.append(millis)
+        moves.append(move)
+        if info is not None:
+            totals = parse_info(info)
+            for field, value in totals.items():
+                search_stats[turn][field] = search_stats[turn].get(field, 0) + value
+        # a move that is not legal forfeits the game, and is recorded as
+        # the last move
+        if move not in legal_moves:
+            termination = "illegal move"
+            break
+        game.apply_move(move)
+
+    return {"opening": list(opening), "moves": moves[len(opening):],
+            "winner": 2 if turn == 0 else 1, "termination": termination,
+            "move_times": move_times, "search_stats": search_stats}
+
+
+class Orchestrator(object):
+    """
+    Play matches between agents, each backed by a pool of engine processes,
+    with at most `concurrency` games in progress at once.
+    """
+
+    def __init__(self, specs, concurrency, movetime=TIME_LIMIT, nodes=None, command=None):
+        self.specs = specs
+        self.pools = [EnginePool(spec, command) for spec in specs]
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.movetime = movetime
+        self.nodes = nodes
+
+    async def play_match(self, job):
+        """
+        Play the match described by a `tournament.play_round_match()` job
+        between the last agent and one of its opponents, and return the
+        same result tuple.
+        """
+        opponent_idx, order, _, seed = job
+        rng = random.Random(seed) if seed is not None else random
+        opening = []
+        board = Board("player1", "player2")
+        for _ in range(2):
+            move = rng.choice(board.get_legal_moves())
+            board.apply_move(move)
+            opening.append(move)
+
+        agent_idx = len(self.specs) - 1
+        scores = {agent_idx: 0, opponent_idx: 0}
+        games = []
+        for game_idx in range(2):
+            first = (order + game_idx) % 2
+            indices = [agent_idx, opponent_idx] if first == 0 else [opponent_idx, agent_idx]
+            async with self.semaphore:
+                engines = [await self.pools[idx].acquire() for idx in indices]
+                try:
+                    record = await play_game(engines, opening, self.movetime, self.nodes)
+                finally:
+                    for idx, process in zip(indices, engines):
+                        self.pools[idx].release(process)
+            record["players"] = [self.specs[idx].name for idx in indices]
+            scores[indices[record["winner"] - 1]] += 1
+            games.append(record)
+        return opponent_idx, scores[agent_idx], scores[opponent_idx], games
+
+    async def play_matches(self, jobs):
+        try:
+            return await asyncio.gather(*(self.play_match(job) for job in jobs))
+        finally:
+            for pool in self.pools:
+                await pool.close()
+
+    @property
+    def restarts(self):
+        return sum(pool.restarts for pool in self.pools)
+
+
+def run_matches(specs, jobs, concurrency, movetime=TIME_LIMIT, nodes=None, command=None):
+    """
+    Play the jobs of a round in an event loop of their own.
+
+    Returns
+    ----------
+    (list, int)
+        The results of the matches in job order, and the number of engine
+        restarts.
+    """
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    try:
+        orchestrator = Orchestrator(specs, concurrency, movetime, nodes, command)
+        results = loop.run_until_complete(orchestrator.play_matches(jobs))
+        return results, orchestrator.restarts
+    finally:
+        asyncio.set_event_loop(None)
+        loop.close()
+
+
+def play_round(specs, num_matches, concurrency=None, seed=None, movetime=TIME_LIMIT,
+               nodes=None, latencies=None, search_stats=None, command=None):
+    """
+    Play one round like `tournament.play_round()`, with the matches played
+    concurrently by engine subprocesses, and return the win ratio of the
+    last agent.
+    """
+    cpus = available_cpus()
+    concurrency = concurrency or cpus
+    if concurrency > cpus and movetime is not None:
+        warnings.warn(OVERSUBSCRIPTION_WARNING.format(concurrency, cpus, cpus))
+        concurrency = cpus
+
+    jobs = [(idx, order, match_idx, match_seed(seed, idx, order, match_idx))
+            for idx in range(len(specs) - 1)
+            for order in range(2)
+            for match_idx in range(num_matches)]
+    results, restarts = run_matches(specs, jobs, concurrency, movetime, nodes, command)
+
+    print("\nPlaying Matches:")
+    print("----------")
+    agent_wins = total = 0.
+    timeouts = 0
+    for idx, opponent in enumerate(specs[:-1]):
+        scores = [0, 0]
+        for _, score_1, score_2, games in (r for r in results if r[0] == idx):
+            scores[0] += score_1
+            scores[1] += score_2
+            for game in games:
+                timeouts += game["termination"] == "timeout"
+                if latencies is not None:
+                    latencies.add_game(game)
+                if search_stats is not None:
+                    search_stats.add_game(game)
+        agent_wins += scores[0]
+        total += sum(scores)
+        print("  Match {}: {!s:^11} vs {!s:^11}\tResult: {} to {}".format(
+            idx + 1, specs[-1].name, opponent.name, *scores))
+
+    if timeouts:
+        warnings.warn(TIMEOUT_WARNING)
+    if restarts:
+        print("  Engine restarts: {}".format(restarts))
+    return 100. * agent_wins / total
+
+
+def default_specs(score):
+    """ The opponents of `tournament.py`, as engine settings, and the agents under test. """
+    opponents = []
+    for prefix, method, depth in (("MM", "minimax", 3), ("AB", "alphabeta", 5)):
+        for name, score_fn in (("Null", "null_score"), ("Open", "open_move_score"),
+                               ("Improved", "improved_score")):
+            opponents.append(AgentSpec(prefix + "_" + name,
+                                       {"Method": method, "Score": score_fn, "Hash": 0}, depth))
+    test_agents = [AgentSpec("ID_Improved", {"Score": "improved_score"}, None),
+                   AgentSpec("Student", {"Score": score}, None)]
+    return opponents, test_agents
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Play tournament rounds between engine "
+                                                 "subprocesses with asyncio.")
+    parser.add_argument("--score", default="custom_score", choices=sorted(SCORE_FUNCTIONS),
+                        help="heuristic used by the Student agent")
+    parser.add_argument("--matches", type=int, default=NUM_MATCHES,
+                        help="matches (two games each) per opponent and order")
+    parser.add_argument("--concurrency", type=int, default=0,
+                        help="games in progress at once (0 uses every available CPU)")
+    parser.add_argument("--movetime", type=float, default=TIME_LIMIT,
+                        help="milliseconds per move")
+    parser.add_argument("--nodes", type=int, default=None,
+                        help="play untimed games where engines search at most NODES "
+                             "nodes per move")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+    movetime = None if args.nodes is not None else args.movetime
+
+    opponents, test_agents = default_specs(args.score)
+    for spec in test_agents:
+        print("")
+        print("*************************")
+        print("{:^25}".format("Evaluating: " + spec.name))
+        print("*************************")
+        win_ratio = play_round(opponents + [spec], args.matches, args.concurrency, args.seed,
+                               movetime, args.nodes)
+        print("\n\nResults:")
+        print("----------")
+        print("{!s:<15}{:>10.2f}%".format(spec.name, win_ratio))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+"""
+Perft ("performance test") of the move generator: count the leaf nodes of
+the full game tree to a fixed depth from a set of reference positions, and
+check the counts against known values.
+
+Any change to how `Board` generates, applies or copies moves must leave
+every count unchanged, so the tool proves that a faster board still plays
+the same game. The board class is imported by name, which lets alternative
+`Board`-compatible implementations (any class taking the two players, the
+width and the height, and providing `apply_move`, `forecast_move` and
+`get_legal_moves`) be validated and their speed compared:
+
+    python perft.py
+    python perft.py --board isolation:Board --board fastboard:Board --depth 5
+
+A position that ends before the requested depth contributes no leaves, as
+in chess perft. The last ply is counted from the number of legal moves
+without applying them.
+"""
+
+import argparse
+import importlib
+import sys
+import time
+
+from collections import OrderedDict, namedtuple
+
+Position = namedtuple("Position", ["name", "width", "height", "moves", "counts"])
+
+# Reference positions given by the moves played from an empty board, with the
+# expected leaf counts at depths 1, 2, ...
+POSITIONS = [
+    Position("5x5-empty", 5, 5, [],
+             [25, 600, 2208, 7712, 24160]),
+    Position("5x5-one-placed", 5, 5, [(2, 2)],
+             [24, 184, 608, 1120, 3168]),
+    Position("5x5-midgame", 5, 5, [(2, 1), (4, 3), (4, 0), (2, 2), (3, 2), (3, 0)],
+             [5, 9, 18, 31, 70, 167, 185, 146, 221, 212]),
+    Position("7x7-empty", 7, 7, [],
+             [49, 2352, 11280, 52672]),
+    Position("7x7-one-placed", 7, 7, [(3, 3)],
+             [48, 376, 1712, 8256, 34848]),
+    Position("7x7-midgame", 7, 7,
+             [(1, 1), (2, 5), (0, 3), (1, 3), (1, 5), (3, 2), (3, 4),
+              (4, 4), (5, 5), (5, 6), (3, 6), (3, 5), (2, 4), (1, 4)],
+             [5, 25, 80, 235, 574, 1688, 4405, 11274, 27903]),
+    Position("9x9-empty", 9, 9, [],
+             [81, 6480, 35392]),
+    Position("9x9-one-placed", 9, 9, [(4, 4)],
+             [80, 632, 3344, 22880]),
+    Position("9x9-midgame", 9, 9,
+             [(7, 0), (3, 1), (5, 1), (2, 3), (3, 2), (4, 2),
+              (5, 3), (6, 1), (4, 5), (8, 0), (5, 7), (7, 2)],
+             [5, 15, 66, 251, 1042, 4552, 19854]),
+]
+
+
+def load_board_class(spec):
+    """ Return the class named by a "module:Class" string. """
+    module_name, _, class_name = spec.partition(":")
+    return getattr(importlib.import_module(module_name), class_name or "Board")
+
+
+def setup(board_class, position):
+    game = board_class("player1", "player2", position.width, position.height)
+    for move in position.moves:
+        game.apply_move(move)
+    return game
+
+
+def perft(game, depth):
+    """ Return the number of leaf nodes of the game tree to the given depth. """
+    if depth == 0:
+        return 1
+    moves = game.get_legal_moves()
+    if depth == 1:
+        return len(moves)
+    return sum(perft(game.forecast_move(move), depth - 1) for move in moves)
+
+
+def divide(game, depth):
+    """
+    Return the leaf counts below each legal move, to locate the move where
+    two move generators disagree.
+    """
+    return OrderedDict((move, perft(game.forecast_move(move), depth - 1))
+                       for move in game.get_legal_moves())
+
+
+def run(board_class, positions=POSITIONS, depth=None):
+    """
+    Run perft on every position at every depth up to `depth` (by default,
+    every depth with a known count).
+
+    Returns
+    ----------
+    list<(str, int, int, int or None, float)>
+        The position name, depth, leaf count, expected count (None when
+        unknown) and seconds taken, for every position and depth.
+    """
+    rows = []
+    for position in positions:
+        for d in range(1, (depth or len(position.counts)) + 1):
+            game = setup(board_class, position)
+            start = time.perf_counter()
+            nodes = perft(game, d)
+            elapsed = time.perf_counter() - start
+            expected = position.counts[d - 1] if d <= len(position.counts) else None
+            rows.append((position.name, d, nodes, expected, elapsed))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Verify and time the move generator.")
+    parser.add_argument("--board", action="append", metavar="MODULE:CLASS",
+                        help="Board implementation to test, may be repeated "
+                             "(default: isolation:Board)")
+    parser.add_argument("--depth", type=int, default=None,
+                        help="maximum depth (default: every depth with a known count)")
+    parser.add_argument("--position", action="append", metavar="NAME",
+                        choices=[p.name for p in POSITIONS],
+                        help="run only these positions")
+    parser.add_argument("--divide", nargs=2, metavar=("NAME", "DEPTH"),
+                        help="print the leaf count below each move of a position")
+    args = parser.parse_args()
+
+    specs = args.board or ["isolation:Board"]
+    positions = [p for p in POSITIONS if not args.position or p.name in args.position]
+
+    if args.divide:
+        position = next(p for p in POSITIONS if p.name == args.divide[0])
+        for spec in specs:
+            print("\n{}:".format(spec))
+            print("----------")
+            counts = divide(setup(load_board_class(spec), position), int(args.divide[1]))
+            for move, nodes in counts.items():
+                print("{!s:<12}{:>12}".format(move, nodes))
+            print("{!s:<12}{:>12}".format("total", sum(counts.values())))
+        return
+
+    failures = 0
+    for spec in specs:
+        rows = run(load_board_class(spec), positions, args.depth)
+        print("\n{}:".format(spec))
+        print("----------")
+        print("{!s:<18}{:>6}{:>12}{:>12}{:>12}".format("Position", "Depth", "Nodes", "Expected", "NPS"))
+        for name, depth, nodes, expected, elapsed in rows:
+            status = "" if expected is None or nodes == expected else "  MISMATCH"
+            failures += bool(status)
+            print("{!s:<18}{:>6}{:>12}{:>12}{:>12.0f}{}".format(
+                name, depth, nodes, "-" if expected is None else expected,
+                nodes / elapsed if elapsed else 0., status))
+        total_nodes = sum(row[2] for row in rows)
+        total_time = sum(row[4] for row in rows)
+        print("Total: {} nodes in {:.2f} s ({:.0f} nodes/s)".format(
+            total_nodes, total_time, total_nodes / total_time if total_time else 0.))
+
+    if failures:
+        print("\n{} count(s) differ from the expected values".format(failures))
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
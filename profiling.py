@@ -0,0 +1,199 @@
+"""
+Profile a run of `main.py` or `tournament.py` without wrapping it by hand.
+
+Two modes are available:
+
+* cprofile: deterministic profiling of every function call with cProfile.
+  Accurate call counts and times, but slows the run down noticeably (which
+  also makes timed agents search less deeply).
+
+* sample: a background thread records the call stack of the main thread at
+  a fixed interval. The overhead is small enough for long runs, and times
+  are estimated from the time between samples.
+
+Both modes write a collapsed-stack file (one `frame;frame;frame count` line
+per stack, the input format of flamegraph.pl, speedscope and similar
+tools) and print the functions with the highest cumulative time, including
+the Board primitives and score functions that dominate the search. The
+cprofile mode also writes the standard pstats file, which can be explored
+with `python -m pstats`. Only the calling process is profiled, so run
+tournaments with a single process (the default) when profiling.
+"""
+
+import cProfile
+import os
+import pstats
+import sys
+import threading
+import time
+
+from collections import Counter
+
+MODES = ["cprofile", "sample"]
+SAMPLE_INTERVAL = 0.005  # seconds between stack samples
+NUM_TOP_FUNCTIONS = 15
+
+# Functions reported in the summary even when they are not among the top
+# functions by cumulative time
+HOT_FUNCTIONS = ["copy", "forecast_move", "get_legal_moves", "apply_move",
+                 "get_blank_spaces", "get_mobility"]
+
+
+def is_hot_function(name):
+    """ Return True for the Board primitives and score functions. """
+    return (name in HOT_FUNCTIONS or name.endswith("score") or
+            name.startswith("heuristic_") or name == "__call__")
+
+
+def frame_label(filename, lineno, name):
+    return "{}:{}:{}".format(os.path.basename(filename), lineno, name)
+
+
+class StackSampler(object):
+    """
+    Sampling profiler recording the stack of one thread every `interval`
+    seconds from a background thread, in a Counter from stack (a tuple of
+    frame labels, outermost first) to seconds.
+    """
+
+    def __init__(self, interval=SAMPLE_INTERVAL, thread_id=None):
+        self.interval = interval
+        self.thread_id = threading.main_thread().ident if thread_id is None else thread_id
+        self.stacks = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        # The sampler waits for the GIL as well as for the interval, so each
+        # sample is weighted by the time actually elapsed since the last one
+        last = time.perf_counter()
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(frame_label(code.co_filename, code.co_firstlineno, code.co_name))
+                frame = frame.f_back
+            now = time.perf_counter()
+            self.stacks[tuple(reversed(stack))] += now - last
+            self.samples += 1
+            last = now
+
+    def function_times(self):
+        """
+        Return a dict from frame label to (self seconds, cumulative seconds)
+        estimated from the samples.
+        """
+        own, cumulative = Counter(), Counter()
+        for stack, seconds in self.stacks.items():
+            if stack:
+                own[stack[-1]] += seconds
+            for label in set(stack):
+                cumulative[label] += seconds
+        return {label: (own[label], cumulative[label]) for label in cumulative}
+
+
+class Profiler(object):
+    """
+    Context manager profiling the code it wraps and reporting the results
+    when it exits.
+
+    Parameters
+    ----------
+    mode : str
+        One of `MODES`.
+
+    out : str
+        Path prefix of the output files: `out + ".pstats"` (cprofile mode
+        only) and `out + ".collapsed"`.
+    """
+
+    def __init__(self, mode="cprofile", out="profile", interval=SAMPLE_INTERVAL):
+        if mode not in MODES:
+            raise ValueError("Unknown profiling mode {!r}".format(mode))
+        self.mode = mode
+        self.out = out
+        self.interval = interval
+        self.profile = None
+        self.sampler = None
+        self.elapsed = 0.
+
+    def __enter__(self):
+        self.start_time = time.perf_counter()
+        if self.mode == "cprofile":
+            self.profile = cProfile.Profile()
+            self.profile.enable()
+        else:
+            self.sampler = StackSampler(self.interval)
+            self.sampler.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        if self.mode == "cprofile":
+            self.profile.disable()
+        else:
+            self.sampler.stop()
+        self.elapsed = time.perf_counter() - self.start_time
+        self.write()
+        self.print_summary()
+
+    def function_times(self):
+        """ Return a dict from frame label to (self seconds, cumulative seconds). """
+        if self.sampler is not None:
+            return self.sampler.function_times()
+        stats = pstats.Stats(self.profile).stats
+        return {frame_label(*func): (tottime, cumtime)
+                for func, (_, _, tottime, cumtime, _) in stats.items()}
+
+    def collapsed_stacks(self):
+        """
+        Return the collapsed stacks as (stack labels, microseconds) pairs.
+        Sampled stacks are complete; cProfile only records callers, so its
+        stacks are caller;callee pairs weighted by the time spent in the
+        callee itself.
+        """
+        if self.sampler is not None:
+            return [(stack, int(seconds * 1e6)) for stack, seconds in self.sampler.stacks.items()
+                    if int(seconds * 1e6)]
+        stacks = []
+        for func, (_, _, tottime, _, callers) in pstats.Stats(self.profile).stats.items():
+            for caller, (_, _, caller_tottime, _) in callers.items():
+                weight = int(caller_tottime * 1e6)
+                if weight:
+                    stacks.append(((frame_label(*caller), frame_label(*func)), weight))
+            if not callers and int(tottime * 1e6):
+                stacks.append(((frame_label(*func),), int(tottime * 1e6)))
+        return stacks
+
+    def write(self):
+        if self.profile is not None:
+            self.profile.dump_stats(self.out + ".pstats")
+        with open(self.out + ".collapsed", "w") as f:
+            for stack, weight in self.collapsed_stacks():
+                f.write("{} {}\n".format(";".join(stack), weight))
+
+    def print_summary(self, num_functions=NUM_TOP_FUNCTIONS):
+        times = self.function_times()
+        ranked = sorted(times.items(), key=lambda item: -item[1][1])
+        top = ranked[:num_functions]
+        hot = [item for item in ranked[num_functions:]
+               if is_hot_function(item[0].rsplit(":", 1)[-1])]
+
+        print("\nProfile ({}, {:.2f} s):".format(self.mode, self.elapsed))
+        print("----------")
+        print("  {:>10}{:>10}  {}".format("cumtime", "tottime", "function"))
+        for label, (own, cumulative) in top + hot:
+            print("  {:>10.3f}{:>10.3f}  {}".format(cumulative, own, label))
+        outputs = [self.out + ".collapsed"]
+        if self.profile is not None:
+            outputs.insert(0, self.out + ".pstats")
+        print("\nProfile written to {}".format(" and ".join(outputs)))
@@ -0,0 +1,131 @@
+"""
+Append-only store of tournament match results in a JSON Lines file, so that
+interrupted tournaments can be resumed without replaying finished matches
+and results can be summarized later without replaying any games.
+
+Each line holds one match (two games from the same opening, see
+`tournament.play_match`) with the names of the agents, the tournament
+settings, the random seed, and for each game the opening moves, the full
+move history, the winner, the reason the game ended and the time each move
+took.
+
+Summarize a store with:
+
+    python results_store.py results.jsonl
+"""
+
+import argparse
+import json
+import os
+
+from collections import OrderedDict
+
+
+def match_key(agent, opponent, order, match_idx, seed, settings):
+    """
+    Return the key identifying one match of a tournament, so that a match
+    is only reused when it was played with exactly the same settings.
+    """
+    return json.dumps([agent, opponent, order, match_idx, seed, settings],
+                      sort_keys=True)
+
+
+class ResultsStore(object):
+    """
+    Tournament results stored one JSON record per line in an append-only
+    file. Records already in the file are loaded when the store is opened;
+    a truncated last line left by an interrupted run is ignored.
+
+    Parameters
+    ----------
+    path : str
+        Location of the JSON Lines file; it is created if necessary.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.records = OrderedDict()
+        if os.path.exists(path):
+            with open(path) as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        continue
+                    self.records[record["key"]] = record
+
+    def __contains__(self, key):
+        return key in self.records
+
+    def __getitem__(self, key):
+        return self.records[key]
+
+    def __iter__(self):
+        return iter(self.records.values())
+
+    def append(self, record):
+        """ Durably add a match record; `record["key"]` must be set. """
+        line = json.dumps(record, sort_keys=True)
+        with open(self.path, "a") as f:
+            # start on a fresh line if an interrupted run left a partial one
+            if f.tell() and not self._ends_with_newline():
+                f.write("\n")
+            f.write(line + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        self.records[record["key"]] = record
+
+    def _ends_with_newline(self):
+        with open(self.path, "rb") as f:
+            f.seek(-1, os.SEEK_END)
+            return f.read(1) == b"\n"
+
+
+def summarize(records):
+    """
+    Build the win-ratio table of each agent under test from match records.
+
+    Returns
+    ----------
+    OrderedDict
+        Maps each agent name to an OrderedDict from opponent name to the
+        [agent wins, opponent wins] totals.
+    """
+    table = OrderedDict()
+    for record in records:
+        opponents = table.setdefault(record["agent"], OrderedDict())
+        counts = opponents.setdefault(record["opponent"], [0, 0])
+        counts[0] += record["score"][0]
+        counts[1] += record["score"][1]
+    return table
+
+
+def print_summary(table):
+    """ Print win-ratio tables in the same layout as tournament.py. """
+    for agent, opponents in table.items():
+        print("")
+        print("*************************")
+        print("{:^25}".format("Evaluating: " + agent))
+        print("*************************")
+        print("\nMatches:")
+        print("----------")
+        wins = total = 0
+        for idx, (opponent, (agent_wins, opponent_wins)) in enumerate(opponents.items()):
+            print("  Match {}: {!s:^11} vs {!s:^11}\tResult: {} to {}".format(
+                idx + 1, agent, opponent, agent_wins, opponent_wins))
+            wins += agent_wins
+            total += agent_wins + opponent_wins
+        print("\n\nResults:")
+        print("----------")
+        print("{!s:<15}{:>10.2f}%".format(agent, 100. * wins / total if total else 0.))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Summarize a tournament results store.")
+    parser.add_argument("path", help="JSON Lines file written by tournament.py --store")
+    args = parser.parse_args()
+    print_summary(summarize(ResultsStore(args.path)))
+
+
+if __name__ == "__main__":
+    main()
@@ -5,6 +5,17 @@ own agent and example heuristic functions.
 from random import randint
 
 
+def mobility(game, player):
+    """Return the number of legal moves available to `player`. Boards that
+    track it incrementally answer with `Board.get_mobility()`; the moves are
+    counted on boards that do not, such as the stock `isolation.Board`.
+    """
+    try:
+        return game.get_mobility(player)
+    except AttributeError:
+        return len(game.get_legal_moves(player))
+
+
 def null_score(game, player):
     """This heuristic presumes no knowledge for non-terminal states, and
     returns the same uninformative value for all other states.
@@ -61,7 +72,7 @@ def open_move_score(game, player):
     if game.is_winner(player):
         return float("inf")
 
-    return float(len(game.get_legal_moves(player)))
+    return float(mobility(game, player))
 
 
 def improved_score(game, player):
@@ -91,8 +102,8 @@ def improved_score(game, player):
     if game.is_winner(player):
         return float("inf")
 
-    own_moves = len(game.get_legal_moves(player))
-    opp_moves = len(game.get_legal_moves(game.get_opponent(player)))
+    own_moves = mobility(game, player)
+    opp_moves = mobility(game, game.get_opponent(player))
     return float(own_moves - opp_moves)
 
 
@@ -0,0 +1,179 @@
+"""
+Benchmark the search of `CustomPlayer` on a fixed suite of 7x7 middlegame
+positions: every search method searches every position to each fixed depth,
+and the number of nodes visited, the time taken, the effective branching
+factor and the best move are reported. The "alphabeta_batch" method is
+alphabeta scoring the children of frontier nodes in batches (see
+`batch_scores.py`); it visits the same nodes as "alphabeta", so only its
+times differ, and it needs a heuristic with a batched version.
+
+Node counts only depend on the position, the depth and the move ordering,
+not on the machine or its load, so they measure the effect of a pruning or
+move ordering change exactly; times show what it costs.
+
+    python search_benchmark.py
+    python search_benchmark.py --method alphabeta --depth 7 --out search.json
+
+The effective branching factor at depth d is the number of nodes searched
+to depth d divided by the number searched to depth d - 1.
+"""
+
+import argparse
+import json
+import math
+
+from collections import OrderedDict
+
+from isolation import Board
+from game_agent import CustomPlayer, SCORE_FUNCTIONS
+from batch_scores import open_move_score_batch, improved_score_batch
+
+METHODS = ["minimax", "alphabeta", "alphabeta_batch"]
+MAX_DEPTH = 6
+DEFAULT_SCORE = "improved_score"
+
+# Heuristics of `SCORE_FUNCTIONS` with a batched version, for "alphabeta_batch"
+BATCH_SCORE_FUNCTIONS = {
+    "open_move_score": open_move_score_batch,
+    "improved_score": improved_score_batch,
+}
+
+# Middlegame positions given by the moves played from an empty 7x7 board,
+# where both players have at least four legal moves
+POSITIONS = OrderedDict([
+    ("mid-11", [(4, 3), (2, 0), (3, 5), (1, 2), (5, 6), (3, 3), (4, 4), (1, 4), (2, 3),
+                (2, 2), (4, 2)]),
+    ("mid-10", [(1, 0), (2, 1), (3, 1), (1, 3), (5, 2), (2, 5), (3, 3), (4, 6), (4, 5),
+                (5, 4)]),
+    ("mid-13", [(0, 1), (3, 5), (1, 3), (5, 4), (2, 5), (3, 3), (4, 4), (1, 2), (3, 6),
+                (3, 1), (1, 5), (4, 3), (3, 4)]),
+    ("mid-12", [(4, 6), (6, 4), (3, 4), (4, 3), (2, 6), (2, 2), (4, 5), (1, 0), (3, 3),
+                (0, 2), (5, 2), (2, 3)]),
+    ("mid-15a", [(3, 2), (0, 6), (4, 4), (1, 4), (5, 2), (2, 2), (4, 0), (3, 0), (6, 1),
+                 (4, 2), (5, 3), (5, 4), (3, 4), (3, 5), (1, 3)]),
+    ("mid-15b", [(0, 6), (4, 3), (2, 5), (2, 2), (4, 6), (3, 4), (6, 5), (1, 3), (5, 3),
+                 (2, 1), (6, 1), (4, 2), (4, 0), (2, 3), (3, 2)]),
+])
+
+
+def setup(moves, player1, player2="opponent"):
+    game = Board(player1, player2)
+    for move in moves:
+        game.apply_move(move)
+    return game
+
+
+def search(moves, method, depth, score):
+    """
+    Search a position to a fixed depth with the heuristic named `score`.
+
+    Returns
+    ----------
+    OrderedDict
+        The nodes searched, leaf evaluations, milliseconds taken, best move
+        and its score for the player to move.
+    """
+    batch_score_fn = None
+    if method == "alphabeta_batch":
+        if score not in BATCH_SCORE_FUNCTIONS:
+            raise ValueError("{} has no batched version".format(score))
+        method, batch_score_fn = "alphabeta", BATCH_SCORE_FUNCTIONS[score]
+    player = CustomPlayer(search_depth=depth, score_fn=SCORE_FUNCTIONS[score], iterative=False,
+                          method=method, batch_score_fn=batch_score_fn)
+    game = setup(moves, player) if len(moves) % 2 == 0 else setup(moves, "opponent", player)
+    move = player.get_move(game, game.get_legal_moves(), lambda: float("inf"))
+    stats = player.last_search_stats
+    return OrderedDict([("nodes", stats.nodes), ("leaf_evaluations", stats.leaf_evaluations),
+                        ("millis", 1000. * stats.elapsed), ("move", move),
+                        ("score", player.last_score)])
+
+
+def run(methods=METHODS, max_depth=MAX_DEPTH, score=DEFAULT_SCORE, positions=POSITIONS):
+    """
+    Search every position with every method to depths 1 to `max_depth`.
+
+    Returns
+    ----------
+    list<OrderedDict>
+        One row per position, method and depth with the results of
+        `search()` and the effective branching factor (None at depth 1).
+    """
+    rows = []
+    for name, moves in positions.items():
+        for method in methods:
+            previous = None
+            for depth in range(1, max_depth + 1):
+                row = OrderedDict([("position", name), ("method", method), ("depth", depth)])
+                row.update(search(moves, method, depth, score))
+                row["ebf"] = row["nodes"] / previous if previous else None
+                previous = row["nodes"]
+                rows.append(row)
+    return rows
+
+
+def totals(rows):
+    """
+    Return the total nodes and time, and the geometric mean effective
+    branching factor, of each method and depth over all positions.
+    """
+    groups = OrderedDict()
+    for row in rows:
+        groups.setdefault((row["method"], row["depth"]), []).append(row)
+    result = []
+    for (method, depth), group in groups.items():
+        ebfs = [row["ebf"] for row in group if row["ebf"]]
+        result.append(OrderedDict([
+            ("method", method), ("depth", depth),
+            ("nodes", sum(row["nodes"] for row in group)),
+            ("millis", sum(row["millis"] for row in group)),
+            ("ebf", math.exp(sum(math.log(e) for e in ebfs) / len(ebfs)) if ebfs else None)]))
+    return result
+
+
+def format_ebf(ebf):
+    return "-" if ebf is None else "{:.2f}".format(ebf)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark CustomPlayer search on fixed positions.")
+    parser.add_argument("--method", nargs="+", choices=METHODS,
+                        help="search methods (default: all those the heuristic supports)")
+    parser.add_argument("--depth", type=int, default=MAX_DEPTH, help="deepest search")
+    parser.add_argument("--score", default=DEFAULT_SCORE, choices=sorted(SCORE_FUNCTIONS),
+                        help="heuristic used by the searches")
+    parser.add_argument("--out", metavar="PATH", help="write every result to a JSON file")
+    args = parser.parse_args()
+
+    methods = args.method
+    if methods is None:
+        methods = [m for m in METHODS
+                   if m != "alphabeta_batch" or args.score in BATCH_SCORE_FUNCTIONS]
+    elif "alphabeta_batch" in methods and args.score not in BATCH_SCORE_FUNCTIONS:
+        parser.error("{} has no batched version for alphabeta_batch".format(args.score))
+
+    rows = run(methods, args.depth, args.score)
+
+    print("\nSearch results:")
+    print("----------")
+    print("{!s:<10}{!s:<17}{:>6}{:>10}{:>10}{:>7}{!s:>10}{:>9}".format(
+        "Position", "Method", "Depth", "Nodes", "ms", "EBF", "Move", "Score"))
+    for row in rows:
+        print("{!s:<10}{!s:<17}{:>6}{:>10}{:>10.1f}{:>7}{!s:>10}{:>9.2f}".format(
+            row["position"], row["method"], row["depth"], row["nodes"], row["millis"],
+            format_ebf(row["ebf"]), row["move"], row["score"]))
+
+    print("\nTotals:")
+    print("----------")
+    print("{!s:<17}{:>6}{:>10}{:>10}{:>7}".format("Method", "Depth", "Nodes", "ms", "EBF"))
+    summary = totals(rows)
+    for row in summary:
+        print("{!s:<17}{:>6}{:>10}{:>10.1f}{:>7}".format(
+            row["method"], row["depth"], row["nodes"], row["millis"], format_ebf(row["ebf"])))
+
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump({"score": args.score, "results": rows, "totals": summary}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,245 @@
+"""
+Generate labelled positions for training and tuning heuristic evaluation
+functions by letting an alpha-beta CustomPlayer play against itself.
+
+Every position reached after the random opening is recorded as a sample
+holding the game state (see `isolation.GameState`), the score of the search
+from the point of view of the player to move, and the final outcome of the
+game for that player (1 for a win, -1 for a loss). Positions are reduced to
+their canonical symmetric image, and positions seen recently (including
+mirrored or rotated copies) are skipped: a position is never written twice
+within `DEDUP_SIZE` distinct positions of its last occurrence, but may
+reappear after that, which keeps memory bounded however many games are
+played.
+
+Games are untimed and searched to a fixed depth or node budget, so they are
+reproducible and can be played by as many worker processes as there are
+CPUs. Samples are streamed to numbered shard files as games finish, so
+memory use does not grow with the number of games:
+
+    python selfplay.py data/ --games 10000 --depth 3 --opening-plies 4
+"""
+
+import argparse
+import hashlib
+import multiprocessing
+import os
+import random
+import struct
+
+from collections import OrderedDict
+from isolation import Board, GameState
+from game_agent import CustomPlayer, SCORE_FUNCTIONS
+from tournament import available_cpus
+
+SHARD_MAGIC = b"ISOSMP01"
+SHARD_SIZE = 100000  # samples per shard file
+SAMPLE = struct.Struct("<fb")  # search score, outcome
+DEDUP_SIZE = 1000000  # recent positions remembered, about 100 bytes each
+
+
+class ShardWriter(object):
+    """
+    Write samples to files named samples-00000.bin, samples-00001.bin, ...
+    in `directory`, starting a new file every `shard_size` samples. Each
+    sample is the length of the encoded game state (one byte), the state
+    from `GameState.to_bytes()`, and `SAMPLE`.
+    """
+
+    def __init__(self, directory, shard_size=SHARD_SIZE):
+        self.directory = directory
+        self.shard_size = shard_size
+        self.paths = []
+        self.file = None
+        self.count = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def write(self, state_bytes, score, outcome):
+        if self.file is None or self.count % self.shard_size == 0:
+            self.close()
+            path = os.path.join(self.directory, "samples-{:05d}.bin".format(len(self.paths)))
+            self.paths.append(path)
+            self.file = open(path, "wb")
+            self.file.write(SHARD_MAGIC)
+        self.file.write(bytes([len(state_bytes)]) + state_bytes + SAMPLE.pack(score, outcome))
+        self.count += 1
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+
+def read_samples(paths):
+    """
+    Generate the (GameState, score, outcome) samples stored in shard files,
+    one file at a time.
+    """
+    for path in paths:
+        with open(path, "rb") as f:
+            data = f.read()
+        if not data.startswith(SHARD_MAGIC):
+            raise ValueError("{} is not a sample shard".format(path))
+        offset = len(SHARD_MAGIC)
+        while offset < len(data):
+            length = data[offset]
+            state = GameState.from_bytes(data[offset + 1:offset + 1 + length])
+            offset += 1 + length
+            score, outcome = SAMPLE.unpack_from(data, offset)
+            offset += SAMPLE.size
+            yield state, score, outcome
+
+
+def shard_paths(directory):
+    """ Return the shard files of a directory in the order they were written. """
+    return sorted(os.path.join(directory, name) for name in os.listdir(directory)
+                  if name.startswith("samples-") and name.endswith(".bin"))
+
+
+def play_selfplay_game(settings, game_idx):
+    """
+    Play one self-play game and return its samples as a list of
+    (canonical state bytes, score, outcome) tuples.
+
+    `settings` is a dict with the board `width` and `height`, the search
+    `depth` and `nodes` budgets, the `score` function name, the number of
+    random `opening_plies` and the `seed` (None for an unseeded game).
+    """
+    seed = settings["seed"]
+    rng = random.Random(None if seed is None else "{}:{}".format(seed, game_idx))
+    players = [CustomPlayer(score_fn=SCORE_FUNCTIONS[settings["score"]],
+                            method="alphabeta", iterative=True,
+                            node_limit=settings["nodes"], depth_limit=settings["depth"])
+               for _ in range(2)]
+    game = Board(players[0], players[1], settings["width"], settings["height"])
+    for _ in range(settings["opening_plies"]):
+        moves = game.get_legal_moves()
+        if not moves:
+            break
+        game.apply_move(rng.choice(moves))
+
+    positions = []
+    moves = game.get_legal_moves()
+    while moves:
+        player = game.active_player
+        move = player.get_move(game, moves, lambda: float("inf"))
+        positions.append((game.state(), player.last_score, player))
+        if move not in moves:
+            # the search returns (-1, -1) once every move loses; resign
+            break
+        game.apply_move(move)
+        moves = game.get_legal_moves()
+
+    winner = game.inactive_player
+    return [(state.canonical().to_bytes(), score, 1 if player is winner else -1)
+            for state, score, player in positions if score is not None]
+
+
+_worker_settings = None
+
+
+def _init_worker(settings):
+    global _worker_settings
+    _worker_settings = settings
+
+
+def _play_worker_game(game_idx):
+    return play_selfplay_game(_worker_settings, game_idx)
+
+
+def play_selfplay_games(settings, num_games, processes=1):
+    """
+    Generate the samples of `num_games` self-play games, in order. When
+    `processes` is greater than one the games are played by a pool of
+    worker processes; the games are untimed, so any number of workers can
+    be used without affecting the results.
+    """
+    if processes <= 1:
+        for game_idx in range(num_games):
+            yield play_selfplay_game(settings, game_idx)
+        return
+
+    with multiprocessing.Pool(processes, initializer=_init_worker,
+                              initargs=(settings,)) as pool:
+        for samples in pool.imap(_play_worker_game, range(num_games), chunksize=4):
+            yield samples
+
+
+def generate(directory, num_games, settings, processes=1, shard_size=SHARD_SIZE, dedup=True,
+             dedup_size=DEDUP_SIZE):
+    """
+    Play `num_games` self-play games (see `play_selfplay_game()`) and write
+    their samples to shard files in `directory`. When `dedup` is set,
+    positions among the `dedup_size` most recently seen distinct positions
+    are skipped; the least recently seen position is forgotten first.
+
+    Returns
+    ----------
+    dict
+        Number of games played, samples written, duplicate samples skipped
+        and the list of shard paths.
+    """
+    writer = ShardWriter(directory, shard_size)
+    seen = OrderedDict()
+    duplicates = 0
+    try:
+        for samples in play_selfplay_games(settings, num_games, processes):
+            for state_bytes, score, outcome in samples:
+                if dedup:
+                    # 8 byte digests keep the set of seen positions small
+                    key = hashlib.blake2b(state_bytes, digest_size=8).digest()
+                    if key in seen:
+                        seen.move_to_end(key)
+                        duplicates += 1
+                        continue
+                    seen[key] = None
+                    if len(seen) > dedup_size:
+                        seen.popitem(last=False)
+                writer.write(state_bytes, score, outcome)
+    finally:
+        writer.close()
+    return {"games": num_games, "samples": writer.count,
+            "duplicates": duplicates, "shards": writer.paths}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate self-play training samples.")
+    parser.add_argument("directory", help="directory receiving the sample shards")
+    parser.add_argument("--games", type=int, default=1000, help="number of games to play")
+    parser.add_argument("--width", type=int, default=7)
+    parser.add_argument("--height", type=int, default=7)
+    parser.add_argument("--depth", type=int, default=None,
+                        help="search depth per move (default 3 unless --nodes is given)")
+    parser.add_argument("--nodes", type=int, default=None, help="search nodes per move")
+    parser.add_argument("--score", default="improved_score",
+                        choices=sorted(SCORE_FUNCTIONS),
+                        help="heuristic used by the search")
+    parser.add_argument("--opening-plies", type=int, default=4,
+                        help="number of random moves played before searching")
+    parser.add_argument("--processes", type=int, default=0,
+                        help="number of worker processes (0 uses every available CPU)")
+    parser.add_argument("--shard-size", type=int, default=SHARD_SIZE,
+                        help="number of samples per shard file")
+    parser.add_argument("--seed", type=int, default=None, help="seed every game deterministically")
+    parser.add_argument("--no-dedup", action="store_true",
+                        help="keep positions that were already seen")
+    parser.add_argument("--dedup-size", type=int, default=DEDUP_SIZE,
+                        help="number of recently seen positions remembered to skip "
+                             "duplicates")
+    args = parser.parse_args()
+
+    depth = args.depth
+    if depth is None and args.nodes is None:
+        depth = 3
+    settings = {"width": args.width, "height": args.height, "depth": depth,
+                "nodes": args.nodes, "score": args.score,
+                "opening_plies": args.opening_plies, "seed": args.seed}
+    stats = generate(args.directory, args.games, settings,
+                     args.processes or available_cpus(), args.shard_size,
+                     not args.no_dedup, args.dedup_size)
+    print("{} games, {} samples ({} duplicates skipped) in {} shards".format(
+        stats["games"], stats["samples"], stats["duplicates"], len(stats["shards"])))
+
+
+if __name__ == "__main__":
+    main()
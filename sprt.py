@@ -0,0 +1,124 @@
+"""
+Sequential probability ratio test (SPRT) for deciding whether one agent is
+stronger than another from as few games as possible, and helpers to express
+match results as Elo rating differences.
+
+Isolation has no draws, so each game is treated as a Bernoulli trial whose
+success probability is the expected score of the agent under test. The test
+compares the hypotheses H0: elo = elo0 and H1: elo = elo1, and stops as soon
+as the log-likelihood ratio of the results crosses one of the bounds set by
+the error rates alpha (accepting H1 when H0 holds) and beta (accepting H0
+when H1 holds).
+"""
+
+import math
+
+H0 = "H0"
+H1 = "H1"
+
+
+def expected_score(elo):
+    """ Return the expected score of a player rated `elo` points higher. """
+    return 1. / (1. + 10. ** (-elo / 400.))
+
+
+def elo_from_score(score):
+    """ Return the Elo difference corresponding to an expected score. """
+    if score <= 0.:
+        return float("-inf")
+    if score >= 1.:
+        return float("inf")
+    return -400. * math.log10(1. / score - 1.)
+
+
+def normal_quantile(p):
+    """
+    Return the value below which a standard normal variable falls with
+    probability `p`, found by bisection on its cumulative distribution.
+    """
+    lower, upper = -10., 10.
+    for _ in range(100):
+        middle = (lower + upper) / 2.
+        if 0.5 * (1. + math.erf(middle / math.sqrt(2.))) < p:
+            lower = middle
+        else:
+            upper = middle
+    return (lower + upper) / 2.
+
+
+def elo_interval(wins, losses, confidence=0.95):
+    """
+    Estimate the Elo difference from a number of wins and losses.
+
+    Returns
+    ----------
+    (float, float, float)
+        The estimated Elo difference followed by the lower and upper bounds
+        of its normal-approximation confidence interval.
+    """
+    games = wins + losses
+    if not games:
+        return 0., float("-inf"), float("inf")
+    score = wins / games
+    z = normal_quantile(0.5 + confidence / 2.)
+    margin = z * math.sqrt(score * (1. - score) / games)
+    return (elo_from_score(score),
+            elo_from_score(score - margin),
+            elo_from_score(score + margin))
+
+
+class SPRT(object):
+    """
+    Sequential probability ratio test of H0: elo = elo0 against
+    H1: elo = elo1, where elo is the rating difference of the agent under
+    test over its opponent.
+
+    Parameters
+    ----------
+    elo0 : float
+        Elo difference under the null hypothesis (e.g., 0).
+
+    elo1 : float
+        Elo difference under the alternative hypothesis (e.g., 50).
+
+    alpha : float (optional)
+        Probability of accepting H1 when H0 is true.
+
+    beta : float (optional)
+        Probability of accepting H0 when H1 is true.
+    """
+
+    def __init__(self, elo0, elo1, alpha=0.05, beta=0.05):
+        if elo0 >= elo1:
+            raise ValueError("elo1 must be greater than elo0")
+        self.elo0 = elo0
+        self.elo1 = elo1
+        self.alpha = alpha
+        self.beta = beta
+        self.lower_bound = math.log(beta / (1. - alpha))
+        self.upper_bound = math.log((1. - beta) / alpha)
+        p0, p1 = expected_score(elo0), expected_score(elo1)
+        self.win_weight = math.log(p1 / p0)
+        self.loss_weight = math.log((1. - p1) / (1. - p0))
+        self.wins = 0
+        self.losses = 0
+
+    def record(self, wins, losses):
+        """ Add game results for the agent under test. """
+        self.wins += wins
+        self.losses += losses
+
+    @property
+    def llr(self):
+        """ Log-likelihood ratio of H1 over H0 for the recorded results. """
+        return self.wins * self.win_weight + self.losses * self.loss_weight
+
+    @property
+    def status(self):
+        """ Return H0 or H1 once a hypothesis is accepted, otherwise None. """
+        llr = self.llr
+        if llr >= self.upper_bound:
+            return H1
+        if llr <= self.lower_bound:
+            return H0
+        return None
@@ -19,29 +19,45 @@ initiative in the second match with agentB at (5, 2) as player 1 and agentA at
 (1, 3) as player 2.
 """
 
-import itertools
+import argparse
+import multiprocessing
+import os
 import random
+import timeit
 import warnings
 
-from collections import namedtuple
+from collections import OrderedDict, namedtuple
 
-from isolation import Board
+from isolation import Board, ProcessSupervisor, ThreadSupervisor
+from isolation.supervisor import Supervisor
 from sample_players import RandomPlayer
 from sample_players import null_score
 from sample_players import open_move_score
 from sample_players import improved_score
 from game_agent import CustomPlayer
-from game_agent import custom_score
+from game_agent import SCORE_FUNCTIONS
+from game_agent import TimerCalibrator
+from game_agent import WeightedScore
+from latency import MoveLatencies
+from profiling import MODES as PROFILE_MODES, Profiler
+from results_store import ResultsStore, match_key
+from sprt import H1, SPRT, elo_interval
 
 NUM_MATCHES = 5  # number of matches against each opponent
 TIME_LIMIT = 150  # number of milliseconds before timeout
+SUPERVISORS = OrderedDict([("thread", ThreadSupervisor), ("process", ProcessSupervisor)])
+
+OVERSUBSCRIPTION_WARNING = "Requested {} worker processes but only {} CPUs " + \
+                           "are available; using {} so that parallel games " + \
+                           "do not compete for CPU time and cause timeouts."
 
 TIMEOUT_WARNING = "One or more agents lost a match this round due to " + \
                   "timeout. The get_move() function must return before " + \
                   "time_left() reaches 0 ms. You will need to leave some " + \
                   "time for the function to return, and may need to " + \
                   "increase this margin to avoid timeouts during  " + \
-                  "tournament play."
+                  "tournament play. Run with --latency to see how close " + \
+                  "each agent's moves come to the time limit."
 
 DESCRIPTION = """
 This script evaluates the performance of the custom heuristic function by
@@ -57,12 +73,114 @@ same opponents.
 Agent = namedtuple("Agent", ["player", "name"])
 
 
-def play_match(player1, player2):
+class SearchTotals(object):
+    """
+    Running totals of the `game_agent.SearchStats` reported by a player,
+    used as (or forwarding to) the player's `stats_callback`.
+    """
+    FIELDS = ["moves", "nodes", "leaf_evaluations", "elapsed", "depth",
+              "cutoffs", "first_move_cutoffs", "timer_threshold",
+              "eval_cache_moves", "eval_cache_hit_rate"]
+
+    def __init__(self, forward=None, totals=None):
+        self.forward = forward
+        self.totals = OrderedDict((field, 0) for field in self.FIELDS)
+        if totals:
+            self.update(totals)
+
+    def __call__(self, stats):
+        totals = self.totals
+        totals["moves"] += 1
+        totals["nodes"] += stats.nodes
+        totals["leaf_evaluations"] += stats.leaf_evaluations
+        totals["elapsed"] += stats.elapsed
+        totals["depth"] += stats.depth
+        totals["cutoffs"] += stats.cutoffs
+        totals["first_move_cutoffs"] += stats.first_move_cutoffs
+        totals["timer_threshold"] += stats.timer_threshold
+        if stats.eval_cache_hit_rate is not None:
+            totals["eval_cache_moves"] += 1
+            totals["eval_cache_hit_rate"] += stats.eval_cache_hit_rate
+        if self.forward is not None:
+            self.forward(stats)
+
+    def update(self, totals):
+        """ Add the totals of another `SearchTotals` (as a dict). """
+        for field in self.FIELDS:
+            self.totals[field] += totals.get(field, 0)
+
+    def summary(self):
+        """ Return per-move averages and rates derived from the totals. """
+        t = self.totals
+        moves = t["moves"] or 1
+        return OrderedDict([
+            ("moves", t["moves"]),
+            ("nodes_per_move", t["nodes"] / moves),
+            ("leaf_evaluations_per_move", t["leaf_evaluations"] / moves),
+            ("nps", t["nodes"] / t["elapsed"] if t["elapsed"] else 0.),
+            ("depth", t["depth"] / moves),
+            ("first_move_cutoff_rate", t["first_move_cutoffs"] / t["cutoffs"] if t["cutoffs"] else 0.),
+            ("eval_cache_hit_rate", (t["eval_cache_hit_rate"] / t["eval_cache_moves"]
+                                     if t["eval_cache_moves"] else None)),
+            ("timer_threshold", t["timer_threshold"] / moves)])
+
+
+class SearchStatsSummary(object):
+    """ Search statistics of the games of a tournament, totalled per agent. """
+
+    def __init__(self):
+        self.agents = OrderedDict()
+
+    def add_game(self, game):
+        """
+        Add the search totals of a game record from `play_match()`, which
+        must name its players (see `play_round_match()`).
+        """
+        for name, totals in zip(game["players"], game.get("search_stats", [])):
+            if totals is not None:
+                self.agents.setdefault(name, SearchTotals()).update(totals)
+
+    def update(self, other):
+        for name, totals in other.agents.items():
+            self.agents.setdefault(name, SearchTotals()).update(totals.totals)
+
+    def print_table(self):
+        print("\nSearch statistics (per move):")
+        print("----------")
+        print("  {!s:<12}{:>7}{:>10}{:>10}{:>8}{:>10}{:>8}{:>8}".format(
+            "Agent", "Moves", "Nodes", "kNPS", "Depth", "1st cut", "Cache", "Margin"))
+        for name, totals in sorted(self.agents.items()):
+            row = totals.summary()
+            cache = row["eval_cache_hit_rate"]
+            print("  {!s:<12}{:>7}{:>10.0f}{:>10.1f}{:>8.2f}{:>10.1%}{:>8}{:>8.1f}".format(
+                name, row["moves"], row["nodes_per_move"], row["nps"] / 1000., row["depth"],
+                row["first_move_cutoff_rate"], "-" if cache is None else "{:.1%}".format(cache),
+                row["timer_threshold"]))
+
+
+def play_match(player1, player2, rng=random, time_limit=TIME_LIMIT, records=None,
+               supervisor=None):
     """
     Play a "fair" set of matches between two agents by playing two games
     between the players, forcing each agent to play from randomly selected
     positions. This should control for differences in outcome resulting from
     advantage due to starting position on the board.
+
+    The opening moves are drawn from `rng`, which defaults to the global
+    random number generator. Each move is limited to `time_limit`
+    milliseconds, or not timed at all if it is None.
+
+    If `records` is a list, a dict describing each game is appended to it
+    with the opening moves, the move history, the winner (1 for the player
+    moving first in that game, 2 otherwise), the reason the game ended, the
+    milliseconds spent on each move, and for each player that reports
+    `game_agent.SearchStats` the totals of its searches (see
+    `SearchTotals`), or None.
+
+    When `supervisor` is an `isolation.supervisor.Supervisor`, moves are
+    abandoned at their deadline (see `Board.play()`), and each record also
+    holds the supervision overhead of every completed move in ms and the
+    number of abandoned moves.
     """
     num_wins = {player1: 0, player2: 0}
     num_timeouts = {player1: 0, player2: 0}
@@ -70,14 +188,45 @@ def play_match(player1, player2):
     games = [Board(player1, player2), Board(player2, player1)]
 
     # initialize both games with a random move and response
+    opening = []
     for _ in range(2):
-        move = random.choice(games[0].get_legal_moves())
+        move = rng.choice(games[0].get_legal_moves())
         games[0].apply_move(move)
         games[1].apply_move(move)
+        opening.append(move)
 
     # play both games and tally the results
-    for game in games:
-        winner, _, termination = game.play(time_limit=TIME_LIMIT)
+    for game, players in zip(games, [(player1, player2), (player2, player1)]):
+        move_times = []
+        search_totals = [None, None]
+        if records is not None:
+            for idx, player in enumerate(players):
+                if hasattr(player, "stats_callback"):
+                    search_totals[idx] = SearchTotals(player.stats_callback)
+                    player.stats_callback = search_totals[idx]
+        if supervisor is not None:
+            supervised = len(supervisor.overheads), supervisor.abandoned
+        try:
+            winner, history, termination = game.play(time_limit=time_limit,
+                                                      move_times=move_times,
+                                                      supervisor=supervisor)
+        finally:
+            for player, totals in zip(players, search_totals):
+                if totals is not None:
+                    player.stats_callback = totals.forward
+
+        if records is not None:
+            records.append({"opening": opening,
+                            "moves": [move for turn in history for move in turn],
+                            "winner": 1 if winner == players[0] else 2,
+                            "termination": termination,
+                            "move_times": move_times,
+                            "search_stats": [None if totals is None else totals.totals
+                                             for totals in search_totals]})
+            if supervisor is not None:
+                records[-1]["supervision"] = {
+                    "overheads": supervisor.overheads[supervised[0]:],
+                    "abandoned": supervisor.abandoned - supervised[1]}
 
         if player1 == winner:
             num_wins[player1] += 1
@@ -102,14 +251,192 @@ def play_match(player1, player2):
     return num_wins[player1], num_wins[player2]
 
 
-def play_round(agents, num_matches):
+def add_supervision(supervision, game):
+    """ Add the supervision overheads of a game record to a `Supervisor`. """
+    if "supervision" in game:
+        supervision.overheads.extend(game["supervision"]["overheads"])
+        supervision.abandoned += game["supervision"]["abandoned"]
+
+
+def print_supervision(supervise, supervision):
+    row = supervision.summary()
+    print("\nSupervision overhead ({} supervisor, ms per move):".format(supervise))
+    print("----------")
+    print("  {:>7}{:>8}{:>8}{:>8}{:>8}{:>11}".format(
+        "Moves", "Mean", "p50", "p99", "Max", "Abandoned"))
+    print("  {:>7}{:>8.2f}{:>8.2f}{:>8.2f}{:>8.2f}{:>11}".format(*row.values()))
+
+
+def available_cpus():
+    """ Return the number of CPUs this process is allowed to run on. """
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+def match_seed(seed, opponent_idx, order, match_idx):
+    """
+    Derive the random seed of a single match from the tournament seed, so
+    that every match is reproducible regardless of which process plays it.
+    Returns None when the tournament is not seeded.
+    """
+    if seed is None:
+        return None
+    return "{}:{}:{}:{}".format(seed, opponent_idx, order, match_idx)
+
+
+def play_round_match(agents, job, time_limit=TIME_LIMIT, supervise=None):
+    """
+    Play the match described by `job`, a tuple (opponent index, order,
+    match index, seed), between the last agent of the round and one of its
+    opponents. The last agent moves first in the first game of the match
+    when the order is 0.
+
+    Returns the opponent index, the number of games won by the last agent
+    and by the opponent, and the list of game records from `play_match()`,
+    each with the names of its players in the order they moved.
+    When the seed is not None, the opening moves and the global random
+    number generator (used by e.g. RandomPlayer) are both seeded from it.
+    When `supervise` names one of the `SUPERVISORS`, moves are run by a
+    supervisor of that kind (see `play_match()`).
+    """
+    opponent_idx, order, _, seed = job
+    supervisor = SUPERVISORS[supervise]() if supervise else None
+    player_1, player_2 = agents[-1].player, agents[opponent_idx].player
+    rng = random
+    if seed is not None:
+        random.seed(seed)
+        rng = random.Random(seed)
+
+    games = []
+    if order == 0:
+        score_1, score_2 = play_match(player_1, player_2, rng, time_limit, games, supervisor)
+    else:
+        score_2, score_1 = play_match(player_2, player_1, rng, time_limit, games, supervisor)
+
+    names = [agents[-1].name, agents[opponent_idx].name]
+    for game_idx, game in enumerate(games):
+        # the players swap initiative for the second game
+        first = (order + game_idx) % 2
+        game["players"] = [names[first], names[1 - first]]
+    return opponent_idx, score_1, score_2, games
+
+
+_worker_agents = None
+_worker_time_limit = TIME_LIMIT
+_worker_supervise = None
+
+
+def _init_worker(agents, time_limit, supervise=None):
+    """ Keep the worker's own copy of the agents for the rest of the round. """
+    global _worker_agents, _worker_time_limit, _worker_supervise
+    _worker_agents = agents
+    _worker_time_limit = time_limit
+    _worker_supervise = supervise
+
+
+def _play_worker_match(job):
+    """ Play one match of a round inside a worker process. """
+    return play_round_match(_worker_agents, job, _worker_time_limit, _worker_supervise)
+
+
+def play_round_matches(agents, jobs, processes=1, time_limit=TIME_LIMIT, supervise=None):
+    """
+    Generate the results of `play_round_match()` for each job, in order.
+
+    When `processes` is greater than one the matches are played by a pool
+    of worker processes, each with its own copy of the agents. For timed
+    games the number of workers is capped at the number of available CPUs
+    so that concurrent games do not slow each other down; untimed games
+    (`time_limit` None) may use any number of workers. Closing the
+    generator early stops the pool and abandons the remaining jobs.
+    """
+    if processes > 1 and time_limit is not None:
+        cpus = available_cpus()
+        if processes > cpus:
+            warnings.warn(OVERSUBSCRIPTION_WARNING.format(processes, cpus, cpus))
+            processes = cpus
+
+    if processes <= 1:
+        for job in jobs:
+            yield play_round_match(agents, job, time_limit, supervise)
+        return
+
+    with multiprocessing.Pool(processes, initializer=_init_worker,
+                              initargs=(agents, time_limit, supervise)) as pool:
+        for result in pool.imap(_play_worker_match, jobs, chunksize=1):
+            yield result
+
+
+def play_stored_matches(agents, jobs, processes=1, time_limit=TIME_LIMIT,
+                        store=None, settings=None, supervise=None):
+    """
+    Generate the results of `play_round_match()` for each job, in order,
+    like `play_round_matches()`.
+
+    If `store` is a `results_store.ResultsStore`, matches already recorded
+    in it with the same `settings` are read back instead of being played,
+    and every newly played match is appended to it as soon as it ends.
+    """
+    if store is None:
+        for result in play_round_matches(agents, jobs, processes, time_limit, supervise):
+            yield result
+        return
+
+    agent = agents[-1].name
+    keys = [match_key(agent, agents[job[0]].name, job[1], job[2], job[3], settings)
+            for job in jobs]
+    pending = [job for job, key in zip(jobs, keys) if key not in store]
+    played = play_round_matches(agents, pending, processes, time_limit, supervise)
+    try:
+        for job, key in zip(jobs, keys):
+            if key in store:
+                record = store[key]
+                yield job[0], record["score"][0], record["score"][1], record["games"]
+                continue
+
+            result = next(played)
+            opponent_idx, score_1, score_2, games = result
+            store.append({"key": key, "agent": agent, "opponent": agents[opponent_idx].name,
+                          "order": job[1], "match": job[2], "seed": job[3],
+                          "settings": settings, "score": [score_1, score_2],
+                          "games": games})
+            yield result
+    finally:
+        played.close()
+
+
+def play_round(agents, num_matches, processes=1, seed=None, time_limit=TIME_LIMIT,
+               store=None, settings=None, latencies=None, search_stats=None,
+               supervise=None, supervision=None):
     """
     Play one round (i.e., a single match between each pair of opponents)
+
+    When `processes` is greater than one the matches are spread across a
+    pool of worker processes (see `play_round_matches()`). When `seed` is
+    set every match is seeded deterministically, so a round can be
+    reproduced with any number of processes. Moves are limited to
+    `time_limit` milliseconds, or not timed at all if it is None. When a
+    results `store` is given, matches it already holds for the same
+    `settings` are not replayed (see `play_stored_matches()`). The move
+    times of every game are added to `latencies` if it is a
+    `latency.MoveLatencies`, and the search statistics to `search_stats`
+    if it is a `SearchStatsSummary`. When `supervise` names one of the
+    `SUPERVISORS` moves are abandoned at their deadline, and the overheads
+    of supervision are added to `supervision` if it is a `Supervisor`.
     """
     agent_1 = agents[-1]
     wins = 0.
     total = 0.
 
+    # Each player takes a turn going first
+    jobs = [(idx, order, match_idx, match_seed(seed, idx, order, match_idx))
+            for idx in range(len(agents) - 1)
+            for order in range(2)
+            for match_idx in range(num_matches)]
+    results = play_stored_matches(agents, jobs, processes, time_limit, store, settings,
+                                  supervise)
+
     print("\nPlaying Matches:")
     print("----------")
 
@@ -117,15 +444,20 @@ def play_round(agents, num_matches):
 
         counts = {agent_1.player: 0., agent_2.player: 0.}
         names = [agent_1.name, agent_2.name]
-        print("  Match {}: {!s:^11} vs {!s:^11}".format(idx + 1, *names), end=' ')
-
-        # Each player takes a turn going first
-        for p1, p2 in itertools.permutations((agent_1.player, agent_2.player)):
-            for _ in range(num_matches):
-                score_1, score_2 = play_match(p1, p2)
-                counts[p1] += score_1
-                counts[p2] += score_2
-                total += score_1 + score_2
+        print("  Match {}: {!s:^11} vs {!s:^11}".format(idx + 1, *names), end=' ', flush=True)
+
+        for _ in range(2 * num_matches):
+            _, score_1, score_2, games = next(results)
+            for game in games:
+                if latencies is not None:
+                    latencies.add_game(game)
+                if search_stats is not None:
+                    search_stats.add_game(game)
+                if supervision is not None:
+                    add_supervision(supervision, game)
+            counts[agent_1.player] += score_1
+            counts[agent_2.player] += score_2
+            total += score_1 + score_2
 
         wins += counts[agent_1.player]
 
@@ -135,8 +467,173 @@ def play_round(agents, num_matches):
     return 100. * wins / total
 
 
+def play_sprt(agent, baseline, test, max_matches, processes=1, seed=None,
+              time_limit=TIME_LIMIT, store=None, settings=None, latencies=None,
+              search_stats=None, supervise=None, supervision=None):
+    """
+    Play matches between `agent` and `baseline` until the sequential
+    probability ratio test `test` accepts a hypothesis about their Elo
+    difference, or until `max_matches` matches have been played.
+
+    Each match is a pair of games from the same random opening with the
+    players swapping initiative, and the matches alternate which agent
+    moves first. Matches already held by the results `store` are reused,
+    and move times, search statistics and supervision overheads are added
+    to `latencies`, `search_stats` and `supervision` like in `play_round()`.
+    Returns the status of the test (see `sprt.SPRT.status`).
+    """
+    agents = [baseline, agent]
+    jobs = [(0, match_idx % 2, match_idx, match_seed(seed, 0, match_idx % 2, match_idx))
+            for match_idx in range(max_matches)]
+
+    print("\nPlaying SPRT({:g}, {:g}) with alpha={:g}, beta={:g}:".format(
+        test.elo0, test.elo1, test.alpha, test.beta))
+    print("----------")
+
+    results = play_stored_matches(agents, jobs, processes, time_limit, store, settings,
+                                  supervise)
+    try:
+        for games, (_, wins, losses, records) in enumerate(results, 1):
+            for game in records:
+                if latencies is not None:
+                    latencies.add_game(game)
+                if search_stats is not None:
+                    search_stats.add_game(game)
+                if supervision is not None:
+                    add_supervision(supervision, game)
+            test.record(wins, losses)
+            elo, lower, upper = elo_interval(test.wins, test.losses)
+            print("  Games {:>5}: {:>4} - {:<4} Elo {:>+7.1f} [{:+.1f}, {:+.1f}]  "
+                  "LLR {:>+6.2f} ({:+.2f}, {:+.2f})".format(
+                      2 * games, test.wins, test.losses, elo, lower, upper,
+                      test.llr, test.lower_bound, test.upper_bound))
+            if test.status is not None:
+                break
+    finally:
+        results.close()
+
+    return test.status
+
+
+def random_positions(num_positions, seed=0):
+    """
+    Generate reproducible game states by playing a random number of random
+    moves from an empty board.
+    """
+    rng = random.Random(seed)
+    positions = []
+    while len(positions) < num_positions:
+        game = Board("player1", "player2")
+        for _ in range(rng.randint(2, 30)):
+            moves = game.get_legal_moves()
+            if not moves:
+                break
+            game.apply_move(rng.choice(moves))
+        if game.get_legal_moves():
+            positions.append(game)
+    return positions
+
+
+def benchmark_score_fns(names, num_positions=500):
+    """
+    Print the number of heuristic evaluations per second achieved by each
+    named score function on the same set of random positions.
+    """
+    positions = random_positions(num_positions)
+
+    print("\nEvaluations per second:")
+    print("----------")
+    for name in names:
+        score_fn = SCORE_FUNCTIONS[name]
+        elapsed = min(timeit.repeat(
+            lambda: [score_fn(game, game.active_player) for game in positions],
+            number=1, repeat=3))
+        print("{!s:<28}{:>12.0f}".format(name, num_positions / elapsed))
+
+
 def main():
 
+    parser = argparse.ArgumentParser(description=DESCRIPTION)
+    parser.add_argument("--score", default="custom_score", choices=sorted(SCORE_FUNCTIONS),
+                        help="heuristic used by the Student agent")
+    parser.add_argument("--weights", metavar="PATH", default=None,
+                        help="use the weighted score written by tuner.py (.json) "
+                             "or the model written by learned_score.py (.npz) to "
+                             "PATH as the Student heuristic instead of --score")
+    parser.add_argument("--eval-benchmark", action="store_true",
+                        help="measure evaluations per second of the Student and "
+                             "ID_Improved heuristics before the tournament")
+    parser.add_argument("--processes", type=int, default=1,
+                        help="number of worker processes playing matches in "
+                             "parallel (0 uses every available CPU)")
+    parser.add_argument("--seed", type=int, default=None,
+                        help="seed every match deterministically")
+    parser.add_argument("--sprt", nargs=2, type=float, metavar=("ELO0", "ELO1"),
+                        help="instead of the round-robin, play Student against "
+                             "ID_Improved until a sequential probability ratio "
+                             "test accepts elo=ELO0 or elo=ELO1")
+    parser.add_argument("--alpha", type=float, default=0.05,
+                        help="SPRT probability of accepting ELO1 when ELO0 holds")
+    parser.add_argument("--beta", type=float, default=0.05,
+                        help="SPRT probability of accepting ELO0 when ELO1 holds")
+    parser.add_argument("--max-matches", type=int, default=1000,
+                        help="stop the SPRT after this many matches (two games each)")
+    parser.add_argument("--nodes", type=int, default=None,
+                        help="play untimed games where the ID agents search at "
+                             "most NODES nodes per move")
+    parser.add_argument("--depth", type=int, default=None,
+                        help="play untimed games where the ID agents search to "
+                             "at most DEPTH plies per move")
+    parser.add_argument("--latency", action="store_true",
+                        help="print per-agent move latency percentiles by game phase")
+    parser.add_argument("--latency-out", metavar="PATH", default=None,
+                        help="write move latency percentiles to PATH (CSV, or JSON "
+                             "if PATH ends in .json); implies --latency")
+    parser.add_argument("--search-stats", action="store_true",
+                        help="print per-agent search statistics (nodes, NPS, depth, "
+                             "move ordering, cache hit rate, timeout margin)")
+    parser.add_argument("--calibrate-timeout", action="store_true",
+                        help="let the ID agents adapt their timeout margin to the "
+                             "measured time their searches take to return")
+    parser.add_argument("--supervise", choices=list(SUPERVISORS), default=None,
+                        help="run every timed move in a supervised thread or process "
+                             "that is abandoned at the deadline, and report the "
+                             "overhead of supervision")
+    parser.add_argument("--store", metavar="PATH", default=None,
+                        help="append every match to this JSON Lines results store "
+                             "and skip matches it already holds (resume)")
+    parser.add_argument("--profile", nargs="?", const="cprofile", choices=PROFILE_MODES,
+                        default=None,
+                        help="profile the tournament with cProfile (default) or a "
+                             "low-overhead stack sampler and print the hottest "
+                             "functions at exit; use --processes 1")
+    parser.add_argument("--profile-out", metavar="PREFIX", default="tournament_profile",
+                        help="write the profile to PREFIX.pstats and PREFIX.collapsed")
+    args = parser.parse_args()
+    if args.profile:
+        with Profiler(args.profile, args.profile_out):
+            run_tournament(args)
+    else:
+        run_tournament(args)
+
+
+def run_tournament(args):
+    processes = args.processes or available_cpus()
+
+    if args.eval_benchmark:
+        benchmark_score_fns(["improved_score", args.score])
+
+    student_score = SCORE_FUNCTIONS[args.score]
+    score_name = args.score
+    if args.weights and args.weights.endswith(".npz"):
+        # learned models need NumPy, which the other agents do not
+        from learned_score import LearnedScore
+        student_score = LearnedScore.load(args.weights)
+        score_name = "model:" + os.path.abspath(args.weights)
+    elif args.weights:
+        student_score = WeightedScore.load(args.weights)
+        score_name = repr(student_score)
+
     HEURISTICS = [("Null", null_score),
                   ("Open", open_move_score),
                   ("Improved", improved_score)]
@@ -144,6 +641,13 @@ def main():
     MM_ARGS = {"search_depth": 3, "method": 'minimax', "iterative": False}
     CUSTOM_ARGS = {"method": 'alphabeta', 'iterative': True}
 
+    # Searching to a fixed node or depth budget makes games independent of
+    # the hardware and of machine load, so the moves are no longer timed
+    time_limit = TIME_LIMIT
+    if args.nodes is not None or args.depth is not None:
+        CUSTOM_ARGS.update(node_limit=args.nodes, depth_limit=args.depth)
+        time_limit = None
+
     # Create a collection of CPU agents using fixed-depth minimax or alpha beta
     # search, or random selection.  The agent names encode the search method
     # (MM=minimax, AB=alpha-beta) and the heuristic function (Null=null_score,
@@ -160,11 +664,53 @@ def main():
     # systems; i.e., the performance of the student agent is considered
     # relative to the performance of the ID_Improved agent to account for
     # faster or slower computers.
+    def calibrator():
+        return TimerCalibrator() if args.calibrate_timeout else None
+
     test_agents = [
-        Agent(CustomPlayer(score_fn=improved_score, **CUSTOM_ARGS), "ID_Improved"),
-        Agent(CustomPlayer(score_fn=custom_score, **CUSTOM_ARGS), "Student")
+        Agent(CustomPlayer(score_fn=improved_score, timer_calibrator=calibrator(),
+                           **CUSTOM_ARGS), "ID_Improved"),
+        Agent(CustomPlayer(score_fn=student_score, timer_calibrator=calibrator(),
+                           **CUSTOM_ARGS), "Student")
     ]
 
+    store = ResultsStore(args.store) if args.store else None
+    settings = {"score": score_name, "time_limit": time_limit,
+                "nodes": args.nodes, "depth": args.depth}
+
+    show_latency = args.latency or args.latency_out is not None
+    all_latencies = MoveLatencies(time_limit)
+    all_search_stats = SearchStatsSummary()
+
+    if args.sprt:
+        test = SPRT(args.sprt[0], args.sprt[1], args.alpha, args.beta)
+        supervision = Supervisor() if args.supervise else None
+        status = play_sprt(test_agents[1], test_agents[0], test,
+                           args.max_matches, processes, args.seed, time_limit,
+                           store, dict(settings, mode="sprt"),
+                           all_latencies if show_latency else None,
+                           all_search_stats if args.search_stats else None,
+                           args.supervise, supervision)
+        elo, lower, upper = elo_interval(test.wins, test.losses)
+        print("\n\nResults:")
+        print("----------")
+        if status is None:
+            print("No decision after {} games".format(test.wins + test.losses))
+        else:
+            print("Accepted {}: Student is {} ID_Improved".format(
+                status, "stronger than" if status == H1 else "not stronger than"))
+        print("{!s:<15}{:>+10.1f} Elo (95% CI {:+.1f} to {:+.1f})".format(
+            "Student", elo, lower, upper))
+        if show_latency:
+            all_latencies.print_table()
+        if args.search_stats:
+            all_search_stats.print_table()
+        if args.supervise:
+            print_supervision(args.supervise, supervision)
+        if args.latency_out:
+            all_latencies.save(args.latency_out)
+        return
+
     print(DESCRIPTION)
     for agentUT in test_agents:
         print("")
@@ -173,11 +719,26 @@ def main():
         print("*************************")
 
         agents = random_agents + mm_agents + ab_agents + [agentUT]
-        win_ratio = play_round(agents, NUM_MATCHES)
+        latencies = MoveLatencies(time_limit) if show_latency else None
+        search_stats = SearchStatsSummary() if args.search_stats else None
+        round_supervision = Supervisor() if args.supervise else None
+        win_ratio = play_round(agents, NUM_MATCHES, processes, args.seed, time_limit,
+                               store, settings, latencies, search_stats,
+                               args.supervise, round_supervision)
 
         print("\n\nResults:")
         print("----------")
         print("{!s:<15}{:>10.2f}%".format(agentUT.name, win_ratio))
+        if show_latency:
+            latencies.print_table()
+            all_latencies.update(latencies)
+        if args.search_stats:
+            search_stats.print_table()
+        if args.supervise:
+            print_supervision(args.supervise, round_supervision)
+
+    if args.latency_out:
+        all_latencies.save(args.latency_out)
 
 
 if __name__ == "__main__":
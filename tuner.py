@@ -0,0 +1,224 @@
+"""
+Tune the weights of a `game_agent.WeightedScore` evaluation function, a
+linear combination of the factors used by the hand-weighted combined
+heuristics (see `game_agent.FEATURE_NAMES`).
+
+Two methods are available:
+
+* texel: logistic regression of the final game outcome on the features of
+  positions recorded by `selfplay.py`, i.e., the weights that best predict
+  which side wins from each position.
+
+      python tuner.py texel --samples data/ --out weights.json
+
+* spsa: simultaneous perturbation stochastic approximation, which at each
+  iteration plays matches between two agents whose weights are perturbed in
+  opposite random directions and moves the weights towards the winner.
+  Matches are untimed and played in parallel worker processes.
+
+      python tuner.py spsa --iterations 100 --matches 8 --out weights.json
+
+Both methods then play the tuned weights against the baseline weights and
+measure the cost of an evaluation, and the output file holds the weights
+(load them with `WeightedScore.load()` or `tournament.py --weights`) along
+with a report of the Elo gained relative to the extra evaluation cost.
+"""
+
+import argparse
+import math
+import multiprocessing
+import random
+import timeit
+
+from isolation import Board
+from game_agent import CustomPlayer, FEATURE_NAMES, WeightedScore, get_evaluation_features
+from selfplay import read_samples, shard_paths
+from sprt import elo_interval
+from tournament import Agent, available_cpus, match_seed, play_round_matches, random_positions
+
+# Weights equivalent to heuristic_combined_1_2_3: center + reflection + partition
+BASELINE_WEIGHTS = [0., 1., 1., 1., 0., 0.]
+
+
+def sample_features(sample):
+    """ Return the features of a self-play sample for the player to move. """
+    state, _, outcome = sample
+    game = Board.from_state(state, "player1", "player2")
+    return get_evaluation_features(game, game.active_player), outcome
+
+
+def load_features(directory, max_samples=None, processes=1):
+    """
+    Compute the features and outcome (1 for a win of the player to move, 0
+    for a loss) of the self-play samples in `directory`, in parallel when
+    `processes` is greater than one.
+    """
+    samples = read_samples(shard_paths(directory))
+    if max_samples is not None:
+        samples = (s for i, s in zip(range(max_samples), samples))
+    if processes <= 1:
+        rows = [sample_features(s) for s in samples]
+    else:
+        with multiprocessing.Pool(processes) as pool:
+            rows = pool.map(sample_features, samples, chunksize=256)
+    return [x for x, _ in rows], [1. if y > 0 else 0. for _, y in rows]
+
+
+def texel(features, outcomes, epochs=300, learning_rate=0.5, l2=1e-4):
+    """
+    Fit the weights of a logistic model of the outcome by batch gradient
+    descent on standardized features.
+
+    Returns
+    ----------
+    list<float>
+        The weights of the features on their original scale; the intercept
+        (the advantage of moving first) is dropped because it does not
+        change the ranking of moves.
+    """
+    n, num_features = len(features), len(features[0])
+    means = [sum(x[j] for x in features) / n for j in range(num_features)]
+    stds = [math.sqrt(sum((x[j] - means[j]) ** 2 for x in features) / n) or 1.
+            for j in range(num_features)]
+    rows = [[(x[j] - means[j]) / stds[j] for j in range(num_features)] for x in features]
+
+    weights, bias = [0.] * num_features, 0.
+    for _ in range(epochs):
+        gradient, bias_gradient = [0.] * num_features, 0.
+        for x, y in zip(rows, outcomes):
+            z = bias + sum(w * v for w, v in zip(weights, x))
+            error = 1. / (1. + math.exp(-max(min(z, 50.), -50.))) - y
+            bias_gradient += error
+            for j, v in enumerate(x):
+                gradient[j] += error * v
+        bias -= learning_rate * bias_gradient / n
+        weights = [w - learning_rate * (g / n + l2 * w) for w, g in zip(weights, gradient)]
+    return [w / s for w, s in zip(weights, stds)]
+
+
+def play_weight_matches(weights_1, weights_2, num_matches, processes=1, seed=None,
+                        depth=2, nodes=None):
+    """
+    Play untimed matches (two games each, see `tournament.play_match`)
+    between alpha-beta agents using two weight vectors.
+
+    Returns
+    ----------
+    (int, int)
+        The number of games won with `weights_1` and with `weights_2`.
+    """
+    agents = [Agent(CustomPlayer(score_fn=WeightedScore(weights), method="alphabeta",
+                                 iterative=True, depth_limit=depth, node_limit=nodes), name)
+              for weights, name in ((weights_2, "weights_2"), (weights_1, "weights_1"))]
+    jobs = [(0, 0, match_idx, match_seed(seed, 0, 0, match_idx))
+            for match_idx in range(num_matches)]
+    wins_1 = wins_2 = 0
+    for _, score_1, score_2, _ in play_round_matches(agents, jobs, processes, time_limit=None):
+        wins_1 += score_1
+        wins_2 += score_2
+    return wins_1, wins_2
+
+
+def spsa(weights, iterations, num_matches, processes=1, seed=None, depth=2, nodes=None,
+         a=1., c=0.5, stability=None):
+    """
+    Tune weights by SPSA, estimating the gradient of the win rate at each
+    iteration from matches between the weights perturbed by +/- c_k in a
+    random direction of +/-1 per weight. Uses the standard gain sequences
+    a_k = a / (k + 1 + A)^0.602 and c_k = c / (k + 1)^0.101.
+    """
+    rng = random.Random(seed)
+    stability = iterations // 10 if stability is None else stability
+    weights = list(weights)
+    for k in range(iterations):
+        a_k = a / (k + 1 + stability) ** 0.602
+        c_k = c / (k + 1) ** 0.101
+        delta = [rng.choice((-1., 1.)) for _ in weights]
+        plus = [w + c_k * d for w, d in zip(weights, delta)]
+        minus = [w - c_k * d for w, d in zip(weights, delta)]
+        iteration_seed = None if seed is None else "{}:{}".format(seed, k)
+        wins, losses = play_weight_matches(plus, minus, num_matches, processes,
+                                           iteration_seed, depth, nodes)
+        advantage = (wins - losses) / float(wins + losses)
+        weights = [w + a_k * advantage / (2. * c_k * d) for w, d in zip(weights, delta)]
+        print("Iteration {:>4}: {} to {}  weights {}".format(
+            k + 1, wins, losses, " ".join("{:+.3f}".format(w) for w in weights)))
+    return weights
+
+
+def evaluation_cost(score_fn, positions):
+    """ Return the average number of microseconds per evaluation. """
+    elapsed = min(timeit.repeat(
+        lambda: [score_fn(game, game.active_player) for game in positions],
+        number=1, repeat=3))
+    return 1e6 * elapsed / len(positions)
+
+
+def strength_report(weights, baseline, num_matches, processes=1, seed=None, depth=2, nodes=None):
+    """
+    Compare tuned weights to baseline weights by playing matches between
+    them and timing their evaluations on the same random positions.
+    """
+    wins, losses = play_weight_matches(weights, baseline, num_matches, processes,
+                                       seed, depth, nodes)
+    elo, lower, upper = elo_interval(wins, losses)
+    positions = random_positions(500)
+    tuned_cost = evaluation_cost(WeightedScore(weights), positions)
+    baseline_cost = evaluation_cost(WeightedScore(baseline), positions)
+    return {"wins": wins, "losses": losses,
+            "elo": elo, "elo_lower": lower, "elo_upper": upper,
+            "us_per_eval": tuned_cost, "baseline_us_per_eval": baseline_cost,
+            "relative_cost": tuned_cost / baseline_cost,
+            "elo_per_extra_us": (elo / (tuned_cost - baseline_cost)
+                                 if tuned_cost > baseline_cost else None)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tune the weights of a weighted evaluation function.")
+    parser.add_argument("method", choices=["texel", "spsa"])
+    parser.add_argument("--out", required=True, help="JSON file receiving the weights and report")
+    parser.add_argument("--samples", help="directory of self-play shards (texel)")
+    parser.add_argument("--max-samples", type=int, default=20000,
+                        help="number of samples used by texel")
+    parser.add_argument("--epochs", type=int, default=300, help="texel gradient descent epochs")
+    parser.add_argument("--iterations", type=int, default=50, help="SPSA iterations")
+    parser.add_argument("--matches", type=int, default=8,
+                        help="matches (two games each) per SPSA iteration")
+    parser.add_argument("--eval-matches", type=int, default=50,
+                        help="matches played between the tuned and baseline weights")
+    parser.add_argument("--depth", type=int, default=2, help="search depth of match agents")
+    parser.add_argument("--nodes", type=int, default=None, help="search nodes of match agents")
+    parser.add_argument("--processes", type=int, default=0,
+                        help="number of worker processes (0 uses every available CPU)")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+    processes = args.processes or available_cpus()
+
+    if args.method == "texel":
+        if not args.samples:
+            parser.error("texel needs --samples")
+        features, outcomes = load_features(args.samples, args.max_samples, processes)
+        weights = texel(features, outcomes, args.epochs)
+    else:
+        weights = spsa(BASELINE_WEIGHTS, args.iterations, args.matches, processes,
+                       args.seed, args.depth, args.nodes)
+
+    report = strength_report(weights, BASELINE_WEIGHTS, args.eval_matches, processes,
+                             args.seed, args.depth, args.nodes)
+    WeightedScore(weights).save(args.out, method=args.method, report=report,
+                                baseline_weights=BASELINE_WEIGHTS)
+
+    print("\nWeights:")
+    print("----------")
+    for name, weight in zip(FEATURE_NAMES, weights):
+        print("{!s:<28}{:>+10.4f}".format(name, weight))
+    print("\nResults:")
+    print("----------")
+    print("Tuned vs baseline: {} to {}, {:+.1f} Elo (95% CI {:+.1f} to {:+.1f})".format(
+        report["wins"], report["losses"], report["elo"], report["elo_lower"], report["elo_upper"]))
+    print("Evaluation cost: {:.1f} us vs {:.1f} us ({:.2f}x)".format(
+        report["us_per_eval"], report["baseline_us_per_eval"], report["relative_cost"]))
+
+
+if __name__ == "__main__":
+    main()